@@ -1,27 +1,34 @@
 import streamlit as st
 import pandas as pd
 import json
+import hashlib
 import time
 import io
-import xlsxwriter
+from functools import partial
+
+import perf_log
+from auto_mapping import DEFAULT_THRESHOLD, auto_fill, get_suggestion_index, suggest_unmapped
+from dto_cache import DtoOptionCache
+from edit_journal import journal_dir, session_journal
+from excel_export import data_cache_key, generate_excel_pro, generate_project_workbook
+from excel_import import import_workbook
+from field_records import compact_project
+from json_stream import stream_json
+from mapping_table import (PAGE_SIZES, REQUIRED_OPTS, STATUS_OPTS, add_new_fields, build_table, filter_fields,
+                           merge_page_edits, new_endpoint, new_field_metadata, page_count, page_slice, target_options)
+from postman_import import parse_postman_collection
+from project_store import ShardedProject, export_bytes, import_json, load_json_file
+from schema_inference import SchemaStats, infer_schema_files
+from shared_store import STORE, StoreHandle
+from traffic_import import analyze_traffic, apply_traffic
+from type_inference import TypeRules, clean_type_name, rules_for
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="Mapper Pro v41", layout="wide", page_icon="🏷️")
-
-# --- COLORES Y ESTADOS (GLOBAL) ---
-STATUS_OPTS = [
-    "⚪ Sin Estado",
-    "🔵 Revisar con Analista",
-    "🟡 Revisar con Courier",
-    "✅ Valor Confirmado",
-    "🌫️ Valor Omitido",
-    "🟠 Revisar con ITX",
-    "🟣 Validar Frontal",
-    "🧪 Postman",
-    "🟢 Pendiente de verificar TL"
-]
+EXCEL_CACHE_MAX = 4  # Excels generados que se guardan por sesión
 
 
+# --- COLORES Y ESTADOS (GLOBAL) ---
 def get_row_color(s):
     c = {
         "Analista": '#e3f2fd', "Courier": '#fff9c4', "Confirmado": '#dcedc8',
@@ -33,207 +40,166 @@ def get_row_color(s):
     return ''
 
 
-# --- FUNCIONES CORE ---
-def flatten_payload(y):
-    out = {}
-
-    def flatten(x, name=''):
-        if isinstance(x, dict):
-            for a in x: flatten(x[a], name + a + '.')
-        elif isinstance(x, list):
-            if len(x) > 0:
-                flatten(x[0], name)
-            else:
-                out[name[:-1]] = "[]"
-        else:
-            out[name[:-1]] = x
-
-    flatten(y)
-    return out
-
-
-# --- LÓGICA DE TIPOS LIMPIA ---
-def clean_type_name(val_type, is_nullable=False):
-    m = {'str': 'String', 'int': 'Integer', 'float': 'Decimal', 'bool': 'Boolean', 'dict': 'Object', 'list': 'Array',
-         'nonetype': 'String'}
-    t_lower = str(val_type).lower()
-    base = m.get(t_lower, str(val_type).capitalize())
-    base = base.replace("(null)", "").replace("?", "").strip()
-    if is_nullable: return f"{base}?"
-    return base
-
-
-def infer_smart_type(key, value):
-    if value is not None:
-        return clean_type_name(type(value).__name__, is_nullable=False)
-    k = key.lower()
-    base = "String"
-    if any(x in k for x in ['dt', 'date', 'time']):
-        base = 'DateTime'
-    elif any(x in k for x in ['flag', 'is_']):
-        base = 'Boolean'
-    elif any(x in k for x in ['qtd', 'peso', 'valor', 'total', 'price']):
-        base = 'Decimal'
-    elif any(x in k for x in ['id', 'cod', 'num']):
-        base = 'Integer'
-    elif any(x in k for x in ['list', 'array', 'items']):
-        base = 'Array'
-    return f"{base}?"
-
-
-# --- GENERADOR DE EXCEL PRO ---
-def generate_excel_pro(df_main, df_extras_dict, dropdown_target_options):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        sheet_name = 'Mapeo'
-        workbook = writer.book
-
-        # ESTILOS
-        base_fmt = workbook.add_format(
-            {'font_name': 'Calibri', 'font_size': 11, 'valign': 'vcenter', 'border': 1, 'border_color': '#D9D9D9'})
-        header_fmt = workbook.add_format(
-            {'font_name': 'Calibri', 'font_size': 12, 'bold': True, 'font_color': 'white', 'bg_color': '#2C3E50',
-             'valign': 'vcenter', 'align': 'center', 'border': 1})
-        section_title_fmt = workbook.add_format(
-            {'font_name': 'Calibri', 'font_size': 14, 'bold': True, 'font_color': '#2C3E50', 'underline': True})
-
-        color_map = {
-            "🔵 Revisar con Analista": '#E3F2FD', "🟡 Revisar con Courier": '#FFF9C4',
-            "✅ Valor Confirmado": '#DCEDC8', "🌫️ Valor Omitido": '#F5F5F5',
-            "🟠 Revisar con ITX": '#FFE0B2', "🟣 Validar Frontal": '#E1BEE7',
-            "🧪 Postman": '#FFFFE0', "🟢 Pendiente de verificar TL": '#A5D6A7', "⚪ Sin Estado": '#FFFFFF'
-        }
-
-        # DATOS EXTRA (Aquí es donde se usa la tablita pequeña)
-        if df_extras_dict:
-            list_data = [{"Clave": k, "Valor": v} for k, v in df_extras_dict.items()]
-            df_extras = pd.DataFrame(list_data, columns=["Clave", "Valor"])
-        else:
-            df_extras = pd.DataFrame(columns=["Clave", "Valor"])
-
-        # ESCRITURA
-        pd.DataFrame().to_excel(writer, sheet_name=sheet_name)
-        worksheet = writer.sheets[sheet_name]
-        current_row = 0
-
-        # TABLA EXTRAS (La pequeña arriba)
-        if not df_extras.empty:
-            worksheet.write(current_row, 0, "DATOS ADICIONALES", section_title_fmt)
-            current_row += 1
-            worksheet.write(current_row, 0, "Clave", header_fmt)
-            worksheet.write(current_row, 1, "Valor", header_fmt)
-            current_row += 1
-            for _, row in df_extras.iterrows():
-                worksheet.write(current_row, 0, row['Clave'], base_fmt)
-                worksheet.write(current_row, 1, row['Valor'], base_fmt)
-                current_row += 1
-            current_row += 2
-
-        # TABLA PRINCIPAL
-        worksheet.write(current_row, 0, "MAPEO DE CAMPOS", section_title_fmt)
-        current_row += 1
-        main_header_row = current_row
-
-        df_main.to_excel(writer, sheet_name=sheet_name, index=False, startrow=main_header_row + 1, header=False)
-        for col_num, value in enumerate(df_main.columns.values):
-            worksheet.write(main_header_row, col_num, value, header_fmt)
-        for i in range(len(df_main)):
-            worksheet.set_row(main_header_row + 1 + i, 20)
-
-        # FORMATO CONDICIONAL & FREEZE
-        first_data_row = main_header_row + 2
-        if len(df_main) > 0:
-            last_data_row = first_data_row + len(df_main) - 1
-            last_col_char = chr(65 + len(df_main.columns) - 1)
-            range_full = f"A{first_data_row}:{last_col_char}{last_data_row}"
-
-            for status_text, bg_color in color_map.items():
-                f = workbook.add_format(
-                    {'bg_color': bg_color, 'border': 1, 'border_color': '#D9D9D9', 'valign': 'vcenter'})
-                if "Omitido" in status_text: f.set_font_color('#9E9E9E')
-                worksheet.conditional_format(range_full,
-                                             {'type': 'formula', 'criteria': f'=$A{first_data_row}="{status_text}"',
-                                              'format': f})
-
-            ws_data = workbook.add_worksheet('Data_Validation')
-            ws_data.hide()
-            for i, opt in enumerate(STATUS_OPTS): ws_data.write(i, 0, opt)
-            range_status = f'=Data_Validation!$A$1:$A${len(STATUS_OPTS)}'
-            worksheet.data_validation(main_header_row + 1, 0, main_header_row + len(df_main), 0,
-                                      {'validate': 'list', 'source': range_status})
-
-            if dropdown_target_options:
-                for i, opt in enumerate(dropdown_target_options): ws_data.write(i, 1, opt)
-                range_target = f'=Data_Validation!$B$1:$B${len(dropdown_target_options)}'
-                idx_target = df_main.columns.get_loc("Target (DTO)") if "Target (DTO)" in df_main.columns else 2
-                worksheet.data_validation(main_header_row + 1, idx_target, main_header_row + len(df_main), idx_target,
-                                          {'validate': 'list', 'source': range_target, 'show_error': False})
-
-            worksheet.autofilter(main_header_row, 0, main_header_row + len(df_main), len(df_main.columns) - 1)
-            worksheet.freeze_panes(main_header_row + 1, 2)
-            worksheet.set_column(0, 0, 30);
-            worksheet.set_column(1, 1, 35);
-            worksheet.set_column(2, 2, 55)
-
-    return output.getvalue()
-
-
-# --- IMPORTADOR POSTMAN ---
-def parse_postman_collection(data):
-    found_endpoints = {}
-
-    def recursive_search(items):
-        for item in items:
-            if 'item' in item:
-                recursive_search(item['item'])
-            elif 'request' in item:
-                name = item['name']
-                found_endpoints[name] = {"method": item['request'].get('method', 'GET'), "extra_metadata": {},
-                                         "request": {"mapping_rules": {}, "field_metadata": {}},
-                                         "response": {"mapping_rules": {}, "field_metadata": {}}}
-
-    if 'item' in data: recursive_search(data['item'])
-    return found_endpoints
+def project_download(project, cache, version, compact, compress, session):
+    """Bytes de la descarga del proyecto. Se llama al pulsar el botón (fuera del rerun) y se
+    reutilizan mientras `version` no cambie (None = sin caché)."""
+    key = (version, compact, compress)
+    data = cache.get(key) if version is not None else None
+    if data is None:
+        data = perf_log.timed("app", session, "json_export", export_bytes, project, compact=compact, compress=compress)
+        if version is not None:
+            cache.clear()
+            cache[key] = data
+    return data
 
 
 # --- ESTADO DE SESIÓN ---
+# Cronometraje de las etapas de este rerun (panel "Diagnóstico" y log local)
+perf = perf_log.begin(st.session_state, "app")
+# Diario de cambios en disco local, uno por sesión: al recargar la página se recupera su último estado
+journal = session_journal(st.session_state, "app", st.query_params)
 if 'project' not in st.session_state:
-    st.session_state.project = {"courier_name": "", "project_notes": "", "dto_library": {}, "endpoints": {}}
+    with perf.stage("restore"):
+        restored = journal.restore() if journal else None
+    if restored is not None and "endpoints" in restored:
+        st.session_state.project = compact_project(restored)
+        st.session_state.current_endpoint_name = next(iter(restored["endpoints"]), None)
+    else:
+        st.session_state.project = {"courier_name": "", "project_notes": "", "dto_library": {}, "endpoints": {}}
+        if journal: journal.reset(st.session_state.project)
 if 'current_endpoint_name' not in st.session_state: st.session_state.current_endpoint_name = None
 if 'direction' not in st.session_state: st.session_state.direction = "request"
+if 'dto_cache' not in st.session_state: st.session_state.dto_cache = DtoOptionCache(store=STORE)
+# Los DTOs se guardan una vez por proceso (compartidos entre sesiones); la sesión sólo los referencia
+if 'shared' not in st.session_state: st.session_state.shared = StoreHandle(STORE)
+st.session_state.shared.share_library(st.session_state.project["dto_library"])
+if 'excel_cache' not in st.session_state: st.session_state.excel_cache = {}
+# Autoguardado de lo cambiado en el rerun anterior (st.rerun() corta el script antes del final)
+if journal:
+    with perf.stage("autosave"):
+        journal.sync_project(st.session_state.project, active=st.session_state.current_endpoint_name)
 
 # --- SIDEBAR ---
 with st.sidebar:
     st.title("🚀 Mapper Pro")
     with st.expander("📂 Cargar Proyecto"):
-        uploaded_file = st.file_uploader("Subir Proyecto", type=["json"], label_visibility="collapsed")
+        uploaded_file = st.file_uploader("Subir Proyecto", type=["json", "gz"], label_visibility="collapsed")
         if uploaded_file and st.button("Restaurar", use_container_width=True):
             try:
-                st.session_state.project = json.load(uploaded_file)
+                st.session_state.project = compact_project(load_json_file(uploaded_file))  # .json o .json.gz
+                if journal: journal.reset(st.session_state.project)
                 if st.session_state.project.get("endpoints"):
                     st.session_state.current_endpoint_name = list(st.session_state.project["endpoints"].keys())[0]
                 st.rerun()
             except:
                 st.error("Error al cargar.")
 
+        # Formato en carpeta: manifest + un fichero por endpoint, cargado bajo demanda
+        proj_dir = st.text_input("Carpeta del proyecto", key="proj_dir", placeholder="/ruta/al/proyecto")
+        b1, b2 = st.columns(2)
+        if proj_dir and b1.button("Abrir carpeta", use_container_width=True):
+            try:
+                st.session_state.project = ShardedProject.open(proj_dir)
+                if journal: journal.reset(st.session_state.project)
+                st.session_state.current_endpoint_name = next(iter(st.session_state.project["endpoints"]), None)
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error al abrir: {e}")
+        if proj_dir and uploaded_file and b2.button("JSON → carpeta", use_container_width=True):
+            try:
+                st.session_state.project = import_json(uploaded_file, proj_dir)
+                if journal: journal.reset(st.session_state.project)
+                st.session_state.current_endpoint_name = next(iter(st.session_state.project["endpoints"]), None)
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error al importar: {e}")
+
     with st.expander("🟠 Importar Postman"):
         pm_file = st.file_uploader("Subir Postman", type=["json"], key="pm_up", label_visibility="collapsed")
+        if st.session_state.get("pm_errors"):
+            # Se guardan en sesión porque la importación termina con st.rerun()
+            st.warning(f"{len(st.session_state.pm_errors)} cuerpos no se han podido analizar:\n\n" +
+                       "\n".join(f"- {n}: {e}" for n, e in st.session_state.pm_errors[:20]))
         if pm_file and st.button("Importar", use_container_width=True):
             try:
-                new_eps = parse_postman_collection(json.load(pm_file))
+                # Los cuerpos de request y de los ejemplos guardados se analizan en paralelo
+                bar = st.progress(0.0, text="Analizando cuerpos...")
+                st.session_state.pm_errors = []
+                with perf.stage("postman_import"):
+                    new_eps = parse_postman_collection(
+                        json.load(pm_file), rules=rules_for(st.session_state.project),
+                        progress=lambda d, t: bar.progress(d / t, text=f"Analizando cuerpos {d}/{t}"),
+                        errors=st.session_state.pm_errors)
                 for n, d in new_eps.items():
                     if n not in st.session_state.project["endpoints"]: st.session_state.project["endpoints"][n] = d
                 if new_eps: st.session_state.current_endpoint_name = list(new_eps.keys())[0]; st.rerun()
             except Exception as e:
                 st.error(f"Error: {e}")
 
+    with st.expander("🛰️ Importar Tráfico (HAR / NDJSON)"):
+        tr_files = st.file_uploader("Subir capturas", type=["har", "ndjson", "jsonl"], accept_multiple_files=True,
+                                    key="tr_up", label_visibility="collapsed")
+        if tr_files and st.button("Importar tráfico", use_container_width=True):
+            try:
+                # Se leen en streaming y se agrupan por método + ruta normalizada
+                status = st.empty()
+                with perf.stage("traffic_import"):
+                    traffic = analyze_traffic(tr_files, progress=lambda n: status.caption(f"{n} llamadas procesadas"))
+                    n_eps, n_fields = apply_traffic(st.session_state.project, traffic)
+                if journal: journal.sync_project(st.session_state.project, touched=traffic.groups)
+                st.success(f"{traffic.calls} llamadas, {len(traffic.groups)} endpoints ({n_eps} nuevos), "
+                           f"{n_fields} campos nuevos.")
+                if traffic.groups and not st.session_state.current_endpoint_name:
+                    st.session_state.current_endpoint_name = next(iter(traffic.groups))
+            except Exception as e:
+                st.error(f"Error: {e}")
+
+    with st.expander("📥 Importar Excel editado"):
+        # Excel de un endpoint (hoja "Mapeo" -> endpoint y dirección actuales) o libro del proyecto (por el Índice)
+        xl_up = st.file_uploader("Excel", type=["xlsx"], key="xl_up", label_visibility="collapsed")
+        xl_prefer = st.radio("Si hay conflicto", ["Gana el Excel", "Gana la app"], horizontal=True, key="xl_prefer")
+        if xl_up and st.button("Importar Excel", use_container_width=True):
+            try:
+                prefer = "excel" if xl_prefer == "Gana el Excel" else "app"
+                xl_status = st.empty()
+                with perf.stage("excel_import"):
+                    xl_rep = import_workbook(st.session_state.project, xl_up,
+                                             st.session_state.current_endpoint_name, st.session_state.direction,
+                                             prefer, progress=lambda n: xl_status.caption(f"{n} hojas importadas"))
+                for n in xl_rep["endpoints"]: st.session_state.pop(f"meta_{n}", None)  # editor de extras
+                if journal: journal.sync_project(st.session_state.project, touched=xl_rep["endpoints"])
+                st.success(f"{xl_rep['rows']} filas en {len(xl_rep['sheets'])} hoja(s): {xl_rep['updated_fields']} "
+                           f"campos actualizados, {xl_rep['new_fields']} nuevos, {xl_rep['changes']} cambios.")
+                if xl_rep["skipped"]: st.warning("Hojas sin endpoint en el proyecto: " + ", ".join(xl_rep["skipped"]))
+                if xl_rep["conflicts"]:
+                    st.warning(f"{xl_rep['conflicts']} conflictos con la app")
+                    st.dataframe(pd.DataFrame(xl_rep["conflict_rows"]), hide_index=True, use_container_width=True)
+            except Exception as e:
+                st.error(f"Error: {e}")
+
+    with st.expander("🕘 Autoguardado"):
+        if journal is None:
+            st.caption("Sin autoguardado: no se puede escribir en " + journal_dir("app"))
+        else:
+            js = journal.stats()
+            st.caption(f"{js['pending_ops']} cambios en el diario ({js['journal_bytes'] / 1024:.0f} KB) · "
+                       f"`{journal.directory}`")
+            if js["base_dir"]: st.caption(f"Base: carpeta `{js['base_dir']}` (el diario se vacía al guardarla)")
+            j1, j2 = st.columns(2)
+            if j1.button("Compactar", use_container_width=True, disabled=bool(js["base_dir"])):
+                journal.compact()
+                st.rerun()
+            if j2.button("Empezar de cero", use_container_width=True):
+                journal.clear()
+                del st.session_state["project"]
+                st.session_state.current_endpoint_name = None
+                st.rerun()
+
     st.markdown("---")
     new_ep = st.text_input("Nuevo Endpoint:")
     if st.button("➕ Crear", use_container_width=True) and new_ep:
         if new_ep not in st.session_state.project["endpoints"]:
-            st.session_state.project["endpoints"][new_ep] = {"method": "POST", "extra_metadata": {},
-                                                             "request": {"mapping_rules": {}, "field_metadata": {}},
-                                                             "response": {"mapping_rules": {}, "field_metadata": {}}}
+            st.session_state.project["endpoints"][new_ep] = new_endpoint("POST")
             st.session_state.current_endpoint_name = new_ep;
             st.rerun()
 
@@ -249,6 +215,8 @@ with st.sidebar:
 # --- UI PRINCIPAL ---
 proj = st.session_state.project
 curr_ep = st.session_state.current_endpoint_name
+# En formato carpeta sólo se mantiene en memoria el endpoint activo (y los que tengan cambios sin guardar)
+if isinstance(proj, ShardedProject): proj["endpoints"].release(keep={curr_ep})
 
 c1, c2 = st.columns([2, 1])
 with c1: proj["courier_name"] = st.text_input("📦 Courier", value=proj["courier_name"])
@@ -273,6 +241,22 @@ with tab_dtos:
             except:
                 st.error("JSON Inválido")
 
+    # Reglas de inferencia de tipos de este proyecto (palabras clave del nombre + formatos de los valores)
+    with st.expander("🔤 Reglas de tipos del proyecto"):
+        st.caption('{"keywords": {tipo: [palabras]}, "formats": {tipo: regex}, "detect_values": true}. '
+                   'Se aplican en orden: gana la primera que encaja.')
+        txt_rules = st.text_area("Reglas (JSON)", value=json.dumps(rules_for(proj).config(), indent=2), height=300)
+        r1, r2 = st.columns(2)
+        if r1.button("Guardar reglas", use_container_width=True):
+            try:
+                cfg = json.loads(txt_rules)
+                TypeRules.from_config(cfg)  # valida palabras clave y expresiones
+                proj["type_rules"] = cfg; st.success("Reglas guardadas.")
+            except Exception as e:
+                st.error(f"Reglas inválidas: {e}")
+        if "type_rules" in proj and r2.button("Restaurar por defecto", use_container_width=True):
+            del proj["type_rules"]; st.rerun()
+
 with tab_map:
     if not curr_ep:
         st.info("👈 Selecciona Endpoint.")
@@ -371,12 +355,7 @@ with tab_map:
                             req_val = "No" if is_opt else "Sí"
                             clean_t = clean_type_name(k_type, is_nullable=is_opt)
 
-                            if k_id not in prev_meta:
-                                prev_meta[k_id] = {
-                                    "status_tag": "⚪ Sin Estado", "required": "?",
-                                    "comment_tl": "", "comment_analyst": "", "comment_dev": "",
-                                    "example_value": "", "type": "String", "is_done": False, "doc_desc": ""
-                                }
+                            if k_id not in prev_meta: prev_meta[k_id] = new_field_metadata()
 
                             prev_meta[k_id]["doc_desc"] = str(k_doc)
                             prev_meta[k_id]["required"] = req_val
@@ -394,107 +373,109 @@ with tab_map:
         # --- CARGA DE JSON RAW ---
         st.caption("O importa un Payload Raw (ejemplo real):")
         tx = st.text_area(f"JSON Raw payload", height=70, key=f"tx_{curr_ep}_{direction}")
-        if tx and st.button("Analizar Payload"):
+        px = st.file_uploader("O sube uno o varios payloads de muestra (JSON / NDJSON)", type=["json", "ndjson", "jsonl"],
+                              accept_multiple_files=True, key=f"px_{curr_ep}_{direction}")
+        if (tx or px) and st.button("Analizar Payload"):
             try:
-                clean_tx = tx.replace("“", '"').replace("”", '"').strip()
-                raw = json.loads(clean_tx)
-                if isinstance(raw, list) and raw: raw = raw[0]
-                flat = flatten_payload(raw)
-                for k, v in flat.items():
-                    if k not in prev_meta:
-                        prev_meta[k] = {
-                            "status_tag": "⚪ Sin Estado", "required": "?",
-                            "comment_tl": "", "comment_analyst": "", "comment_dev": "",
-                            "example_value": str(v)[:100], "type": infer_smart_type(k, v),
-                            "is_done": False, "doc_desc": ""
-                        }
-                st.rerun()
+                # Streaming: se aplana por trozos sin construir el árbol completo. Se recorren
+                # todos los elementos de los arrays / líneas NDJSON (mismas rutas que antes).
+                # Con varias muestras los tipos salen del esquema combinado (nulos y ausencias -> '?').
+                # Parseo y aplanado van juntos (streaming): una sola etapa
+                with perf.stage("payload_parse"):
+                    if px:
+                        schema = infer_schema_files([(f.name, f.getvalue()) for f in px])
+                    else:
+                        schema = stream_json(io.StringIO(tx), collector=SchemaStats(), merge_arrays=True,
+                                             array_suffix="", fix_quotes=True)
+                with perf.stage("type_inference", fields=len(schema)):
+                    add_new_fields(prev_meta, schema.field_types(rules_for(proj)))
+                if schema.errors:
+                    st.error("JSON Inválido en Payload: " + ", ".join(n for n, _ in schema.errors))
+                else:
+                    st.rerun()
             except:
                 st.error("JSON Inválido en Payload.")
 
         # --- CONSTRUCCIÓN TABLA ---
-        u_opts = ["SELECCIONAR_CAMPO", "IGNORED_FIELD"]
-        if proj["dto_library"]:
-            for dn, dc in proj["dto_library"].items():
-                for k, v in flatten_payload(dc).items(): u_opts.append(f"[{dn}] {k} | {v}")
-            u_opts.sort()
-
-        rows = []
-        for k in list(prev_meta.keys()):
-            tgt = "SELECCIONAR_CAMPO"
-            for t, s in prev_map.items():
-                if s == k:
-                    match = next((o for o in u_opts if t == o.split(" | ")[0]), t)
-                    tgt = match;
-                    break
-
-            meta = prev_meta.get(k, {})
-            rows.append({
-                "Estado": meta.get("status_tag", "⚪ Sin Estado"),
-                "Campo Courier": k,
-                "Target (DTO)": tgt,
-                "Ejemplo": meta.get("example_value", ""),
-                "Tipo": meta.get("type", "String"),
-                "Requerido": meta.get("required", "?"),
-                "Doc": meta.get("doc_desc", ""),
-                "Coment. Analista": meta.get("comment_analyst", ""),
-                "Coment. TL": meta.get("comment_tl", ""),
-                "Coment. Dev": meta.get("comment_dev", "")
-            })
-
+        with perf.stage("dto_options"):
+            u_opts = target_options(proj["dto_library"], st.session_state.dto_cache)
+
+        # --- SUGERENCIAS DE MAPEO ---
+        # Índice de tokens / trigramas sobre las rutas de los DTOs (se reconstruye sólo si cambian)
+        if len(u_opts) > 2 and prev_meta:
+            with st.expander("🪄 Sugerencias de mapeo"):
+                syn_file = st.file_uploader("Sinónimos extra (JSON {palabra: equivalente})", type=["json"],
+                                            key="syn_up")
+                try:
+                    synonyms = json.load(syn_file) if syn_file else None
+                except json.JSONDecodeError:
+                    synonyms = None
+                    st.error("JSON de sinónimos inválido.")
+                s_idx = get_suggestion_index(u_opts, synonyms)
+                sg1, sg2 = st.columns([3, 1])
+                thr = sg1.slider("Confianza mínima para autocompletar", 0.5, 1.0, DEFAULT_THRESHOLD, 0.05,
+                                 key=f"thr_{curr_ep}_{direction}")
+                if sg2.button("Autocompletar", use_container_width=True, key=f"auto_{curr_ep}_{direction}"):
+                    added = auto_fill(prev_map, prev_meta, s_idx, threshold=thr)
+                    st.toast(f"{len(added)} campos mapeados automáticamente.")
+                    st.rerun()
+                if st.toggle("Ver candidatos de los campos sin mapear", key=f"sg_{curr_ep}_{direction}"):
+                    cands = suggest_unmapped(prev_meta, prev_map, s_idx)
+                    st.dataframe(pd.DataFrame(
+                        [{"Campo Courier": f, "Candidato": o, "Confianza": sc} for f, cs in cands.items()
+                         for o, sc in cs]), use_container_width=True, hide_index=True)
         st.divider()
-        df_table = pd.DataFrame(rows)
-        if df_table.empty: df_table = pd.DataFrame(
-            columns=["Estado", "Campo Courier", "Target (DTO)", "Ejemplo", "Tipo", "Requerido", "Doc",
-                     "Coment. Analista", "Coment. TL", "Coment. Dev"])
+
+        # --- FILTROS Y PAGINACIÓN ---
+        # Se filtra sobre field_metadata y sólo se construye/envía la página visible
+        ek = f"{curr_ep}_{direction}"
+        fc1, fc2, fc3, fc4 = st.columns([2, 2, 1.2, 2])
+        f_status = fc1.multiselect("Estado", STATUS_OPTS, key=f"fst_{ek}")
+        f_req = fc2.multiselect("Requerido", REQUIRED_OPTS, key=f"frq_{ek}")
+        f_mapped = fc3.selectbox("Mapeo", ["Todos", "Mapeados", "Sin mapear"], key=f"fmp_{ek}")
+        f_text = fc4.text_input("Buscar", key=f"ftx_{ek}", placeholder="campo, target, doc, comentarios...")
+        keys = filter_fields(prev_meta, prev_map, f_status, f_req,
+                             {"Mapeados": True, "Sin mapear": False}.get(f_mapped), f_text)
+        pc1, pc2, pc3 = st.columns([1, 1, 3])
+        page_size = pc1.selectbox("Filas por página", PAGE_SIZES, index=1, key="page_size")
+        n_pages = page_count(len(keys), page_size)
+        if st.session_state.get(f"pg_{ek}", 1) > n_pages: st.session_state[f"pg_{ek}"] = n_pages
+        page = pc2.number_input("Página", min_value=1, max_value=n_pages, step=1, key=f"pg_{ek}")
+        pc3.caption(f"{len(keys)} de {len(prev_meta)} campos · página {page} de {n_pages}. "
+                    "Los cambios sin guardar se descartan al cambiar de página o de filtro.")
+        page_keys = page_slice(keys, page, page_size)
+        # Las ediciones del data_editor son por posición: la clave cambia con las filas visibles (filtros,
+        # tamaño y nº de página) para que nunca se apliquen a otras filas
+        slice_key = hashlib.sha1("\n".join(page_keys).encode("utf-8")).hexdigest()[:12]
+        with perf.stage("rows", rows=len(page_keys)):
+            df_table = build_table({k: prev_meta[k] for k in page_keys}, prev_map, u_opts)
 
         # --- EDITOR ---
         with st.form(key=f"form_map_{curr_ep}_{direction}"):
-            edited = st.data_editor(
-                df_table,
-                key=f"ed_{curr_ep}_{direction}",
-                num_rows="dynamic",
-                column_config={
-                    "Estado": st.column_config.SelectboxColumn("Estado", options=STATUS_OPTS, width="medium",
-                                                               required=True),
-                    "Campo Courier": st.column_config.TextColumn("Campo Courier", disabled=False),
-                    "Target (DTO)": st.column_config.SelectboxColumn("Mapeo 🎯", options=u_opts, required=True,
-                                                                     width="large"),
-                    "Requerido": st.column_config.SelectboxColumn(options=["Sí", "No", "Cond", "?"], width="small"),
-                    "Tipo": st.column_config.TextColumn(width="small"),
-                    "Coment. Analista": st.column_config.TextColumn("💬 Analista", width="medium"),
-                    "Coment. TL": st.column_config.TextColumn("🟢 TL", width="medium"),
-                    "Coment. Dev": st.column_config.TextColumn("👨‍💻 Dev", width="medium"),
-                },
-                width="stretch", hide_index=True, height=600
-            )
+            with perf.stage("data_editor", rows=len(df_table)):
+                edited = st.data_editor(
+                    df_table,
+                    key=f"ed_{ek}_{slice_key}",
+                    num_rows="dynamic",
+                    column_config={
+                        "Estado": st.column_config.SelectboxColumn("Estado", options=STATUS_OPTS, width="medium",
+                                                                   required=True),
+                        "Campo Courier": st.column_config.TextColumn("Campo Courier", disabled=False),
+                        "Target (DTO)": st.column_config.SelectboxColumn("Mapeo 🎯", options=u_opts, required=True,
+                                                                         width="large"),
+                        "Requerido": st.column_config.SelectboxColumn(options=REQUIRED_OPTS, width="small"),
+                        "Tipo": st.column_config.TextColumn(width="small"),
+                        "Coment. Analista": st.column_config.TextColumn("💬 Analista", width="medium"),
+                        "Coment. TL": st.column_config.TextColumn("🟢 TL", width="medium"),
+                        "Coment. Dev": st.column_config.TextColumn("👨‍💻 Dev", width="medium"),
+                    },
+                    width="stretch", hide_index=True, height=600
+                )
 
             if st.form_submit_button("💾 Guardar Cambios", type="primary", use_container_width=True):
-                nm, nmt = {}, {}
-                for _, r in edited.iterrows():
-                    c_courier = r.get("Campo Courier")
-                    if not c_courier or pd.isna(c_courier): continue
-                    c_courier = str(c_courier).strip()
-
-                    tgt_val = r["Target (DTO)"]
-                    clean_target = tgt_val.split(" | ")[0] if " | " in tgt_val else tgt_val
-
-                    if "SELECCIONAR" not in clean_target and "IGNORED" not in clean_target: nm[clean_target] = c_courier
-
-                    nmt[c_courier] = {
-                        "required": r.get("Requerido", "?"),
-                        "comment_tl": r.get("Coment. TL", ""),
-                        "comment_analyst": r.get("Coment. Analista", ""),
-                        "comment_dev": r.get("Coment. Dev", ""),
-                        "example_value": r.get("Ejemplo", ""),
-                        "type": r.get("Tipo", "String"),
-                        "is_done": ("SELECCIONAR" not in clean_target),
-                        "status_tag": r["Estado"],
-                        "doc_desc": r.get("Doc", "")
-                    }
-
-                proj["endpoints"][curr_ep][direction]["mapping_rules"] = nm
-                proj["endpoints"][curr_ep][direction]["field_metadata"] = nmt
+                # Sólo se vuelcan las filas de la página; el resto de field_metadata no se reconstruye
+                with perf.stage("save", rows=len(edited)):
+                    merge_page_edits(prev_meta, prev_map, page_keys, edited)
                 st.success("Guardado.");
                 time.sleep(0.5);
                 st.rerun()
@@ -502,11 +483,70 @@ with tab_map:
         st.markdown("#### 📤 Exportar")
         # Aseguramos que se usen los extras actuales del estado (ya actualizados arriba)
         extras_to_export = proj["endpoints"][curr_ep].get("extra_metadata", {})
-        excel_bytes = generate_excel_pro(df_table, extras_to_export, u_opts)
-        st.download_button(label="📥 Descargar Excel", data=excel_bytes, file_name=f"Map_{curr_ep}_{direction}.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                           use_container_width=True)
+        # El Excel (de todos los campos) sólo se genera bajo demanda y se reutiliza mientras
+        # campos/reglas/extras/opciones no cambien
+        xl_key = data_cache_key(prev_meta, prev_map, extras_to_export, u_opts)
+        xl_cache = st.session_state.excel_cache
+        if xl_key not in xl_cache and st.button("⚙️ Generar Excel", use_container_width=True):
+            with perf.stage("excel", rows=len(prev_meta)):
+                xl_cache[xl_key] = generate_excel_pro(build_table(prev_meta, prev_map, u_opts), extras_to_export,
+                                                      u_opts)
+            while len(xl_cache) > EXCEL_CACHE_MAX: xl_cache.pop(next(iter(xl_cache)))
+        if xl_key in xl_cache:
+            st.download_button(label="📥 Descargar Excel", data=xl_cache[xl_key],
+                               file_name=f"Map_{curr_ep}_{direction}.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                               use_container_width=True)
 
 st.write("---")
-if st.button("💾 Descargar Proyecto JSON"):
-    st.download_button("JSON", data=json.dumps(proj, indent=4), file_name="Project.json")
\ No newline at end of file
+if isinstance(proj, ShardedProject):
+    if st.button(f"💾 Guardar en carpeta ({proj.directory})"):
+        st.success(f"Guardado: {proj.save()} endpoint(s) reescritos.")
+        if journal: journal.reset(proj)  # lo guardado ya no hace falta en el diario
+elif st.session_state.get("proj_dir") and st.button("💾 Guardar como carpeta"):
+    st.session_state.project = ShardedProject.create(st.session_state.proj_dir, proj)
+    if journal: journal.reset(st.session_state.project)
+    st.rerun()
+# Autoguardado de lo cambiado en este rerun (antes de exportar: la secuencia del diario marca la versión)
+if journal:
+    with perf.stage("autosave"):
+        journal.sync_project(proj, active=curr_ep)
+# Descarga por trozos (endpoint a endpoint), opcionalmente compacta y/o gzip. Se serializa sólo al
+# pulsar el botón y los bytes se reutilizan mientras el proyecto no cambie.
+if 'export_cache' not in st.session_state: st.session_state.export_cache = {}
+ex1, ex2, ex3 = st.columns([1, 1, 3])
+exp_gz = ex1.toggle("Comprimir (.gz)", key="exp_gz")
+exp_compact = ex2.toggle("Compacto", key="exp_compact", help="Sin sangría: más pequeño y rápido")
+with ex3:
+    st.download_button("💾 Descargar Proyecto JSON",
+                       data=partial(project_download, proj, st.session_state.export_cache,
+                                    (id(proj), journal.seq) if journal else None, exp_compact, exp_gz,
+                                    st.session_state.get("_perf_session")),
+                       file_name="Project.json.gz" if exp_gz else "Project.json",
+                       mime="application/gzip" if exp_gz else "application/json")
+# Un solo libro: una hoja por endpoint/dirección + índice de progreso (tablas preparadas en paralelo)
+if proj["endpoints"] and st.button("📚 Descargar Excel del proyecto (todas las hojas)"):
+    status = st.empty()
+    with perf.stage("project_excel", endpoints=len(proj["endpoints"])):
+        data = generate_project_workbook(proj, options=target_options(proj["dto_library"], st.session_state.dto_cache),
+                                         progress=lambda n: status.caption(f"{n} hojas generadas"))
+    st.download_button("📥 Excel del proyecto", data=data,
+                       file_name=f"Spec_{proj.get('courier_name') or 'proyecto'}.xlsx".replace(" ", "_"),
+                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+# --- DIAGNÓSTICO ---
+perf_log.end(st.session_state)
+with st.sidebar.expander("⏱️ Diagnóstico"):
+    perf_hist = perf_log.history(st.session_state)
+    if perf_hist:
+        last = perf_hist[-1]
+        st.caption(f"Último rerun: {last['total_ms']:.0f} ms · RSS {last['rss_mb']} MB")
+        st.dataframe(pd.DataFrame(last["stages"], columns=["stage", "ms", "mem_mb"]), hide_index=True,
+                     use_container_width=True)
+        st.caption(f"Sesión `{last['session']}` · {len(perf_hist)} reruns")
+        st.dataframe(pd.DataFrame(perf_log.stage_table(perf_hist)), hide_index=True, use_container_width=True)
+    ss = STORE.stats()
+    st.caption(f"Almacén compartido: {ss['entries']} estándares/DTOs ({ss['in_use']} en uso, {ss['refs']} refs), "
+               f"{ss['parsed']} cargados, {ss['flattened']} aplanados")
+    st.download_button("📥 Log de tiempos (NDJSON)", data=perf_log.read_log, file_name="perf.ndjson",
+                       mime="application/x-ndjson", use_container_width=True)
@@ -0,0 +1,250 @@
+# --- MOTOR DE SUGERENCIAS DE MAPEO ---
+# Propone targets del desplegable (u_opts / std_options) para los campos del courier.
+# Índice invertido construido una vez por versión de las opciones:
+# - tokens normalizados de la ruta (camelCase/snake_case, sin acentos, sinónimos
+#   pt/es -> en, plural simple), con más peso cuanto más cerca de la hoja y por IDF
+# - trigramas del nombre de la hoja, para abreviaturas y variantes ("desc" / "description")
+# Cada campo sólo recorre las listas de los tokens que contiene, así que sugerir para
+# cientos de campos contra 10k+ rutas sigue siendo interactivo.
+import json
+import math
+import re
+import unicodedata
+from collections import defaultdict
+
+from mapping_table import IGNORED_TARGET, NO_TARGET, OPTION_SEP
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_K = 3
+_CANDIDATES = 50  # candidatos por token que pasan al cálculo completo (con trigramas)
+_TRIGRAM_MAX_DF = 0.05  # trigramas presentes en más de este % de targets no generan candidatos
+_TOKEN_W, _NGRAM_W, _TYPE_BONUS = 0.75, 0.25, 0.05
+_MIN_SCORE = 0.1
+_DECAY = 0.5  # peso de cada segmento respecto al siguiente (la hoja pesa 1)
+_INDEX_CACHE = {}
+_INDEX_CACHE_MAX = 4
+
+_DTO_PREFIX = re.compile(r"^\[[^\]]*\] ")
+_WORDS = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_SPLIT = re.compile(r"[^0-9A-Za-z]+")
+
+# Palabra (ya en minúsculas y sin acentos) -> equivalente en inglés (una o varias palabras)
+DEFAULT_SYNONYMS = {
+    # personas / direcciones
+    "nome": "name", "nombre": "name", "sobrenome": "surname", "apellido": "surname", "apellidos": "surname",
+    "destinatario": "recipient", "receptor": "recipient", "receiver": "recipient", "consignee": "recipient",
+    "remetente": "sender", "remitente": "sender", "shipper": "sender", "expedidor": "sender",
+    "cliente": "customer", "client": "customer",
+    "endereco": "address", "direccion": "address", "domicilio": "address",
+    "rua": "street", "calle": "street", "logradouro": "street", "numero": "number", "num": "number",
+    "bairro": "district", "barrio": "district", "colonia": "district", "complemento": "complement",
+    "cidade": "city", "ciudad": "city", "municipio": "city", "localidad": "city",
+    "estado": "state", "provincia": "state", "uf": "state", "pais": "country",
+    "cep": "zip", "codigopostal": "zip", "cp": "zip", "postcode": "zip", "postal": "zip",
+    "telefone": "phone", "telefono": "phone", "tel": "phone", "celular": "phone", "movil": "phone",
+    "mobile": "phone", "correo": "email", "mail": "email",
+    "documento": "document", "cpf": "tax id", "cnpj": "tax id", "nif": "tax id", "rfc": "tax id", "vat": "tax id",
+    # pedido / envío
+    "pedido": "order", "orden": "order", "solicitacao": "request", "solicitacoes": "request",
+    "solicitud": "request", "envio": "shipment", "remessa": "shipment", "entrega": "delivery",
+    "coleta": "pickup", "recogida": "pickup", "rastreio": "tracking", "seguimiento": "tracking",
+    "volume": "package", "volumes": "package", "bulto": "package", "paquete": "package", "pacote": "package",
+    "peso": "weight", "altura": "height", "alto": "height", "largura": "width", "ancho": "width",
+    "comprimento": "length", "largo": "length", "quantidade": "quantity", "cantidad": "quantity", "qty": "quantity",
+    "valor": "value", "precio": "price", "preco": "price", "moeda": "currency", "moneda": "currency",
+    "nota": "invoice", "factura": "invoice", "fatura": "invoice", "chave": "key", "clave": "key",
+    "codigo": "code", "cod": "code", "descricao": "description", "descripcion": "description",
+    "desc": "description", "referencia": "reference", "ref": "reference", "servico": "service",
+    "servicio": "service", "fecha": "date", "hora": "time", "criacao": "created", "creacion": "created",
+    "identificador": "id", "ident": "id",
+}
+# Tokens contenedor, con poco peso
+_STOP = {"list", "lista", "array", "arr", "item", "elemento", "element", "obj", "object", "info", "dto"}
+
+
+def load_synonyms(path):
+    """Sinónimos extra desde un JSON {palabra: equivalente}."""
+    with open(path, "r", encoding="utf-8") as f: return {str(k): str(v) for k, v in json.load(f).items()}
+
+
+def _ascii(text):
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def _words(segment):
+    out = []
+    for part in _SPLIT.split(_ascii(segment)):
+        out.extend(w.lower() for w in _WORDS.findall(part))
+    return out
+
+
+def _stem(word):
+    # Plural simple (es/pt/en): sólo para palabras largas
+    if len(word) > 4 and word.endswith("es") and not word.endswith("ses"): return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"): return word[:-1]
+    return word
+
+
+def normalize_tokens(segment, synonyms):
+    """'Destinatario' -> ['recipient']; 'codigoPostal' -> ['code', 'zip']."""
+    out = []
+    joined = "".join(_words(segment))
+    if joined in synonyms and len(_words(segment)) > 1:  # 'codigoPostal' como palabra única
+        return synonyms[joined].split()
+    for w in _words(segment):
+        s = synonyms.get(w) or synonyms.get(_stem(w))
+        out.extend(s.split() if s else [_stem(w)])
+    return out
+
+
+def _trigrams(text):
+    t = f"^{text}$"
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+def _base_type(t):
+    return str(t or "").split("(")[0].strip().rstrip("?").strip().lower()
+
+
+def target_key(option):
+    """'[Dto] order.id | String' -> '[Dto] order.id' (la clave que se guarda en mapping_rules)."""
+    return option.split(OPTION_SEP, 1)[0]
+
+
+class SuggestionIndex:
+    """Índice de las opciones de target para sugerir mapeos."""
+
+    def __init__(self, options, synonyms=None):
+        self.synonyms = dict(DEFAULT_SYNONYMS)
+        if synonyms: self.synonyms.update({_ascii(k).lower(): v for k, v in synonyms.items()})
+        self.options = [o for o in options if o not in (NO_TARGET, IGNORED_TARGET)]
+        self._types = []
+        self._leaves = []  # trigramas de la hoja de cada target
+        self._norms = []
+        self._postings = defaultdict(list)  # token -> [(target, peso)]
+        self._grams = defaultdict(list)  # trigrama -> [target]
+        vectors = []
+        for i, opt in enumerate(self.options):
+            path, _, typ = opt.partition(OPTION_SEP)
+            vec, leaf = self._vector(_DTO_PREFIX.sub("", path, count=1))
+            vectors.append(vec)
+            self._types.append(_base_type(typ))
+            grams = _trigrams(leaf)
+            self._leaves.append(grams)
+            for g in grams: self._grams[g].append(i)
+        n = len(self.options) or 1
+        df = defaultdict(int)
+        for vec in vectors:
+            for t in vec: df[t] += 1
+        self._idf = {t: math.log(1 + n / c) for t, c in df.items()}
+        for i, vec in enumerate(vectors):
+            norm = 0.0
+            for t, w in vec.items():
+                w *= self._idf[t]
+                self._postings[t].append((i, w))
+                norm += w * w
+            self._norms.append(math.sqrt(norm) or 1.0)
+        self._max_idf = math.log(1 + n)
+        self._gram_limit = max(8, int(_TRIGRAM_MAX_DF * n))
+        self._memo = {}
+
+    def _vector(self, path):
+        """{token: peso} de una ruta y el texto normalizado de su hoja."""
+        segs = [s for s in path.replace("[*]", "").replace("[]", "").split(".") if s]
+        vec, leaf = {}, ""
+        for depth, seg in enumerate(reversed(segs)):
+            toks = normalize_tokens(seg, self.synonyms)
+            if depth == 0: leaf = "".join(toks)
+            w = _DECAY ** depth
+            for t in toks:
+                tw = w * (0.1 if t in _STOP else 1.0)
+                if tw > vec.get(t, 0.0): vec[t] = tw
+        return vec, leaf
+
+    def suggest(self, field, k=DEFAULT_K, field_type=None):
+        """[(opción, confianza 0..1)] de mayor a menor."""
+        key = (field, _base_type(field_type))
+        hit = self._memo.get(key)
+        if hit is None: hit = self._memo[key] = self._rank(field, key[1])
+        return hit[:k]
+
+    def suggest_many(self, fields, k=DEFAULT_K, types=None):
+        """{campo: [(opción, confianza)]} para varios campos de una vez."""
+        types = types or {}
+        return {f: self.suggest(f, k, types.get(f)) for f in fields}
+
+    def _rank(self, field, ftype):
+        if not self.options: return []
+        vec, leaf = self._vector(field)
+        acc = defaultdict(float)
+        norm = 0.0
+        for t, w in vec.items():
+            # Un token que no aparece en ningún target cuenta como el más raro (baja la confianza)
+            w *= self._idf.get(t, self._max_idf)
+            norm += w * w
+            for i, tw in self._postings.get(t, ()): acc[i] += w * tw
+        norm = math.sqrt(norm) or 1.0
+        cands = sorted(acc, key=lambda i: acc[i] / self._norms[i], reverse=True)[:_CANDIDATES]
+
+        grams = _trigrams(leaf) if leaf else set()
+        # Sin tokens en común (abreviaturas, idiomas sin sinónimo): candidatos por trigramas de la hoja
+        if len(cands) < _CANDIDATES and grams:
+            shared = defaultdict(int)
+            for g in grams:
+                ids = self._grams.get(g, ())
+                if len(ids) <= self._gram_limit:
+                    for i in ids: shared[i] += 1
+            seen = set(cands)
+            cands += [i for i in sorted(shared, key=shared.get, reverse=True) if i not in seen][:_CANDIDATES]
+
+        scored = []
+        for i in cands:
+            cos = acc.get(i, 0.0) / (norm * self._norms[i])
+            tg = self._leaves[i]
+            dice = 2 * len(grams & tg) / (len(grams) + len(tg)) if grams and tg else 0.0
+            score = _TOKEN_W * cos + _NGRAM_W * dice
+            if ftype and ftype == self._types[i]: score += _TYPE_BONUS
+            if score < _MIN_SCORE: continue
+            scored.append((self.options[i], round(min(score, 1.0), 3)))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored
+
+
+def get_suggestion_index(options, synonyms=None):
+    """SuggestionIndex de estas opciones/sinónimos, reconstruido sólo si cambian (como get_table_index)."""
+    key = (tuple(options), tuple(sorted((synonyms or {}).items())))
+    idx = _INDEX_CACHE.get(key)
+    if idx is None:
+        if len(_INDEX_CACHE) >= _INDEX_CACHE_MAX: _INDEX_CACHE.pop(next(iter(_INDEX_CACHE)))
+        idx = _INDEX_CACHE[key] = SuggestionIndex(options, synonyms)
+    return idx
+
+
+def unmapped_fields(field_metadata, mapping_rules):
+    mapped = set(mapping_rules.values())
+    return [f for f in field_metadata if f not in mapped]
+
+
+def suggest_unmapped(field_metadata, mapping_rules, index, k=DEFAULT_K):
+    """Candidatos para todos los campos sin target: {campo: [(opción, confianza)]}."""
+    fields = unmapped_fields(field_metadata, mapping_rules)
+    types = {f: (field_metadata.get(f) or {}).get("type") for f in fields}
+    return index.suggest_many(fields, k, types)
+
+
+def auto_fill(mapping_rules, field_metadata, index, threshold=DEFAULT_THRESHOLD):
+    """Rellena mapping_rules con las sugerencias >= threshold. Devuelve {target: campo} añadidos.
+
+    Cada target sólo puede tener un campo (es la clave de mapping_rules): se asignan de
+    mayor a menor confianza sin reutilizar targets ni campos ya mapeados.
+    """
+    pairs = []
+    for field, cands in suggest_unmapped(field_metadata, mapping_rules, index, k=5).items():
+        pairs.extend((score, field, target_key(opt)) for opt, score in cands if score >= threshold)
+    pairs.sort(key=lambda p: p[0], reverse=True)
+    added, used_fields = {}, set()
+    for score, field, target in pairs:
+        if target in mapping_rules or field in used_fields: continue
+        mapping_rules[target] = added[target] = field
+        used_fields.add(field)
+    return added
@@ -0,0 +1,403 @@
+# --- CLI POR LOTES (SIN STREAMLIT) ---
+# Reutiliza la misma lógica que app.py para procesar muchos couriers sin la UI:
+#   python batch_cli.py analyze PAYLOADS_DIR -o proyecto.json [--project base.json] [--dto DTO.json ...] [--excel DIR]
+#   python batch_cli.py excel proyecto.json [otro.json ...] -o DIR [--workbook]
+#   python batch_cli.py postman coleccion.json -o proyecto.json [--project base.json]
+#   python batch_cli.py schema MUESTRA [MUESTRA ...] -o esquema.json
+#   python batch_cli.py traffic CAPTURA.har [otra.ndjson ...] -o proyecto.json [--project base.json]
+#   python batch_cli.py automap proyecto.json -o proyecto.json [--threshold 0.8] [--synonyms sinonimos.json]
+#   python batch_cli.py validate proyecto.json PAYLOADS [...] --endpoint EP [--direction response] -o informe.json
+#   python batch_cli.py import-excel proyecto.json LIBRO.xlsx -o proyecto.json [--endpoint EP] [--prefer app]
+#   python batch_cli.py transform proyecto.json TRAFICO.ndjson --endpoint EP [--direction response] -o salida.ndjson
+# Cada fichero de PAYLOADS_DIR es un endpoint (nombre del fichero sin extensión).
+# "<endpoint>.request.json" / "<endpoint>.response.xml" fijan la dirección; si no, se usa --direction.
+# Los ficheros y los Excels se procesan en paralelo con un pool de procesos (--workers).
+# Los proyectos pueden ser un JSON de un solo fichero o una carpeta de project_store
+# (-o terminado en '/' guarda en formato carpeta).
+import argparse
+import json
+import os
+import re
+import sys
+from functools import partial
+
+from auto_mapping import DEFAULT_THRESHOLD, auto_fill, get_suggestion_index, load_synonyms
+from dto_cache import DtoOptionCache
+from excel_export import generate_excel_pro, generate_project_workbook
+from excel_import import PREFER, import_workbook
+from field_records import json_default
+from mapping_engine import transform_ndjson
+from mapping_table import add_new_fields, build_table, new_endpoint, target_options
+from parallel import batched, map_batches
+from payload_validation import ValidationSpec, validate_payloads, violation_rows
+from postman_import import parse_postman_collection
+from project_store import iter_endpoints, load_project, save_project
+from schema_inference import SchemaStats, add_sample, infer_schema_files
+from traffic_import import analyze_traffic, apply_traffic
+from type_inference import rules_for
+
+PAYLOAD_EXTS = (".json", ".ndjson", ".jsonl", ".xml")
+DIRECTIONS = ("request", "response")
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def new_project(courier_name=""):
+    return {"courier_name": courier_name, "project_notes": "", "dto_library": {}, "endpoints": {}}
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8-sig") as f: return json.load(f)
+
+
+def save_json(obj, path):
+    with open(path, "w", encoding="utf-8") as f: f.write(json.dumps(obj, indent=4, default=json_default))
+
+
+def safe_name(name):
+    return _UNSAFE_NAME.sub("_", name).strip("_") or "endpoint"
+
+
+def payload_target(path, default_direction="request"):
+    """'ruta/orders.response.xml' -> ('orders', 'response')."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    base, _, suffix = stem.rpartition(".")
+    if base and suffix in DIRECTIONS: return base, suffix
+    return stem, default_direction
+
+
+def list_payloads(directory):
+    return sorted(os.path.join(directory, n) for n in os.listdir(directory)
+                  if n.lower().endswith(PAYLOAD_EXTS) and os.path.isfile(os.path.join(directory, n)))
+
+
+# --- ANÁLISIS DE PAYLOADS ---
+def analyze_file(path, rules=None):
+    """Campos de un payload -> {campo: (ejemplo, tipo)}, con el mismo criterio que 'Analizar Payload'.
+
+    Los NDJSON / arrays raíz se tratan como varias muestras y los tipos salen del esquema combinado.
+    """
+    return add_sample(SchemaStats(), path).field_types(rules)
+
+
+def _analyze_batch(batch, rules=None):
+    out = []
+    for path in batch:
+        try:
+            out.append((path, analyze_file(path, rules), None))
+        except Exception as e:
+            out.append((path, None, f"{type(e).__name__}: {e}"))
+    return out
+
+
+def merge_fields(project, endpoint, direction, fields, method="POST"):
+    """Añade al proyecto los campos nuevos (los existentes no se tocan). Devuelve cuántos se añadieron."""
+    ep = project["endpoints"].setdefault(endpoint, new_endpoint(method))
+    return add_new_fields(ep[direction]["field_metadata"], fields)
+
+
+def analyze_payloads(paths, project, direction="request", method="POST", workers=None):
+    """Analiza los payloads en paralelo y los vuelca en `project`. Devuelve (campos añadidos, errores).
+
+    Los tipos siguen las reglas del proyecto (project["type_rules"]) si las tiene.
+    """
+    added, errors = 0, []
+    fn = partial(_analyze_batch, rules=rules_for(project))
+    for results in map_batches(fn, batched(paths, 1), workers=workers):
+        for path, fields, err in results:
+            if err:
+                errors.append((path, err))
+                continue
+            endpoint, d = payload_target(path, direction)
+            added += merge_fields(project, endpoint, d, fields, method)
+    return added, errors
+
+
+# --- EXCELS POR ENDPOINT ---
+_WORKER = {}
+
+
+def _excel_batch(batch):
+    cache = _WORKER.setdefault("dto_cache", DtoOptionCache())
+    out = []
+    for out_path, dto_library, ep_data, direction in batch:
+        try:
+            opts = target_options(dto_library, cache)
+            d = ep_data[direction]
+            df = build_table(d.get("field_metadata", {}), d.get("mapping_rules", {}), opts)
+            with open(out_path, "wb") as f: f.write(generate_excel_pro(df, ep_data.get("extra_metadata", {}), opts))
+            out.append((out_path, len(df), None))
+        except Exception as e:
+            out.append((out_path, 0, f"{type(e).__name__}: {e}"))
+    return out
+
+
+def excel_jobs(project, out_dir):
+    """Un Excel por endpoint y dirección con campos, con el mismo nombre que la descarga de app.py."""
+    for ep_name, ep_data in iter_endpoints(project):
+        for direction in DIRECTIONS:
+            if not ep_data.get(direction, {}).get("field_metadata"): continue
+            out_path = os.path.join(out_dir, f"Map_{safe_name(ep_name)}_{direction}.xlsx")
+            yield out_path, project.get("dto_library", {}), ep_data, direction
+
+
+def export_excels(jobs, workers=None):
+    """Genera los Excels en paralelo. Devuelve [(ruta, filas, error)]."""
+    results = []
+    for out in map_batches(_excel_batch, batched(jobs, 1), workers=workers): results.extend(out)
+    return results
+
+
+# --- COMANDOS ---
+def _report_errors(errors):
+    for path, err in errors: print(f"ERROR {path}: {err}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def _project_out_dir(base, project_path, many):
+    # Con varios proyectos, un subdirectorio por fichero de proyecto (el courier puede repetirse)
+    if not many: return base
+    return os.path.join(base, safe_name(os.path.splitext(os.path.basename(project_path))[0]))
+
+
+def cmd_analyze(args):
+    project = load_project(args.project) if args.project else new_project()
+    if args.courier: project["courier_name"] = args.courier
+    elif not project.get("courier_name"): project["courier_name"] = os.path.basename(os.path.abspath(args.payloads))
+    for p in args.dto or []:
+        project["dto_library"][os.path.splitext(os.path.basename(p))[0]] = load_json(p)
+
+    paths = list_payloads(args.payloads)
+    added, errors = analyze_payloads(paths, project, args.direction, args.method, args.workers)
+    save_project(project, args.output)
+    print(f"{len(paths)} payloads, {added} campos nuevos, {len(project['endpoints'])} endpoints -> {args.output}")
+
+    if args.excel:
+        os.makedirs(args.excel, exist_ok=True)
+        results = export_excels(excel_jobs(project, args.excel), args.workers)
+        print(f"{sum(1 for r in results if not r[2])} Excels -> {args.excel}")
+        errors += [(p, e) for p, _, e in results if e]
+    return _report_errors(errors)
+
+
+def cmd_excel(args):
+    jobs = []
+    many = len(args.projects) > 1
+    for path in args.projects:
+        project = load_project(path)
+        out_dir = _project_out_dir(args.output, path, many)
+        os.makedirs(out_dir, exist_ok=True)
+        if args.workbook:
+            name = project.get("courier_name") or os.path.splitext(os.path.basename(os.path.abspath(path)))[0]
+            out_path = os.path.join(out_dir, f"Spec_{safe_name(name)}.xlsx")
+            print(f"{out_path} ({generate_project_workbook(project, out_path, workers=args.workers)} hojas)")
+            continue
+        jobs.extend(excel_jobs(project, out_dir))
+    results = export_excels(jobs, args.workers)
+    for out_path, n, err in results:
+        if not err: print(f"{out_path} ({n} filas)")
+    return _report_errors([(p, e) for p, _, e in results if e])
+
+
+def cmd_postman(args):
+    project = load_project(args.project) if args.project else new_project()
+    if args.courier: project["courier_name"] = args.courier
+    errors = []
+    new_eps = parse_postman_collection(load_json(args.collection), workers=args.workers, rules=rules_for(project),
+                                       progress=lambda d, t: print(f"\r{d}/{t} endpoints analizados", end="",
+                                                                   file=sys.stderr), errors=errors)
+    print(file=sys.stderr)
+    for k, v in new_eps.items():
+        if k not in project["endpoints"]: project["endpoints"][k] = v
+    save_project(project, args.output)
+    print(f"{len(new_eps)} endpoints en la colección, {len(project['endpoints'])} en el proyecto -> {args.output}")
+    return _report_errors(errors)
+
+
+def cmd_schema(args):
+    paths = []
+    for p in args.samples:
+        paths.extend(list_payloads(p) if os.path.isdir(p) else [p])
+    schema = infer_schema_files(paths, workers=args.workers)
+    save_json(schema.summary(), args.output)
+    print(f"{len(paths)} ficheros, {schema.records} registros, {len(schema)} rutas -> {args.output}")
+    return _report_errors(schema.errors)
+
+
+def cmd_traffic(args):
+    project = load_project(args.project) if args.project else new_project()
+    if args.courier: project["courier_name"] = args.courier
+    traffic = analyze_traffic(args.captures, workers=args.workers,
+                              progress=lambda n: print(f"\r{n} llamadas procesadas", end="", file=sys.stderr))
+    print(file=sys.stderr)
+    n_eps, n_fields = apply_traffic(project, traffic)
+    save_project(project, args.output)
+    print(f"{traffic.calls} llamadas, {len(traffic.groups)} endpoints ({n_eps} nuevos), {n_fields} campos nuevos "
+          f"-> {args.output}")
+    return 0
+
+
+def cmd_automap(args):
+    project = load_project(args.project)
+    synonyms = load_synonyms(args.synonyms) if args.synonyms else None
+    index = get_suggestion_index(target_options(project["dto_library"], DtoOptionCache()), synonyms)
+    total = 0
+    for name in list(project["endpoints"]):
+        ep = project["endpoints"][name]
+        for direction in DIRECTIONS:
+            data = ep.get(direction) or {}
+            if not data.get("field_metadata"): continue
+            added = auto_fill(data.setdefault("mapping_rules", {}), data["field_metadata"], index, args.threshold)
+            if added: print(f"{name} [{direction}]: {len(added)} campos mapeados")
+            total += len(added)
+    save_project(project, args.output)
+    print(f"{total} mapeos nuevos (confianza >= {args.threshold}) -> {args.output}")
+    return 0
+
+
+def cmd_validate(args):
+    project = load_project(args.project)
+    if args.endpoint not in project["endpoints"]:
+        print(f"ERROR {args.project}: no existe el endpoint '{args.endpoint}'", file=sys.stderr)
+        return 1
+    spec = ValidationSpec.from_project(project, args.endpoint, args.direction)
+    report = validate_payloads(args.payloads, spec, workers=args.workers,
+                               progress=lambda n: print(f"\r{n} registros validados", end="", file=sys.stderr))
+    print(file=sys.stderr)
+    summary = report.summary(spec)
+    save_json(summary, args.output)
+    rows = violation_rows(summary)
+    for r in rows[:args.top]:
+        print(f"{r['Campo']}: requerido={r['Requerido']} tipo={r['Tipo']} tamaño={r['Tamaño']}  ej. {r['Ejemplo']}")
+    print(f"{report.records} registros, {summary['violations']} violaciones en {len(rows)} campos, "
+          f"{len(summary['unknown_fields'])} campos no documentados -> {args.output}")
+    # Para certificar el mapeo (p. ej. en CI): sale con 1 si hay violaciones o registros ilegibles
+    return _report_errors(report.errors) or (1 if summary["violations"] else 0)
+
+
+def cmd_import_excel(args):
+    project = load_project(args.project)
+    try:
+        report = import_workbook(project, args.workbook, args.endpoint, args.direction, args.prefer)
+    except ValueError as e:
+        print(f"ERROR {args.workbook}: {e}", file=sys.stderr)
+        return 1
+    for c in report["conflict_rows"][:args.top]:
+        print(f"CONFLICTO {c['Campo']} [{c['Columna']}]: app={c['App']!r} excel={c['Excel']!r} -> {c['Aplicado']}")
+    if report["skipped"]: print("Hojas sin endpoint en el proyecto: " + ", ".join(report["skipped"]), file=sys.stderr)
+    save_project(project, args.output)
+    print(f"{report['rows']} filas en {len(report['sheets'])} hoja(s): {report['updated_fields']} campos "
+          f"actualizados, {report['new_fields']} nuevos, {report['changes']} cambios, {report['conflicts']} "
+          f"conflictos -> {args.output}")
+    return 0
+
+
+def cmd_transform(args):
+    project = load_project(args.project)
+    if args.endpoint not in project["endpoints"]:
+        print(f"ERROR {args.project}: no existe el endpoint '{args.endpoint}'", file=sys.stderr)
+        return 1
+    rules = (project["endpoints"][args.endpoint].get(args.direction) or {}).get("mapping_rules") or {}
+    if not rules:
+        print(f"ERROR {args.project}: '{args.endpoint}' [{args.direction}] no tiene mapping_rules", file=sys.stderr)
+        return 1
+    try:
+        stats = transform_ndjson(args.input, args.output, rules, workers=args.workers)
+    except ValueError as e:  # targets que chocan entre sí o líneas que no son JSON
+        print(f"ERROR {args.input}: {e}", file=sys.stderr)
+        return 1
+    print(f"{stats['records']} registros transformados con {len(rules)} reglas en {stats['seconds']} s "
+          f"({stats['records_per_second']} reg/s) -> {args.output}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="batch_cli", description="Mapper Pro por lotes (sin Streamlit)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("analyze", help="Analiza un directorio de payloads y genera el proyecto JSON")
+    p.add_argument("payloads", help="Directorio con payloads .json/.ndjson/.jsonl/.xml")
+    p.add_argument("-o", "--output", required=True, help="Proyecto JSON de salida")
+    p.add_argument("--project", help="Proyecto existente al que añadir los campos")
+    p.add_argument("--courier", help="Nombre del courier (por defecto, el del directorio)")
+    p.add_argument("--direction", choices=DIRECTIONS, default="request")
+    p.add_argument("--method", default="POST", help="Método de los endpoints nuevos")
+    p.add_argument("--dto", action="append", help="JSON de DTO a añadir a la librería (repetible)")
+    p.add_argument("--excel", help="Directorio donde generar también los Excels")
+    p.add_argument("-w", "--workers", type=int, help="Procesos en paralelo (por defecto, nº de CPUs - 1)")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("excel", help="Regenera los Excels de todos los endpoints de uno o varios proyectos")
+    p.add_argument("projects", nargs="+", help="Proyectos JSON o carpetas de proyecto")
+    p.add_argument("-o", "--output", required=True, help="Directorio de salida (un subdirectorio por proyecto si hay varios)")
+    p.add_argument("--workbook", action="store_true",
+                   help="Un solo libro por proyecto (una hoja por endpoint/dirección + índice)")
+    p.add_argument("-w", "--workers", type=int, help="Procesos en paralelo (por defecto, nº de CPUs - 1)")
+    p.set_defaults(func=cmd_excel)
+
+    p = sub.add_parser("postman", help="Crea los endpoints de una colección de Postman con sus cuerpos analizados")
+    p.add_argument("collection", help="Colección de Postman (JSON)")
+    p.add_argument("-o", "--output", required=True, help="Proyecto JSON de salida")
+    p.add_argument("--project", help="Proyecto existente al que añadir los endpoints")
+    p.add_argument("--courier", help="Nombre del courier")
+    p.add_argument("-w", "--workers", type=int, help="Procesos en paralelo (por defecto, nº de CPUs - 1)")
+    p.set_defaults(func=cmd_postman)
+
+    p = sub.add_parser("schema", help="Esquema combinado (tipos, nulos, presencia, longitudes) de muchas muestras")
+    p.add_argument("samples", nargs="+", help="Ficheros o directorios de muestras .json/.ndjson/.jsonl/.xml")
+    p.add_argument("-o", "--output", required=True, help="Informe JSON de salida")
+    p.add_argument("-w", "--workers", type=int, help="Procesos en paralelo (por defecto, nº de CPUs - 1)")
+    p.set_defaults(func=cmd_schema)
+
+    p = sub.add_parser("traffic", help="Importa capturas HAR / NDJSON agrupando por método y ruta")
+    p.add_argument("captures", nargs="+", help="Ficheros .har / .ndjson / .jsonl")
+    p.add_argument("-o", "--output", required=True, help="Proyecto JSON de salida")
+    p.add_argument("--project", help="Proyecto existente al que añadir endpoints y campos")
+    p.add_argument("--courier", help="Nombre del courier")
+    p.add_argument("-w", "--workers", type=int, help="Procesos en paralelo (por defecto, nº de CPUs - 1)")
+    p.set_defaults(func=cmd_traffic)
+
+    p = sub.add_parser("automap", help="Rellena los mapping_rules sin asignar con las sugerencias más fiables")
+    p.add_argument("project", help="Proyecto JSON o carpeta de proyecto")
+    p.add_argument("-o", "--output", required=True, help="Proyecto de salida")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Confianza mínima (0-1)")
+    p.add_argument("--synonyms", help="JSON de sinónimos extra {palabra: equivalente}")
+    p.set_defaults(func=cmd_automap)
+
+    p = sub.add_parser("validate", help="Valida payloads reales contra requerido / tipo / tamaño de un endpoint")
+    p.add_argument("project", help="Proyecto JSON o carpeta de proyecto")
+    p.add_argument("payloads", nargs="+", help="Ficheros o directorios .json/.ndjson/.jsonl/.xml")
+    p.add_argument("--endpoint", required=True, help="Endpoint cuyos field_metadata se comprueban")
+    p.add_argument("--direction", choices=DIRECTIONS, default="request")
+    p.add_argument("-o", "--output", required=True, help="Informe JSON de salida")
+    p.add_argument("--top", type=int, default=20, help="Campos con más violaciones a mostrar")
+    p.add_argument("-w", "--workers", type=int, help="Procesos en paralelo (por defecto, nº de CPUs - 1)")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("import-excel", help="Vuelca en el proyecto un Excel editado (de un endpoint o del proyecto)")
+    p.add_argument("project", help="Proyecto JSON o carpeta de proyecto")
+    p.add_argument("workbook", help="Excel de un endpoint (hoja Mapeo) o libro del proyecto (con Índice)")
+    p.add_argument("-o", "--output", required=True, help="Proyecto de salida")
+    p.add_argument("--endpoint", help="Endpoint en el que importar un Excel de un solo endpoint")
+    p.add_argument("--direction", choices=DIRECTIONS, default="request")
+    p.add_argument("--prefer", choices=PREFER, default="excel", help="Qué valor gana si la app y el Excel difieren")
+    p.add_argument("--top", type=int, default=20, help="Conflictos a mostrar")
+    p.set_defaults(func=cmd_import_excel)
+
+    p = sub.add_parser("transform", help="Pasa payloads reales (NDJSON) por los mapping_rules de un endpoint")
+    p.add_argument("project", help="Proyecto JSON o carpeta de proyecto")
+    p.add_argument("input", help="NDJSON de entrada (un payload del courier por línea)")
+    p.add_argument("--endpoint", required=True, help="Endpoint cuyos mapping_rules se aplican")
+    p.add_argument("--direction", choices=DIRECTIONS, default="request")
+    p.add_argument("-o", "--output", required=True, help="NDJSON de salida (forma del estándar interno)")
+    p.add_argument("-w", "--workers", type=int, help="Procesos en paralelo (por defecto, nº de CPUs - 1)")
+    p.set_defaults(func=cmd_transform)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+# --- UTILIDADES COMUNES DE LOS BENCHMARKS ---
+import os
+import sys
+import time
+import tracemalloc
+
+# Permite ejecutar "python benchmarks/bench_x.py" desde la raíz del repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+
+def best_of(fn, repeat=3):
+    """Mejor tiempo (s) de `repeat` ejecuciones y el resultado de la última."""
+    best, res = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = fn()
+        dt = time.perf_counter() - t0
+        if best is None or dt < best: best = dt
+    return best, res
+
+
+def report(name, seconds, extra=""):
+    print(f"{name:<40} {seconds * 1000:10.1f} ms  {extra}")
+
+
+def peak_memory(fn):
+    """Pico de memoria Python (bytes, tracemalloc) de una ejecución de fn, aparte del cronometraje."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,49 @@
+# --- BENCHMARK: generate_excel_pro CON TABLAS GRANDES ---
+# Mide tiempo y pico de memoria Python (tracemalloc) con y sin constant_memory. El tiempo
+# se mide en una ejecución sin tracemalloc (que lo inflaría) y la memoria en otra aparte.
+# Uso: python benchmarks/bench_excel_export.py [filas ...]
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from _common import report
+from excel_export import generate_excel_pro
+from mapping_table import STATUS_OPTS
+
+COLS = ["Estado", "Campo Courier", "Target (DTO)", "Ejemplo", "Tipo", "Requerido", "Doc",
+        "Coment. Analista", "Coment. TL", "Coment. Dev"]
+
+
+def make_table(n):
+    return pd.DataFrame({
+        "Estado": [STATUS_OPTS[i % len(STATUS_OPTS)] for i in range(n)],
+        "Campo Courier": [f"listaSolicitacoes.item{i}.campo" for i in range(n)],
+        "Target (DTO)": [f"[Dto] order.f{i % 500} | String" if i % 3 else "SELECCIONAR_CAMPO" for i in range(n)],
+        "Ejemplo": [f"valor {i}" for i in range(n)],
+        "Tipo": ["String"] * n, "Requerido": ["Sí" if i % 2 else "?" for i in range(n)],
+        "Doc": [""] * n, "Coment. Analista": [""] * n, "Coment. TL": [""] * n, "Coment. Dev": [""] * n,
+    }, columns=COLS)
+
+
+def main(*sizes):
+    sizes = sizes or (1000, 10000, 50000)
+    opts = ["IGNORED_FIELD", "SELECCIONAR_CAMPO"] + [f"[Dto] order.f{i} | String" for i in range(5000)]
+    extras = {"URL": "https://api.courier/v1", "Auth": "Bearer"}
+    for n in sizes:
+        df = make_table(n)
+        for cm in (False, True):
+            t0 = time.perf_counter()
+            data = generate_excel_pro(df, extras, opts, constant_memory=cm)
+            dt = time.perf_counter() - t0
+            tracemalloc.start()
+            generate_excel_pro(df, extras, opts, constant_memory=cm)
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            report(f"{n} filas constant_memory={cm}", dt, f"pico {peak:7.1f} MB  xlsx {len(data) / 1e6:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:]]))
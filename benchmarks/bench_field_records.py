@@ -0,0 +1,66 @@
+# --- BENCHMARK: MEMORIA DE field_metadata (DICTS vs FieldRecord) ---
+# Memoria retenida (tracemalloc) por el proyecto cargado con los metadatos como dicts
+# (json.loads tal cual) y compactados en FieldRecord, coste de la conversión, acceso
+# por clave y comprobación de que el JSON vuelve a salir idéntico.
+# Uso: python benchmarks/bench_field_records.py [n_endpoints] [n_campos]
+import gc
+import json
+import sys
+import tracemalloc
+
+from _common import best_of, report
+from generators import make_project
+
+from field_records import compact_project, json_default
+
+
+def retained(fn):
+    """(resultado, bytes que siguen ocupados por él al terminar fn)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        out = fn()
+        gc.collect()
+        return out, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def _metas(project):
+    return [m for ep in project["endpoints"].values() for d in ("request", "response")
+            for m in ep[d]["field_metadata"].values()]
+
+
+def main(n_endpoints=50, n_fields=1000):
+    raw = json.dumps(make_project(n_endpoints=n_endpoints, n_fields=n_fields, n_dtos=2, dto_fields=50, seed=7),
+                     indent=4, default=json_default)
+    n = n_endpoints * n_fields * 2
+    print(f"endpoints={n_endpoints} campos={n} json={len(raw) / 1e6:.1f} MB")
+
+    plain, m_dict = retained(lambda: json.loads(raw))
+    del plain
+    compact, m_rec = retained(lambda: compact_project(json.loads(raw)))
+    print(f"{'dicts (json.loads)':<40} {m_dict / 1e6:10.1f} MB  {m_dict / n:.0f} B/campo")
+    print(f"{'FieldRecord (compact_project)':<40} {m_rec / 1e6:10.1f} MB  {m_rec / n:.0f} B/campo"
+          f"  -{(1 - m_rec / m_dict) * 100:.0f}%")
+
+    assert json.dumps(compact, indent=4, default=json_default) == raw, "el JSON de los FieldRecord difiere"
+    plain = json.loads(raw)
+    t_load, _ = best_of(lambda: json.loads(raw))
+    t_comp, _ = best_of(lambda: compact_project(json.loads(raw)), repeat=1)
+    report("json.loads", t_load)
+    report("json.loads + compact_project", t_comp, f"+{(t_comp - t_load) * 1000:.0f} ms")
+    for label, p in (("get dict", plain), ("get FieldRecord", compact)):
+        metas = _metas(p)
+        t, _ = best_of(lambda: [m.get("status_tag") for m in metas])
+        report(f"{label} ({len(metas)} campos)", t)
+
+    # Regresión: los registros deben ocupar claramente menos que los dicts
+    if m_rec > m_dict * 0.7:
+        print("REGRESIÓN: FieldRecord no ahorra al menos un 30% de memoria")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:3]]))
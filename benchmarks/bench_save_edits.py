@@ -0,0 +1,92 @@
+# --- BENCHMARK: GUARDADO DEL EDITOR (iterrows vs columnar) ---
+# Comprueba que el JSON del proyecto sale idéntico byte a byte y compara tiempos.
+# Uso: python benchmarks/bench_save_edits.py [n_campos]
+import json
+import random
+import sys
+
+import pandas as pd
+
+from _common import best_of, report
+from field_records import json_default
+from mapping_table import STATUS_OPTS, collect_edits, collect_local_edits
+
+
+def legacy_app(edited):
+    nm, nmt = {}, {}
+    for _, r in edited.iterrows():
+        c_courier = r.get("Campo Courier")
+        if not c_courier or pd.isna(c_courier): continue
+        c_courier = str(c_courier).strip()
+        tgt_val = r["Target (DTO)"]
+        clean_target = tgt_val.split(" | ")[0] if " | " in tgt_val else tgt_val
+        if "SELECCIONAR" not in clean_target and "IGNORED" not in clean_target: nm[clean_target] = c_courier
+        nmt[c_courier] = {
+            "required": r.get("Requerido", "?"), "comment_tl": r.get("Coment. TL", ""),
+            "comment_analyst": r.get("Coment. Analista", ""), "comment_dev": r.get("Coment. Dev", ""),
+            "example_value": r.get("Ejemplo", ""), "type": r.get("Tipo", "String"),
+            "is_done": ("SELECCIONAR" not in clean_target), "status_tag": r["Estado"], "doc_desc": r.get("Doc", "")
+        }
+    return nm, nmt
+
+
+def legacy_local(edited):
+    f_map, f_meta, f_done = {}, {}, 0
+    for _, r in edited.iterrows():
+        if "SELECCIONAR" not in r["Valor (HD)"] and "IGNORED" not in r["Valor (HD)"]:
+            f_map[r["Valor (HD)"].split(" | ")[0]] = r["Campo del Courier"]
+        if r["Done"]: f_done += 1
+        f_meta[r["Campo del Courier"]] = {
+            "required": r["Requerido"], "comment_tl": r["Comentario TL"],
+            "example_value": r["Valor de ejemplo"], "type": r["Tipo de atributo"],
+            "is_done": r["Done"], "status_tag": r["Estado"],
+            "comment_dev": r["Comentario Desarrollador"], "comment_analyst": r["Comentario Analista"],
+            "size_limit": r["Limite de tamaño"], "doc_desc": r["Descripción Docs"]
+        }
+    return f_map, f_meta, f_done
+
+
+def _target(rnd):
+    return rnd.choice(["SELECCIONAR_CAMPO", "IGNORED_FIELD", f"[Dto] order.f{rnd.randint(0, 999)} | String",
+                       f"[Dto] order.g{rnd.randint(0, 99)}"])
+
+
+def make_app_table(n, seed=1):
+    rnd = random.Random(seed)
+    rows = [{
+        "Estado": rnd.choice(STATUS_OPTS), "Campo Courier": rnd.choice([f" campo.{i} ", f"campo.{i}", None, ""]),
+        "Target (DTO)": _target(rnd), "Ejemplo": rnd.choice(["x", "", None]), "Tipo": "String",
+        "Requerido": rnd.choice(["Sí", "No", "?", None]), "Doc": "", "Coment. Analista": rnd.choice(["", "ok"]),
+        "Coment. TL": "", "Coment. Dev": ""} for i in range(n)]
+    return pd.DataFrame(rows)
+
+
+def make_local_table(n, seed=1):
+    rnd = random.Random(seed)
+    rows = [{
+        "Done": rnd.random() < 0.5, "Estado": rnd.choice(STATUS_OPTS), "Campo del Courier": f"campo.{i % (n - 5)}",
+        "Valor (HD)": _target(rnd), "Valor de ejemplo": "x", "Tipo de atributo": "String",
+        "Requerido": rnd.choice(["Sí", "?"]), "Limite de tamaño": rnd.choice(["", "10"]), "Descripción Docs": "",
+        "Comentario TL": "", "Comentario Desarrollador": None, "Comentario Analista": ""} for i in range(n)]
+    return pd.DataFrame(rows)
+
+
+def main(n=5000):
+    df = make_app_table(n)
+    t_old, r_old = best_of(lambda: legacy_app(df), repeat=1)
+    t_new, r_new = best_of(lambda: collect_edits(df))
+    assert json.dumps(r_old, indent=4) == json.dumps(r_new, indent=4, default=json_default), "app.py: el JSON guardado difiere"
+    report(f"app.py iterrows ({n} filas)", t_old)
+    report(f"app.py columnar ({n} filas)", t_new, f"x{t_old / max(t_new, 1e-9):.0f}")
+
+    df = make_local_table(n)
+    t_old, r_old = best_of(lambda: legacy_local(df), repeat=1)
+    t_new, r_new = best_of(lambda: collect_local_edits(df))
+    assert json.dumps(r_old, indent=4) == json.dumps(r_new, indent=4, default=json_default), "mapper_tool.py: el JSON guardado difiere"
+    report(f"mapper_tool.py iterrows ({n} filas)", t_old)
+    report(f"mapper_tool.py columnar ({n} filas)", t_new, f"x{t_old / max(t_new, 1e-9):.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:2]]))
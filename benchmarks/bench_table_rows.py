@@ -0,0 +1,77 @@
+# --- BENCHMARK: RECUPERACIÓN DE TARGETS AL CONSTRUIR LA TABLA ---
+# Compara el recorrido antiguo (reglas x opciones por campo) con los índices de mapping_table.
+# Uso: python benchmarks/bench_table_rows.py [n_campos] [n_opciones]
+import sys
+
+from _common import best_of, report
+from mapping_table import TableIndex, get_table_index
+
+
+def make_case(n_fields, n_opts):
+    fields = [f"listaSolicitacoes.item{i}.campo{i}" for i in range(n_fields)]
+    opts = ["SELECCIONAR_CAMPO", "IGNORED_FIELD"] + sorted(f"[Dto] order.f{i} | String" for i in range(n_opts))
+    # Se mapea 2/3 de los campos; algunos targets ya no existen en el DTO
+    rules = {}
+    for i, k in enumerate(fields):
+        if i % 3 == 0: continue
+        rules[f"[Dto] order.f{i % n_opts}" if i % 7 else f"[Old] gone.f{i}"] = k
+    return fields, rules, opts
+
+
+def legacy_app(fields, rules, opts):
+    out = []
+    for k in fields:
+        tgt = "SELECCIONAR_CAMPO"
+        for t, s in rules.items():
+            if s == k:
+                tgt = next((o for o in opts if t == o.split(" | ")[0]), t)
+                break
+        out.append(tgt)
+    return out
+
+
+def legacy_local(fields, rules, opts):
+    out = []
+    for k in fields:
+        tgt = "SELECCIONAR_CAMPO"
+        for t, s in rules.items():
+            if s == k:
+                for o in opts:
+                    if t == o.split(" | ")[0]: tgt = o; break
+                break
+        out.append(tgt)
+    return out
+
+
+def indexed(fields, rules, opts, keep_unknown=True):
+    ti = get_table_index(rules, opts)
+    return [ti.resolve(k, keep_unknown=keep_unknown) for k in fields]
+
+
+def main(n_fields=3000, n_opts=5000):
+    fields, rules, opts = make_case(n_fields, n_opts)
+    print(f"campos={n_fields} reglas={len(rules)} opciones={len(opts)}")
+
+    t_old, r_old = best_of(lambda: legacy_app(fields, rules, opts), repeat=1)
+    t_build, _ = best_of(lambda: TableIndex(rules, opts))
+    t_new, r_new = best_of(lambda: indexed(fields, rules, opts))
+    assert r_old == r_new, "app.py: el resultado indexado difiere del recorrido antiguo"
+    report("app.py legacy", t_old)
+    report("app.py índice (construcción)", t_build)
+    report("app.py índice (rerun, cacheado)", t_new, f"x{t_old / max(t_new, 1e-9):.0f}")
+
+    t_old, r_old = best_of(lambda: legacy_local(fields, rules, opts), repeat=1)
+    t_new, r_new = best_of(lambda: indexed(fields, rules, opts, keep_unknown=False))
+    assert r_old == r_new, "mapper_tool.py: el resultado indexado difiere del recorrido antiguo"
+    report("mapper_tool.py legacy", t_old)
+    report("mapper_tool.py índice (rerun, cacheado)", t_new, f"x{t_old / max(t_new, 1e-9):.0f}")
+
+    # Regresión: el camino indexado debe ser lineal y muy por debajo del antiguo
+    if t_new * 10 > t_old:
+        print("REGRESIÓN: la construcción indexada no es al menos 10x más rápida")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:3]]))
@@ -0,0 +1,75 @@
+# --- BENCHMARK: XML EN STREAMING vs xmltodict.parse + flatten_payload ---
+# Cada ruta se ejecuta en un proceso nuevo para medir su pico de RSS por separado.
+# Uso: python benchmarks/bench_xml_stream.py [n_elementos]
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from _common import report
+
+
+def make_soap(path, n_items):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="urn:courier">'
+                '<soap:Header><ns:Auth token="abc"/></soap:Header><soap:Body><ns:ConsultaResponse>\n')
+        for i in range(n_items):
+            f.write(f'  <ns:Objeto id="{i}" tipo="{"E" if i % 2 else "R"}"><ns:Codigo>OB{i:09d}BR</ns:Codigo>'
+                    f'<ns:Destinatario><ns:Nome>Cliente {i}</ns:Nome><ns:Cep>0{i % 99999:05d}</ns:Cep></ns:Destinatario>'
+                    f'<ns:Eventos><ns:Evento data="2024-01-{i % 28 + 1:02d}">Postado</ns:Evento>'
+                    f'<ns:Evento data="2024-02-01">Entregue</ns:Evento></ns:Eventos>'
+                    f'{"<ns:Obs>fragil</ns:Obs>" if i % 5 == 0 else ""}</ns:Objeto>\n')
+        f.write('</ns:ConsultaResponse></soap:Body></soap:Envelope>\n')
+
+
+def _rss_mb():
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / (1024 * 1024) if sys.platform == "darwin" else r / 1024
+
+
+def _run(route, path, q):
+    import xmltodict
+    from flatten_engine import flatten_payload
+    from xml_stream import stream_xml
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    if route == "xmltodict":
+        with open(path, "rb") as f: flat = flatten_payload(xmltodict.parse(f.read()))
+    else:
+        flat = stream_xml(path, merge_arrays=False).examples()
+    q.put((time.perf_counter() - t0, _rss_mb() - base, flat))
+
+
+def run_route(route, path):
+    ctx = mp.get_context("spawn")
+    q = ctx.Queue()
+    p = ctx.Process(target=_run, args=(route, path, q))
+    p.start()
+    res = q.get()
+    p.join()
+    return res
+
+
+def main(n_items=100000):
+    fd, path = tempfile.mkstemp(suffix=".xml")
+    os.close(fd)
+    try:
+        make_soap(path, n_items)
+        mb = os.path.getsize(path) / 1e6
+        print(f"SOAP con {n_items} elementos repetidos: {mb:.1f} MB")
+        results = {}
+        for route in ("xmltodict", "stream_xml"):
+            dt, rss, flat = results[route] = run_route(route, path)
+            report(route, dt, f"{mb / dt:6.1f} MB/s  pico RSS +{rss:.0f} MB")
+        assert list(results["xmltodict"][2].items()) == list(results["stream_xml"][2].items()), \
+            "stream_xml no produce las mismas rutas/ejemplos que xmltodict + flatten_payload"
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:2]]))
@@ -0,0 +1,132 @@
+# --- GENERADORES DE ENTRADAS SINTÉTICAS ---
+# Payloads, colecciones de Postman y proyectos con la forma de los reales (nombres de
+# courier en portugués/español, arrays de ítems, DTOs anidados). Todo es determinista
+# a partir de `seed` para que dos versiones se midan con exactamente la misma entrada.
+import json
+import random
+from xml.sax.saxutils import escape
+
+from flatten_engine import flatten_payload
+from mapping_table import STATUS_OPTS, new_endpoint, new_field_metadata
+
+KEYS = ["id", "codigo", "numPedido", "dtCriacao", "valorTotal", "peso", "qtdVolumes", "is_fragil", "flagSeguro",
+        "nome", "descricao", "cpf", "cnpj", "cep", "logradouro", "cidade", "uf", "telefone", "email", "status",
+        "price", "items", "listaSolicitacoes", "remetente", "destinatario", "endereco", "dimensoes", "servico"]
+TYPES = ["String", "Integer", "Decimal", "Boolean", "DateTime"]
+
+
+def _key(rnd, i):
+    return f"{rnd.choice(KEYS)}{i}"
+
+
+def _scalar(rnd, key):
+    k = key.lower()
+    r = rnd.random()
+    if r < 0.08: return None
+    if "dt" in k: return f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T10:00:00"
+    if any(x in k for x in ("valor", "peso", "price")): return round(rnd.uniform(0, 5000), 2)
+    if any(x in k for x in ("qtd", "id", "num")): return rnd.randint(0, 10 ** 6)
+    if any(x in k for x in ("is_", "flag")): return rnd.random() < 0.5
+    return "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(rnd.randint(3, 40)))
+
+
+def make_json_payload(depth=4, width=8, array_len=3, seed=0):
+    """Objeto de `depth` niveles con `width` claves por nivel; 1 de cada 4 hijos es un array de objetos."""
+    rnd = random.Random(seed)
+
+    def build(level):
+        obj = {}
+        for i in range(width):
+            k = _key(rnd, i)
+            if level < depth and i % 4 == 0:
+                obj[k] = [build(level + 1) for _ in range(array_len)]
+            elif level < depth and i % 4 == 1:
+                obj[k] = build(level + 1)
+            else:
+                obj[k] = _scalar(rnd, k)
+        return obj
+
+    return build(1)
+
+
+def make_json_records(n, depth=3, width=8, array_len=2, seed=0):
+    """Lista de `n` payloads con la misma forma y valores distintos (muestras de un mismo endpoint)."""
+    return [make_json_payload(depth, width, array_len, seed=seed * 100003 + i) for i in range(n)]
+
+
+def _xml(obj, tag, out):
+    if isinstance(obj, dict):
+        out.append(f"<{tag}>")
+        for k, v in obj.items():
+            for item in (v if isinstance(v, list) else [v]): _xml(item, k, out)
+        out.append(f"</{tag}>")
+    elif obj is None:
+        out.append(f"<{tag}/>")
+    else:
+        out.append(f"<{tag}>{escape(str(obj))}</{tag}>")
+
+
+def make_xml_payload(depth=4, width=8, array_len=3, seed=0):
+    """El mismo árbol que make_json_payload serializado como XML (los arrays son tags repetidos)."""
+    out = ['<?xml version="1.0" encoding="UTF-8"?>']
+    _xml(make_json_payload(depth, width, array_len, seed), "envelope", out)
+    return "".join(out)
+
+
+def make_postman_collection(n_requests=500, folders=20, depth=2, body_width=12, seed=0):
+    """Colección v2.1 con carpetas anidadas y cuerpos JSON en las peticiones POST."""
+    rnd = random.Random(seed)
+
+    def request(i):
+        method = rnd.choice(["GET", "POST", "POST", "PUT"])
+        req = {"method": method, "header": [{"key": "Content-Type", "value": "application/json"}],
+               "url": {"raw": f"https://api.courier.test/v1/recurso{i}", "host": ["api", "courier", "test"],
+                       "path": ["v1", f"recurso{i}"]}}
+        if method != "GET":
+            req["body"] = {"mode": "raw", "raw": json.dumps(make_json_payload(3, body_width, 2, seed=seed + i)),
+                           "options": {"raw": {"language": "json"}}}
+        return {"name": f"endpoint_{i}", "request": req, "response": []}
+
+    def folder(level, items):
+        if level >= depth or len(items) <= 1: return items
+        k = max(1, len(items) // folders)
+        return [{"name": f"carpeta_{level}_{j}", "item": folder(level + 1, items[j:j + k])}
+                for j in range(0, len(items), k)]
+
+    items = [request(i) for i in range(n_requests)]
+    return {"info": {"name": "Courier Bench", "schema": "https://schema.getpostman.com/json/collection/v2.1.0/"},
+            "item": folder(0, items)}
+
+
+def make_dto(n_fields=200, depth=3, seed=0):
+    """DTO con `n_fields` hojas repartidas en `depth` niveles; los valores son nombres de tipo."""
+    rnd = random.Random(seed)
+    dto = {}
+    for i in range(n_fields):
+        node = dto
+        for d in range(rnd.randint(0, depth - 1)):
+            node = node.setdefault(f"grupo{rnd.randint(0, 5)}_{d}", {})
+        node[f"campo{i}"] = rnd.choice(TYPES)
+    return dto
+
+
+def make_project(n_endpoints=50, n_fields=200, n_dtos=10, dto_fields=300, mapped=0.6, seed=0):
+    """Proyecto de app.py con endpoints, metadatos de campo, reglas de mapeo y librería de DTOs."""
+    rnd = random.Random(seed)
+    lib = {f"Dto{j}": make_dto(dto_fields, seed=seed + j) for j in range(n_dtos)}
+    targets = [f"[{n}] {p}" for n, d in lib.items() for p in flatten_payload(d)]
+
+    endpoints = {}
+    for e in range(n_endpoints):
+        ep = new_endpoint(rnd.choice(["GET", "POST"]))
+        ep["extra_metadata"] = {"URL": f"https://api.courier.test/v1/ep{e}", "Auth": "Bearer"}
+        for direction in ("request", "response"):
+            meta, rules = ep[direction]["field_metadata"], ep[direction]["mapping_rules"]
+            for i in range(n_fields):
+                k = f"{_key(rnd, i)}.{_key(rnd, i + 1)}"
+                v = _scalar(rnd, k)
+                m = meta[k] = new_field_metadata(str(v)[:100], rnd.choice(TYPES))
+                m["status_tag"] = rnd.choice(STATUS_OPTS)
+                if rnd.random() < mapped: rules[rnd.choice(targets)] = k
+        endpoints[f"endpoint_{e}"] = ep
+    return {"courier_name": "Courier Bench", "project_notes": "", "dto_library": lib, "endpoints": endpoints}
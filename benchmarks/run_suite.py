@@ -0,0 +1,198 @@
+# --- SUITE DE BENCHMARKS DE LAS RUTAS CALIENTES ---
+# Mide tiempo (mejor de N) y pico de memoria Python (tracemalloc) de cada caso con
+# entradas sintéticas de generators.py, y guarda los resultados en JSON para comparar
+# entre versiones.
+# Uso:
+#   python benchmarks/run_suite.py [-o resultados.json] [--scale 0.2] [--only flatten,excel]
+#   python benchmarks/run_suite.py --compare base.json [--threshold 1.25]   (sale con 1 si hay regresiones)
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from _common import ROOT, best_of, peak_memory
+from generators import make_json_payload, make_postman_collection, make_project, make_xml_payload
+
+from auto_mapping import SuggestionIndex, suggest_unmapped
+from dto_cache import DtoOptionCache
+from excel_export import generate_excel_pro, generate_project_workbook
+from excel_import import import_mapping_excel
+from field_records import compact_project, json_default
+from flatten_engine import flatten_payload
+from mapping_table import build_table, collect_edits, new_field_metadata, target_options
+from payload_validation import ValidationSpec, validate_records
+from postman_import import parse_postman_collection
+from project_store import export_bytes
+from schema_inference import SchemaStats
+from type_inference import TypeRules, infer_smart_type
+from xml_stream import stream_xml
+
+RESULTS_FORMAT = 1
+MIN_RUN_SECONDS = 0.05  # los casos muy rápidos se repiten en bucle hasta este tiempo para reducir ruido
+
+
+def _n(base, scale, minimum=1):
+    return max(minimum, int(base * scale))
+
+
+def build_cases(scale=1.0):
+    """[(nombre, parámetros, fn)] con las entradas ya generadas (la generación no se mide)."""
+    cases = []
+
+    # Payloads profundos / anchos
+    for label, depth, width, arr in (("deep", 8, 4, 2), ("wide", 2, _n(150, scale, 8), 3)):
+        payload = make_json_payload(depth, width, arr, seed=1)
+        params = {"depth": depth, "width": width, "array_len": arr}
+        cases.append((f"flatten_payload.{label}", params, lambda p=payload: flatten_payload(p)))
+        cases.append((f"flatten_payload.{label}.merge", params,
+                      lambda p=payload: flatten_payload(p, merge_arrays=True, array_suffix="")))
+        xml = make_xml_payload(depth, width, arr, seed=1).encode("utf-8")
+        cases.append((f"stream_xml.{label}", dict(params, bytes=len(xml)),
+                      lambda x=xml: stream_xml(io.BytesIO(x)).examples()))
+
+    leaves = list(flatten_payload(make_json_payload(4, _n(60, scale, 8), 3, seed=2), merge_arrays=True).items())
+    leaves = (leaves * (_n(20000, scale, 100) // max(1, len(leaves)) + 1))[:_n(20000, scale, 100)]
+    cases.append(("infer_smart_type", {"values": len(leaves)},
+                  lambda: [infer_smart_type(k, v) for k, v in leaves]))
+    samples = {}
+    for k, v in leaves: samples.setdefault(k, []).append(str(v))
+    cases.append(("detect_formats", {"paths": len(samples), "values": len(leaves)},
+                  lambda: TypeRules().detect_formats(samples)))
+
+    # Validación de registros del mismo endpoint contra sus field_metadata (tipos y tamaños del esquema)
+    payload = make_json_payload(3, _n(6, scale, 4), 2, seed=5)
+    schema = SchemaStats().add_record(payload)
+    spec_meta = {}
+    for p, (example, t) in schema.field_types().items():
+        m = spec_meta[p] = new_field_metadata(example, t)
+        m["required"], m["size_limit"] = "Sí", schema.size_limit(p)
+    spec = ValidationSpec(spec_meta)
+    records = [(str(i), payload) for i in range(_n(2000, scale, 50))]
+    cases.append(("validate_records", {"records": len(records), "fields": len(spec_meta)},
+                  lambda: validate_records(records, spec)))
+
+    # Proyecto grande: tabla, guardado, Excel y serialización
+    n_fields = _n(1000, scale, 20)
+    project = make_project(n_endpoints=_n(20, scale, 2), n_fields=n_fields, n_dtos=_n(20, scale, 2),
+                           dto_fields=_n(400, scale, 20), seed=3)
+    ep = next(iter(project["endpoints"].values()))
+    meta, rules = ep["request"]["field_metadata"], ep["request"]["mapping_rules"]
+    p_params = {"endpoints": len(project["endpoints"]), "fields": n_fields, "dtos": len(project["dto_library"])}
+
+    cases.append(("dto_options.cold", p_params, lambda: target_options(project["dto_library"], DtoOptionCache())))
+    opts = target_options(project["dto_library"], DtoOptionCache())
+    cases.append(("build_table", dict(p_params, options=len(opts)), lambda: build_table(meta, rules, opts)))
+    df = build_table(meta, rules, opts)
+    cases.append(("collect_edits", {"rows": len(df)}, lambda: collect_edits(df)))
+    cases.append(("generate_excel_pro", {"rows": len(df), "options": len(opts)},
+                  lambda: generate_excel_pro(df, ep["extra_metadata"], opts)))
+    xlsx = generate_excel_pro(df, ep["extra_metadata"], opts)
+    cases.append(("excel_import", {"rows": len(df), "bytes": len(xlsx)},
+                  lambda: import_mapping_excel(io.BytesIO(xlsx), meta, rules, dict(ep["extra_metadata"]))))
+    cases.append(("generate_project_workbook", dict(p_params, options=len(opts)),
+                  lambda: generate_project_workbook(project, options=opts)))
+    cases.append(("suggestion_index.build", dict(p_params, options=len(opts)), lambda: SuggestionIndex(opts)))
+    cases.append(("suggest_unmapped", {"fields": len(meta), "options": len(opts)},
+                  lambda: suggest_unmapped(meta, {}, SuggestionIndex(opts))))
+    cases.append(("project.dumps", p_params, lambda: json.dumps(project, indent=4, default=json_default)))
+    cases.append(("project.export_bytes", p_params, lambda: export_bytes(project)))
+    cases.append(("project.export_bytes.compact_gzip", p_params,
+                  lambda: export_bytes(project, compact=True, compress=True)))
+    raw = json.dumps(project, indent=4, default=json_default)
+    cases.append(("project.loads", dict(p_params, bytes=len(raw)), lambda: json.loads(raw)))
+    cases.append(("project.loads.compact", dict(p_params, bytes=len(raw)), lambda: compact_project(json.loads(raw))))
+
+    collection = make_postman_collection(n_requests=_n(2000, scale, 10), seed=4)
+    cases.append(("parse_postman_collection", {"requests": _n(2000, scale, 10)},
+                  lambda: parse_postman_collection(collection)))
+    return cases
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def time_case(fn, repeat=3):
+    """Segundos por llamada (mejor de `repeat`), agrupando llamadas si cada una dura muy poco."""
+    first, _ = best_of(fn, 1)
+    loops = max(1, int(MIN_RUN_SECONDS / first) + 1) if first < MIN_RUN_SECONDS else 1
+
+    def many():
+        for _ in range(loops): fn()
+
+    seconds, _ = best_of(many, repeat)
+    return seconds / loops, loops
+
+
+def run(cases, repeat=3, memory=True):
+    results = {}
+    for name, params, fn in cases:
+        seconds, loops = time_case(fn, repeat)
+        entry = {"seconds": round(seconds, 9), "loops": loops, "params": params}
+        if memory: entry["peak_mb"] = round(peak_memory(fn) / 1e6, 3)
+        results[name] = entry
+        mem = f"{entry['peak_mb']:9.2f} MB" if memory else ""
+        print(f"{name:<32} {seconds * 1000:10.1f} ms {mem}  {params}")
+    return results
+
+
+def compare(current, baseline, threshold=1.25):
+    """Imprime el ratio actual/base por caso y devuelve los casos más lentos que `threshold`."""
+    slower = []
+    print(f"\n{'caso':<32} {'base ms':>10} {'actual ms':>10} {'ratio':>7}")
+    for name, cur in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old["seconds"]: continue
+        ratio = cur["seconds"] / old["seconds"]
+        flag = "  <-- REGRESIÓN" if ratio > threshold else ""
+        print(f"{name:<32} {old['seconds'] * 1000:10.1f} {cur['seconds'] * 1000:10.1f} {ratio:7.2f}{flag}")
+        if ratio > threshold: slower.append(name)
+    return slower
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks de las rutas calientes de app.py / mapper_tool.py")
+    ap.add_argument("-o", "--output", help="Fichero JSON de resultados (por defecto benchmarks/results/<fecha>.json)")
+    ap.add_argument("--scale", type=float, default=1.0, help="Factor de tamaño de las entradas")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", help="Prefijos de casos separados por comas")
+    ap.add_argument("--no-memory", action="store_true", help="No medir el pico de memoria (más rápido)")
+    ap.add_argument("--compare", help="Resultados base con los que comparar")
+    ap.add_argument("--threshold", type=float, default=1.25, help="Ratio a partir del cual se marca regresión")
+    args = ap.parse_args(argv)
+
+    cases = build_cases(args.scale)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(",") if p.strip())
+        cases = [c for c in cases if c[0].startswith(prefixes)]
+
+    now = datetime.datetime.now()
+    doc = {
+        "format": RESULTS_FORMAT,
+        "meta": {"created_at": now.isoformat(timespec="seconds"), "commit": _git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "scale": args.scale, "repeat": args.repeat},
+        "results": run(cases, args.repeat, memory=not args.no_memory),
+    }
+
+    out = args.output or os.path.join(ROOT, "benchmarks", "results", now.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f: json.dump(doc, f, indent=2)
+    print(f"\nResultados -> {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: baseline = json.load(f)
+        if compare(doc, baseline, args.threshold): return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
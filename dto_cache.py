@@ -0,0 +1,77 @@
+# --- CACHÉ DE OPCIONES DE DTOs / ESTÁNDAR ---
+# Cada rerun de Streamlit volvía a aplanar todos los DTOs y a ordenar las opciones
+# del desplegable. Aquí cada DTO se aplana una sola vez por contenido (hash del JSON)
+# y la lista combinada se mantiene ordenada: al añadir o quitar un DTO sólo se mezcla
+# o se retira su bloque de opciones.
+import hashlib
+import heapq
+import json
+from collections import Counter, OrderedDict
+
+from flatten_engine import flatten_payload
+
+DEFAULT_MAX_ENTRIES = 64
+
+
+def dto_hash(obj):
+    raw = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def dto_options(name, obj, prefixed=True):
+    """Opciones ordenadas de un DTO: '[nombre] ruta | tipo' (o 'ruta | tipo' si prefixed=False)."""
+    pre = f"[{name}] " if prefixed else ""
+    return sorted(f"{pre}{k} | {v}" for k, v in flatten_payload(obj).items())
+
+
+class DtoOptionCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, store=None):
+        # Con `store` (shared_store.SharedStore) las opciones aplanadas se comparten entre sesiones
+        self.max_entries = max_entries
+        self.store = store
+        self.flattened = 0  # nº de DTOs aplanados (diagnóstico)
+        self._memo = OrderedDict()  # (nombre, hash, prefixed) -> opciones ordenadas, LRU acotado
+        self._active = {}  # nombre -> (clave, opciones) de la librería actual
+        self._merged = []
+
+    def _lookup(self, name, obj, prefixed):
+        if self.store is not None:
+            h, opts = self.store.options(obj, name, prefixed)
+            return (name, h, prefixed), opts
+        key = (name, dto_hash(obj), prefixed)
+        opts = self._memo.get(key)
+        if opts is None:
+            opts = self._memo[key] = dto_options(name, obj, prefixed)
+            self.flattened += 1
+            while len(self._memo) > self.max_entries: self._memo.popitem(last=False)
+        else:
+            self._memo.move_to_end(key)
+        return key, opts
+
+    def options(self, dto_library, prefixed=True):
+        """Opciones de todos los DTOs de la librería, ordenadas. No modificar la lista devuelta."""
+        active = {n: self._lookup(n, o, prefixed) for n, o in dto_library.items()}
+
+        gone = Counter()
+        for n, (key, opts) in self._active.items():
+            if n not in active or active[n][0] != key: gone.update(opts)
+        if gone:
+            kept = []
+            for o in self._merged:
+                if gone[o]:
+                    gone[o] -= 1
+                else:
+                    kept.append(o)
+            self._merged = kept
+
+        for n, (key, opts) in active.items():
+            if n not in self._active or self._active[n][0] != key:
+                self._merged = list(heapq.merge(self._merged, opts))
+
+        self._active = active
+        return self._merged
+
+    def clear(self):
+        self._memo.clear()
+        self._active = {}
+        self._merged = []
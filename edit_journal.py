@@ -0,0 +1,358 @@
+# --- DIARIO DE CAMBIOS (AUTOGUARDADO Y RECUPERACIÓN) ---
+# Todo vive en st.session_state y se pierde al cerrar. En lugar de serializar el
+# proyecto entero en cada cambio, cada edición se añade como una línea a un diario
+# append-only (journal.ndjson) en disco local:
+#   {"s": 12, "o": "set", "p": ["endpoints", "ep", "request", "field_metadata", "campo"], "v": {...}}
+#   {"s": 13, "o": "del", "p": ["endpoints", "ep_borrado"]}
+# Cada cierto nº de operaciones un hilo compacta el diario en snapshot.json (estado
+# completo + nº de secuencia incorporado). Al arrancar se lee el snapshot y se
+# reaplican las operaciones posteriores. El coste de cada autoguardado es proporcional
+# a lo que ha cambiado, no al tamaño del proyecto.
+# Con un proyecto en carpeta (ShardedProject) la base es la propia carpeta: el snapshot
+# sólo guarda su ruta y el diario acumula los cambios sin guardar hasta "Guardar en carpeta".
+# Cada sesión tiene su propio diario (un hueco por sesión, identificado por un token en la
+# URL) guardado en session_state: el estado de referencia de los diffs no se comparte entre
+# sesiones y al recargar la página sólo se recupera lo de la propia sesión.
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from collections.abc import Mapping, MutableMapping
+
+from field_records import json_default_str
+from project_store import ShardedProject, is_project_dir
+
+SNAPSHOT = "snapshot.json"
+JOURNAL = "journal.ndjson"
+COMPACT_OPS = 2000
+COMPACT_BYTES = 4 << 20
+WATCHED_ENDPOINTS = 4  # endpoints con copia completa para el diff fino (los últimos activos)
+SLOT_PARAM = "j"  # parámetro de la URL con el hueco del diario de la sesión
+SLOT_MAX_AGE = 30 * 86400  # huecos sin tocar en este tiempo se borran
+_SLOT_RE = re.compile(r"[0-9a-f]{32}")
+_MISSING = object()
+_OPEN = weakref.WeakValueDictionary()  # carpeta -> diario abierto por una sesión viva
+_OPEN_LOCK = threading.Lock()
+
+
+def journal_dir(name):
+    """Carpeta del diario de una app: $MAPPER_JOURNAL_DIR/<name> o ~/.mapper_pro/journal/<name>."""
+    base = os.environ.get("MAPPER_JOURNAL_DIR") or os.path.join(os.path.expanduser("~"), ".mapper_pro", "journal")
+    return os.path.join(base, name)
+
+
+def session_journal(session_state, name, query_params=None):
+    """El EditJournal de esta sesión: se crea una vez y se guarda en session_state.
+
+    Vive en journal_dir(name)/<token>. El token viene de la URL (`query_params[SLOT_PARAM]`,
+    así al recargar la página se recupera el mismo hueco) o se crea uno nuevo y se escribe en
+    la URL. Si el hueco sigue abierto por otro EditJournal del proceso (pestaña duplicada, o la
+    sesión anterior aún no liberada) la sesión parte de una copia en un hueco nuevo: dos
+    sesiones nunca escriben en el mismo diario.
+    Devuelve None si la carpeta no se puede crear (la app sigue funcionando sin autoguardado).
+    """
+    key = f"_journal_{name}"
+    if key in session_state: return session_state[key]
+    token = query_params.get(SLOT_PARAM) if query_params is not None else None
+    if not (isinstance(token, str) and _SLOT_RE.fullmatch(token)): token = None
+    j = None
+    with _OPEN_LOCK:
+        src = _OPEN.get(os.path.join(journal_dir(name), token)) if token else None
+        try:
+            if token is None or src is not None:
+                token = uuid.uuid4().hex
+                prune_slots(name)
+            directory = os.path.join(journal_dir(name), token)
+            os.makedirs(directory, exist_ok=True)
+            if src is not None: src.copy_to(directory)
+            j = _OPEN[directory] = EditJournal(directory)
+        except OSError:
+            pass
+    if j is not None and query_params is not None: query_params[SLOT_PARAM] = token
+    session_state[key] = j
+    return j
+
+
+def prune_slots(name, max_age=SLOT_MAX_AGE):
+    """Borra los huecos sin cambios en `max_age` segundos (sesiones abandonadas) que no estén abiertos."""
+    base, now = journal_dir(name), time.time()
+    try:
+        slots = os.listdir(base)
+    except FileNotFoundError:
+        return
+    for t in slots:
+        d = os.path.join(base, t)
+        if not _SLOT_RE.fullmatch(t) or d in _OPEN: continue
+        try:
+            if now - max(os.path.getmtime(e.path) for e in os.scandir(d)) < max_age: continue
+        except ValueError:  # carpeta vacía
+            pass
+        except OSError:
+            continue
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def _copy(obj):
+    # Copia profunda vía JSON (más rápida que copy.deepcopy y con los mismos tipos que al reaplicar)
+    return json.loads(json.dumps(obj, default=json_default_str))
+
+
+# --- OPERACIONES ---
+def diff_ops(old, new, path=()):
+    """Operaciones set/del mínimas para pasar de `old` a `new` (se baja recursivamente por los dicts y FieldRecord)."""
+    ops = []
+    for k, v in new.items():
+        o = old.get(k, _MISSING)
+        if o is _MISSING:
+            ops.append(("set", path + (k,), v))
+        elif isinstance(v, Mapping) and isinstance(o, Mapping):
+            ops.extend(diff_ops(o, v, path + (k,)))
+        elif type(o) is not type(v) or (o != v and not (o != o and v != v)):  # NaN == NaN aquí
+            ops.append(("set", path + (k,), v))
+    for k in old:
+        if k not in new: ops.append(("del", path + (k,), None))
+    return ops
+
+
+def apply_op(state, op, path, value=None):
+    cur = state
+    for p in path[:-1]:
+        nxt = cur.get(p)
+        if not isinstance(nxt, MutableMapping): nxt = cur[p] = {}
+        cur = nxt
+    if op == "set":
+        cur[path[-1]] = value
+    else:
+        cur.pop(path[-1], None)
+
+
+class EditJournal:
+    def __init__(self, directory, compact_ops=COMPACT_OPS, compact_bytes=COMPACT_BYTES):
+        self.directory = directory
+        self.compact_ops, self.compact_bytes = compact_ops, compact_bytes
+        self.seq = 0  # última secuencia escrita
+        self.pending = 0  # operaciones en el diario desde el último snapshot
+        self._lock = threading.Lock()
+        self._compactor = None
+        self._fp = None
+        self.base_dir = None  # carpeta del proyecto si la base es un ShardedProject
+        # Estado de referencia para calcular diffs
+        self._header, self._dtos, self._eps, self._watched = {}, {}, set(), {}
+        self._plain = None
+
+    # --- ficheros ---
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        if self._fp is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._fp = open(self._path(JOURNAL), "a", encoding="utf-8")
+        return self._fp
+
+    def exists(self):
+        return os.path.exists(self._path(SNAPSHOT)) or os.path.exists(self._path(JOURNAL))
+
+    def _read_snapshot(self):
+        try:
+            with open(self._path(SNAPSHOT), "r", encoding="utf-8") as f: snap = json.load(f)
+            return snap.get("seq", 0), snap.get("state"), snap.get("directory")
+        except FileNotFoundError:
+            return 0, None, None
+
+    def _replay(self, state, since, stop_bytes=None):
+        """Aplica las operaciones con secuencia > since. Devuelve (estado, última secuencia, nº de operaciones)."""
+        seq, n = since, 0
+        try:
+            f = open(self._path(JOURNAL), "rb")  # en bytes: stop_bytes viene de os.path.getsize
+        except FileNotFoundError:
+            return state, seq, n
+        with f:
+            data = f.read() if stop_bytes is None else f.read(stop_bytes)
+        for line in data.splitlines():
+            try:
+                rec = json.loads(line.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                break  # última línea a medias (cierre inesperado): se descarta
+            if rec["s"] <= since: continue
+            if state is None: state = {}
+            apply_op(state, rec["o"], rec["p"], rec.get("v"))
+            seq, n = rec["s"], n + 1
+        return state, seq, n
+
+    def restore(self):
+        """Estado guardado (snapshot + diario) o None si no hay nada que recuperar."""
+        with self._lock:
+            since, state, self.base_dir = self._read_snapshot()
+            if self.base_dir:
+                # Si la carpeta ya no existe no hay base sobre la que aplicar los cambios
+                if not is_project_dir(self.base_dir): return None
+                state = ShardedProject.open(self.base_dir)
+            state, self.seq, self.pending = self._replay(state, since)
+        if state is not None: self.baseline(state)
+        return state
+
+    def reset(self, state):
+        """Nuevo punto de partida: snapshot completo de `state` (o la ruta si está en carpeta) y diario vacío."""
+        with self._lock:
+            self.base_dir = state.directory if isinstance(state, ShardedProject) else None
+            self._write_snapshot(None if self.base_dir else state, self.seq, self.base_dir)
+            if self._fp: self._fp.close()
+            self._fp = open(self._path(JOURNAL), "w", encoding="utf-8")
+            self.pending = 0
+        self.baseline(state)
+
+    def _write_snapshot(self, state, seq, directory=None):
+        os.makedirs(self.directory, exist_ok=True)
+        snap = {"seq": seq, "state": state}
+        if directory: snap["directory"] = directory
+        tmp = self._path(SNAPSHOT + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f: f.write(json.dumps(snap, default=json_default_str))  # encoder en C
+        os.replace(tmp, self._path(SNAPSHOT))
+
+    def copy_to(self, directory):
+        """Copia snapshot y diario a otra carpeta (otra sesión que parte de este estado)."""
+        with self._lock:
+            if self._fp: self._fp.flush()
+            for n in (SNAPSHOT, JOURNAL):
+                if os.path.exists(self._path(n)): shutil.copyfile(self._path(n), os.path.join(directory, n))
+
+    def clear(self):
+        """Borra el diario y el snapshot (empezar de cero)."""
+        with self._lock:
+            if self._fp: self._fp.close()
+            self._fp = None
+            for n in (SNAPSHOT, JOURNAL):
+                if os.path.exists(self._path(n)): os.remove(self._path(n))
+            self.pending, self.base_dir = 0, None
+        self._header, self._dtos, self._eps, self._watched, self._plain = {}, {}, set(), {}, None
+
+    # --- escritura ---
+    def record(self, ops):
+        """Añade operaciones (op, ruta, valor) al diario y lo vuelca a disco. Devuelve cuántas escribió."""
+        if not ops: return 0
+        with self._lock:
+            fp = self._open()
+            lines = []
+            for op, path, value in ops:
+                self.seq += 1
+                rec = {"s": self.seq, "o": op, "p": list(path)}
+                if op == "set": rec["v"] = value
+                lines.append(json.dumps(rec, ensure_ascii=False, default=json_default_str))
+            fp.write("\n".join(lines) + "\n")
+            fp.flush()
+            self.pending += len(ops)
+            big = self.pending >= self.compact_ops or fp.tell() >= self.compact_bytes
+        if big and not self.base_dir: self.compact(background=True)
+        return len(ops)
+
+    # --- seguimiento de un proyecto de app.py ---
+    def baseline(self, project):
+        """Toma `project` como estado ya guardado (tras restore/reset)."""
+        if "endpoints" not in project:
+            self._plain = _copy(dict(project))
+            return
+        self._header = _copy({k: v for k, v in project.items() if k not in ("endpoints", "dto_library")})
+        self._dtos = dict(project.get("dto_library", {}))
+        self._eps = set(project["endpoints"])
+        self._watched = {}
+
+    def sync_project(self, project, active=None, touched=()):
+        """Registra los cambios del proyecto desde la última llamada. Devuelve el nº de operaciones.
+
+        Se comparan la cabecera, la librería de DTOs (por identidad: la app los sustituye, no los
+        edita), la lista de endpoints y, campo a campo, los endpoints vigilados (los últimos
+        activos). Los endpoints de `touched` se escriben enteros (importaciones que modifican
+        endpoints ya existentes, p. ej. tráfico).
+        """
+        ops = []
+        header = {k: v for k, v in project.items() if k not in ("endpoints", "dto_library")}
+        h_ops = diff_ops(self._header, header)
+        if h_ops:
+            ops.extend(h_ops)
+            self._header = _copy(header)
+
+        lib = project.get("dto_library", {})
+        for n, d in lib.items():
+            if self._dtos.get(n) is not d: ops.append(("set", ("dto_library", n), d))
+        for n in self._dtos:
+            if n not in lib: ops.append(("del", ("dto_library", n), None))
+        self._dtos = dict(lib)
+
+        eps = project["endpoints"]
+        for n in list(self._eps):
+            if n not in eps:
+                ops.append(("del", ("endpoints", n), None))
+                self._eps.discard(n)
+                self._watched.pop(n, None)
+        for n in eps:
+            if n not in self._eps:
+                ops.append(("set", ("endpoints", n), eps[n]))
+                self._eps.add(n)
+                self._watched.pop(n, None)
+
+        for n, old in list(self._watched.items()):
+            ep_ops = diff_ops(old, eps[n], ("endpoints", n))
+            ops.extend(ep_ops)
+            for op, path, value in ep_ops:  # la copia se actualiza sólo en lo cambiado
+                apply_op(old, op, path[2:], _copy(value))
+        for n in touched:
+            if n in eps and n not in self._watched: ops.append(("set", ("endpoints", n), eps[n]))
+
+        if active is not None and active in eps:
+            if active in self._watched:
+                self._watched[active] = self._watched.pop(active)  # más reciente al final
+            else:
+                # La copia se toma antes de que el endpoint se edite en este rerun
+                self._watched[active] = _copy(eps[active])
+                while len(self._watched) > WATCHED_ENDPOINTS: self._watched.pop(next(iter(self._watched)))
+        return self.record(ops)
+
+    def sync_state(self, state):
+        """Registra los cambios de un estado pequeño (p. ej. session_data de mapper_tool) por diff completo."""
+        if self._plain is None: self._plain = {}
+        ops = diff_ops(self._plain, state)
+        for op, path, value in ops: apply_op(self._plain, op, path, _copy(value))
+        return self.record(ops)
+
+    # --- compactación ---
+    def compact(self, background=False):
+        """Incorpora el diario al snapshot. En segundo plano no bloquea las escrituras."""
+        if background:
+            if self._compactor and self._compactor.is_alive(): return
+            self._compactor = threading.Thread(target=self.compact, name="journal-compactor", daemon=True)
+            self._compactor.start()
+            return
+        with self._lock:
+            if self._fp: self._fp.flush()
+            try:
+                stop = os.path.getsize(self._path(JOURNAL))
+            except FileNotFoundError:
+                return
+        since, state, directory = self._read_snapshot()
+        if directory: return  # en carpeta el diario se vacía al guardar el proyecto
+        state, seq, _ = self._replay(state, since, stop_bytes=stop)
+        if seq == since: return
+        self._write_snapshot(state, seq)  # las operaciones <= seq ya no se reaplican
+        with self._lock:
+            # Se conserva sólo lo escrito mientras se compactaba
+            with open(self._path(JOURNAL), "rb") as f:
+                f.seek(stop)
+                tail = f.read()
+            if self._fp: self._fp.close()
+            tmp = self._path(JOURNAL + ".tmp")
+            with open(tmp, "wb") as f: f.write(tail)
+            os.replace(tmp, self._path(JOURNAL))
+            self._fp = open(self._path(JOURNAL), "a", encoding="utf-8")
+            self.pending = tail.count(b"\n")
+
+    def stats(self):
+        try:
+            size = os.path.getsize(self._path(JOURNAL))
+        except FileNotFoundError:
+            size = 0
+        return {"seq": self.seq, "pending_ops": self.pending, "journal_bytes": size, "base_dir": self.base_dir}
@@ -0,0 +1,300 @@
+# --- GENERADOR DE EXCEL PRO ---
+# Escribe la hoja "Mapeo" directamente con xlsxwriter, fila a fila desde los arrays de
+# columnas del DataFrame (sin to_excel ni iterrows). constant_memory=True es sólo un
+# tope de memoria: xlsxwriter vuelca cada fila a un temporal en disco al pasar a la
+# siguiente (50k filas: pico ~42 MB en lugar de ~90 MB), pero no es más rápido y con un
+# disco lento cuesta tiempo; por eso en generate_excel_pro es opcional.
+import hashlib
+import io
+import json
+import re
+
+import xlsxwriter
+from xlsxwriter.utility import xl_col_to_name
+
+from dto_cache import DtoOptionCache
+from field_records import json_default_str
+from mapping_table import STATUS_OPTS, build_table, build_target_index, target_options
+from parallel import batched, map_batches
+from project_store import iter_endpoints
+
+SHEET_NAME = 'Mapeo'
+INDEX_SHEET = 'Índice'
+VALIDATION_SHEET = 'Data_Validation'
+TARGET_COL = "Target (DTO)"
+DATA_ROW_HEIGHT = 20
+
+BASE_FMT = {'font_name': 'Calibri', 'font_size': 11, 'valign': 'vcenter', 'border': 1, 'border_color': '#D9D9D9'}
+HEADER_FMT = {'font_name': 'Calibri', 'font_size': 12, 'bold': True, 'font_color': 'white', 'bg_color': '#2C3E50',
+              'valign': 'vcenter', 'align': 'center', 'border': 1}
+SECTION_TITLE_FMT = {'font_name': 'Calibri', 'font_size': 14, 'bold': True, 'font_color': '#2C3E50',
+                     'underline': True}
+STATUS_COLORS = {
+    "🔵 Revisar con Analista": '#E3F2FD', "🟡 Revisar con Courier": '#FFF9C4',
+    "✅ Valor Confirmado": '#DCEDC8', "🌫️ Valor Omitido": '#F5F5F5',
+    "🟠 Revisar con ITX": '#FFE0B2', "🟣 Validar Frontal": '#E1BEE7',
+    "🧪 Postman": '#FFFFE0', "🟢 Pendiente de verificar TL": '#A5D6A7', "⚪ Sin Estado": '#FFFFFF'
+}
+
+
+def _status_fmt(status_text, bg_color):
+    f = {'bg_color': bg_color, 'border': 1, 'border_color': '#D9D9D9', 'valign': 'vcenter'}
+    if "Omitido" in status_text: f['font_color'] = '#9E9E9E'
+    return f
+
+
+def _clean(v):
+    # NaN/None se dejan en blanco, igual que hacía pandas.to_excel
+    if v is None or (isinstance(v, float) and v != v): return None
+    return v
+
+
+def _column_arrays(df):
+    cols = []
+    for c in df.columns:
+        s = df[c]
+        vals = s.tolist()
+        na = s.isna()
+        if na.any(): vals = [None if m else v for v, m in zip(vals, na.tolist())]
+        cols.append(vals)
+    return cols
+
+
+def data_cache_key(field_metadata, mapping_rules, df_extras_dict, dropdown_target_options):
+    """Hash de todo lo que cambia el Excel generado (datos del endpoint, extras y opciones de target).
+
+    Se calcula sobre los datos del endpoint, sin construir la tabla.
+    """
+    h = hashlib.sha1()
+    h.update(json.dumps([field_metadata, mapping_rules, df_extras_dict or {}], default=json_default_str).encode("utf-8"))
+    h.update("\n".join(dropdown_target_options or []).encode("utf-8"))
+    return h.hexdigest()
+
+
+def write_validation_lists(ws_data, status_options, target_options):
+    # Columna A: estados, columna B: targets. Se escribe por filas (requisito de constant_memory)
+    n = max(len(status_options), len(target_options or []))
+    for i in range(n):
+        if i < len(status_options): ws_data.write(i, 0, status_options[i])
+        if target_options and i < len(target_options): ws_data.write(i, 1, target_options[i])
+
+
+def write_mapping_sheet(worksheet, df_main, df_extras_dict, fmts, validation_sheet=None,
+                        n_status=len(STATUS_OPTS), n_targets=0, title=None, index_sheet=None):
+    """Escribe extras + tabla principal en `worksheet`, en orden de filas.
+
+    Devuelve la fila de cabecera de la tabla principal. `validation_sheet` es el nombre de
+    la hoja con las listas de validación (columna A estados, B targets). Con `title` se
+    añade una fila de título (y un enlace de vuelta a `index_sheet`).
+    """
+    current_row = 0
+    if title:
+        worksheet.write(0, 0, title, fmts['section'])
+        if index_sheet: worksheet.write_url(0, 2, sheet_link(index_sheet), string="← Índice")
+        current_row = 2
+
+    # TABLA EXTRAS (La pequeña arriba)
+    if df_extras_dict:
+        worksheet.write(current_row, 0, "DATOS ADICIONALES", fmts['section'])
+        current_row += 1
+        worksheet.write(current_row, 0, "Clave", fmts['header'])
+        worksheet.write(current_row, 1, "Valor", fmts['header'])
+        current_row += 1
+        for k, v in df_extras_dict.items():
+            worksheet.write(current_row, 0, _clean(k), fmts['base'])
+            worksheet.write(current_row, 1, _clean(v), fmts['base'])
+            current_row += 1
+        current_row += 2
+
+    # TABLA PRINCIPAL
+    worksheet.write(current_row, 0, "MAPEO DE CAMPOS", fmts['section'])
+    current_row += 1
+    main_header_row = current_row
+    n_rows, n_cols = len(df_main), len(df_main.columns)
+
+    for col_num, value in enumerate(df_main.columns.values):
+        worksheet.write(main_header_row, col_num, value, fmts['header'])
+
+    if n_rows == 0: return main_header_row
+
+    # FORMATO CONDICIONAL, VALIDACIONES & FREEZE (no escriben celdas, se pueden declarar antes)
+    first_data_row = main_header_row + 2
+    last_data_row = first_data_row + n_rows - 1
+    range_full = f"A{first_data_row}:{xl_col_to_name(n_cols - 1)}{last_data_row}"
+    for status_text, f in fmts['status'].items():
+        worksheet.conditional_format(range_full, {'type': 'formula', 'criteria': f'=$A{first_data_row}="{status_text}"',
+                                                  'format': f})
+
+    if validation_sheet:
+        range_status = f'={validation_sheet}!$A$1:$A${n_status}'
+        worksheet.data_validation(main_header_row + 1, 0, main_header_row + n_rows, 0,
+                                  {'validate': 'list', 'source': range_status})
+        if n_targets:
+            range_target = f'={validation_sheet}!$B$1:$B${n_targets}'
+            idx_target = df_main.columns.get_loc(TARGET_COL) if TARGET_COL in df_main.columns else 2
+            worksheet.data_validation(main_header_row + 1, idx_target, main_header_row + n_rows, idx_target,
+                                      {'validate': 'list', 'source': range_target, 'show_error': False})
+
+    worksheet.autofilter(main_header_row, 0, main_header_row + n_rows, n_cols - 1)
+    worksheet.freeze_panes(main_header_row + 1, 2)
+    worksheet.set_column(0, 0, 30)
+    worksheet.set_column(1, 1, 35)
+    worksheet.set_column(2, 2, 55)
+
+    # FILAS DE DATOS: directamente desde los arrays de columnas
+    r = main_header_row + 1
+    for row in zip(*_column_arrays(df_main)):
+        worksheet.set_row(r, DATA_ROW_HEIGHT)
+        worksheet.write_row(r, 0, row)
+        r += 1
+    return main_header_row
+
+
+def add_formats(workbook):
+    return {
+        'base': workbook.add_format(BASE_FMT),
+        'header': workbook.add_format(HEADER_FMT),
+        'section': workbook.add_format(SECTION_TITLE_FMT),
+        'status': {s: workbook.add_format(_status_fmt(s, c)) for s, c in STATUS_COLORS.items()},
+    }
+
+
+def generate_excel_pro(df_main, df_extras_dict, dropdown_target_options, constant_memory=False):
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': constant_memory})
+    fmts = add_formats(workbook)
+    worksheet = workbook.add_worksheet(SHEET_NAME)
+
+    validation_sheet = None
+    if len(df_main) > 0:
+        ws_data = workbook.add_worksheet(VALIDATION_SHEET)
+        ws_data.hide()
+        write_validation_lists(ws_data, STATUS_OPTS, dropdown_target_options)
+        validation_sheet = VALIDATION_SHEET
+
+    write_mapping_sheet(worksheet, df_main, df_extras_dict, fmts, validation_sheet=validation_sheet,
+                        n_status=len(STATUS_OPTS), n_targets=len(dropdown_target_options or []))
+    workbook.close()
+    return output.getvalue()
+
+
+# --- LIBRO CON TODOS LOS ENDPOINTS ---
+# Una hoja por endpoint/dirección, una hoja "Índice" con el progreso de cada una y una
+# sola hoja Data_Validation compartida. Las tablas se preparan en paralelo (pool de
+# procesos) y el libro se escribe en constant_memory según van llegando, en el orden
+# del proyecto: ni el proyecto ni el libro completos se tienen en memoria (a cambio de
+# escribir en temporales; constant_memory=False si sobra memoria).
+INDEX_COLUMNS = ["Endpoint", "Método", "Dirección", "Hoja", "Campos", "Mapeados", "Sin mapear", "Done", "Progreso"]
+_SHEET_BAD = re.compile(r"[\[\]:*?/\\]")
+_WORKER = {}
+
+
+def sheet_name(endpoint, direction, used):
+    """Nombre de hoja válido en Excel (31 caracteres, sin []:*?/\\) y único en `used` (sin mayúsculas)."""
+    base = _SHEET_BAD.sub("_", endpoint).strip("' ") or "endpoint"
+    suffix = " RQ" if direction == "request" else " RS"
+    name, n = base[:31 - len(suffix)] + suffix, 2
+    while name.lower() in used:
+        tag = f"~{n}{suffix}"
+        name, n = base[:31 - len(tag)] + tag, n + 1
+    used.add(name.lower())
+    return name
+
+
+def sheet_link(sheet):
+    """Enlace interno a A1 de `sheet`; dentro de la referencia entre comillas el ' se escribe ''."""
+    return "internal:'" + sheet.replace("'", "''") + "'!A1"
+
+
+def sheet_stats(field_metadata, mapping_rules):
+    """(campos, mapeados, done) de una dirección de un endpoint."""
+    targets = build_target_index(mapping_rules)
+    mapped = sum(1 for k in field_metadata if k in targets)
+    done = sum(1 for m in field_metadata.values() if m.get("is_done"))
+    return len(field_metadata), mapped, done
+
+
+def workbook_jobs(project):
+    """(endpoint, método, dirección, datos, extras) de cada dirección con campos, en el orden del proyecto."""
+    for name, ep in iter_endpoints(project):
+        for direction in ("request", "response"):
+            d = ep.get(direction) or {}
+            if d.get("field_metadata"): yield name, ep.get("method", ""), direction, d, ep.get("extra_metadata", {})
+
+
+def _init_sheet_worker(options):
+    _WORKER["options"] = options
+
+
+def _prepare_sheets(batch):
+    # En el proceso del pool: tabla + estadísticas (lo caro); la escritura se hace en el principal
+    opts = _WORKER["options"]
+    out = []
+    for name, method, direction, d, extras in batch:
+        meta, rules = d.get("field_metadata", {}), d.get("mapping_rules", {})
+        out.append((name, method, direction, build_table(meta, rules, opts), extras, sheet_stats(meta, rules)))
+    return out
+
+
+def _write_index_row(ws, row, values, fmts, link=None):
+    for c, v in enumerate(values):
+        if c == 3 and link:
+            ws.write_url(row, c, sheet_link(link), string=v)
+        else:
+            ws.write(row, c, v, fmts['pct'] if c == len(values) - 1 else fmts['base'])
+
+
+def generate_project_workbook(project, output=None, options=None, workers=None, constant_memory=True,
+                              progress=None):
+    """Libro con todas las direcciones con campos del proyecto.
+
+    `output`: ruta o fichero donde escribir; si es None se devuelve el contenido (bytes).
+    `options`: opciones de target ya calculadas (si no, se calculan de la dto_library).
+    `progress(n)` se llama tras escribir cada hoja. Devuelve los bytes o el nº de hojas escritas.
+    """
+    if options is None: options = target_options(project.get("dto_library", {}), DtoOptionCache())
+    target = io.BytesIO() if output is None else output
+    workbook = xlsxwriter.Workbook(target, {'constant_memory': constant_memory})
+    fmts = add_formats(workbook)
+    fmts['pct'] = workbook.add_format(dict(BASE_FMT, num_format='0%'))
+    fmts['total'] = workbook.add_format(dict(BASE_FMT, bold=True))
+
+    ws_index = workbook.add_worksheet(INDEX_SHEET)
+    ws_index.write(0, 0, f"ÍNDICE · {project.get('courier_name') or 'Proyecto'}", fmts['section'])
+    for c, col in enumerate(INDEX_COLUMNS): ws_index.write(2, c, col, fmts['header'])
+    ws_index.freeze_panes(3, 0)
+    ws_index.set_column(0, 0, 45)
+    ws_index.set_column(1, 2, 12)
+    ws_index.set_column(3, 3, 34)
+    ws_index.set_column(4, 8, 12)
+
+    used = {INDEX_SHEET.lower(), VALIDATION_SHEET.lower()}
+    row, sheets, totals = 3, 0, [0, 0, 0]
+    batches = batched(workbook_jobs(project), 1)
+    for out in map_batches(_prepare_sheets, batches, workers=workers, initializer=_init_sheet_worker,
+                           initargs=(options,)):
+        for name, method, direction, df, extras, (n, mapped, done) in out:
+            sheet = sheet_name(name, direction, used)
+            write_mapping_sheet(workbook.add_worksheet(sheet), df, extras, fmts, validation_sheet=VALIDATION_SHEET,
+                                n_status=len(STATUS_OPTS), n_targets=len(options),
+                                title=f"{method} {name} · {direction}".strip(), index_sheet=INDEX_SHEET)
+            _write_index_row(ws_index, row, [name, method, direction, sheet, n, mapped, n - mapped, done,
+                                             done / n if n else 0], fmts, link=sheet)
+            totals = [totals[0] + n, totals[1] + mapped, totals[2] + done]
+            row += 1
+            sheets += 1
+            if progress: progress(sheets)
+
+    if sheets:
+        ws_index.conditional_format(3, 8, row - 1, 8, {'type': 'data_bar', 'bar_color': '#A5D6A7'})
+        ws_index.autofilter(2, 0, row - 1, len(INDEX_COLUMNS) - 1)
+    n, mapped, done = totals
+    for c, v in enumerate(["TOTAL", "", "", f"{sheets} hojas", n, mapped, n - mapped, done]):
+        ws_index.write(row, c, v, fmts['total'])
+    ws_index.write(row, 8, done / n if n else 0, fmts['pct'])
+
+    ws_data = workbook.add_worksheet(VALIDATION_SHEET)
+    ws_data.hide()
+    write_validation_lists(ws_data, STATUS_OPTS, options)
+    workbook.close()
+    return target.getvalue() if output is None else sheets
@@ -0,0 +1,257 @@
+# --- IMPORTACIÓN DEL EXCEL EDITADO (IDA Y VUELTA) ---
+# Los analistas editan fuera de la app el Excel de generate_excel_pro (estados,
+# targets de la lista de validación, comentarios...). Aquí se vuelve a cargar:
+# - la hoja se lee en streaming (openpyxl en modo read_only): memoria constante
+# - el bloque "DATOS ADICIONALES" va a extra_metadata; la tabla empieza en la fila de
+#   cabecera que contiene "Campo Courier"
+# - las filas se comparan por bloques con el estado de la app, columna a columna sobre
+#   arrays, y sólo se escriben las celdas que cambian
+# - si la app y el Excel tienen valores distintos y el de la app no está vacío hay
+#   conflicto: se aplica el del lado preferido (`prefer`) y se informa de todos
+# También admite el libro del proyecto (generate_project_workbook): el Índice dice qué
+# endpoint y dirección hay en cada hoja.
+import warnings
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from excel_export import INDEX_COLUMNS, INDEX_SHEET, SHEET_NAME, TARGET_COL
+from mapping_table import APP_META_COLUMNS, IGNORED_TARGET, NO_TARGET, clean_targets, new_field_metadata
+
+EXTRAS_TITLE = "DATOS ADICIONALES"
+FIELD_COL = "Campo Courier"
+CHUNK_ROWS = 5000
+MAX_CONFLICTS = 1000  # conflictos con detalle en el informe (el recuento es siempre completo)
+PREFER = ("excel", "app")
+
+# Columna del Excel -> (clave de field_metadata, valor "vacío" en la app)
+_COLUMNS = {col: (key, "⚪ Sin Estado" if key == "status_tag" else default)
+            for key, col, default in APP_META_COLUMNS if col}
+_COLUMNS[TARGET_COL] = (None, NO_TARGET)
+
+
+def _text(v):
+    return "" if v is None else str(v)
+
+
+def new_report():
+    return {"rows": 0, "new_fields": 0, "updated_fields": 0, "changes": 0, "conflicts": 0, "conflict_rows": [],
+            "extras": {"new": 0, "changed": 0, "conflicts": 0}, "missing_in_excel": 0, "sheets": []}
+
+
+def _conflict(report, field, col, app, excel, prefer):
+    report["conflicts"] += 1
+    if len(report["conflict_rows"]) < MAX_CONFLICTS:
+        report["conflict_rows"].append({"Campo": field, "Columna": col, "App": app, "Excel": excel,
+                                        "Aplicado": "Excel" if prefer == "excel" else "App"})
+
+
+# --- LECTURA DE LA HOJA ---
+def split_sheet(rows):
+    """(extras, cabecera, resto de filas) de una hoja de mapeo.
+
+    Los extras (pocos) se leen enteros; las filas de la tabla quedan como iterador. La
+    cabecera es None si la hoja no tiene la tabla de mapeo.
+    """
+    rows = iter(rows)
+    extras = {}
+    for row in rows:
+        first = _text(row[0]).strip() if row else ""
+        if first == EXTRAS_TITLE:
+            for r in rows:
+                k = _text(r[0]).strip() if r else ""
+                if k == "Clave": continue
+                if not k: break
+                extras[k] = _text(r[1]) if len(r) > 1 else ""
+            continue
+        if FIELD_COL in (_text(c).strip() for c in row):
+            return extras, [_text(c).strip() for c in row], rows
+    return extras, None, iter(())
+
+
+def _open(source):
+    # Las listas de validación / formatos condicionales no se leen en read_only: sin avisos por ello
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return load_workbook(source, read_only=True, data_only=True)
+
+
+def _rows(wb, sheet):
+    ws = wb[sheet]
+    ws.reset_dimensions()  # no fiarse de la dimensión guardada (libros re-guardados por otras aplicaciones)
+    return ws.iter_rows(values_only=True)
+
+
+# --- FUSIÓN ---
+def merge_extras(extra_metadata, extras, prefer="excel", report=None):
+    report = report if report is not None else new_report()
+    for k, v in extras.items():
+        cur = extra_metadata.get(k)
+        if cur is None or _text(cur) == "":
+            if v == "": continue
+            report["extras"]["new" if cur is None else "changed"] += 1
+            extra_metadata[k] = v
+        elif _text(cur) != v:
+            report["extras"]["conflicts"] += 1
+            _conflict(report, k, EXTRAS_TITLE, _text(cur), v, prefer)
+            if prefer == "excel": extra_metadata[k] = v
+    return report
+
+
+def merge_rows(rows, header, field_metadata, mapping_rules, prefer="excel", report=None, chunk_rows=CHUNK_ROWS):
+    """Vuelca las filas de la tabla en field_metadata / mapping_rules por bloques. Devuelve el informe."""
+    report = report if report is not None else new_report()
+    cols = [c for c in header if c in _COLUMNS]
+    pos = {c: header.index(c) for c in cols + [FIELD_COL]}
+    empty_row = np.array([_COLUMNS[c][1] for c in cols], dtype=object)
+    t_col = cols.index(TARGET_COL) if TARGET_COL in cols else None
+    by_field = {}  # campo -> targets con regla (un campo puede tener varias)
+    for t, s in mapping_rules.items(): by_field.setdefault(s, []).append(t)
+    seen = set()
+
+    chunk = []
+    for row in rows:
+        if row: chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            _merge_chunk(chunk, cols, pos, empty_row, t_col, field_metadata, mapping_rules, by_field, seen, prefer,
+                         report)
+            chunk = []
+    if chunk:
+        _merge_chunk(chunk, cols, pos, empty_row, t_col, field_metadata, mapping_rules, by_field, seen, prefer, report)
+    report["missing_in_excel"] += sum(1 for k in field_metadata if k not in seen)
+    return report
+
+
+def _merge_chunk(chunk, cols, pos, empty_row, t_col, field_metadata, mapping_rules, by_field, seen, prefer, report):
+    def cell(row, i):
+        return row[i] if i < len(row) else None
+
+    fields = [_text(cell(r, pos[FIELD_COL])).strip() for r in chunk]
+    keep = [i for i, f in enumerate(fields) if f]
+    if not keep: return
+    fields = [fields[i] for i in keep]
+    xl = pd.DataFrame({c: [_text(cell(chunk[i], pos[c])) for i in keep] for c in cols}, dtype=object)
+    if t_col is not None:
+        t = clean_targets(xl[TARGET_COL])
+        xl[TARGET_COL] = t.where(t.str.strip() != "", NO_TARGET)
+    x = xl.to_numpy(dtype=object)
+    blank = x == ""  # celda vacía = valor vacío de la app (los campos nuevos conservan sus valores por defecto)
+    x[blank] = np.broadcast_to(empty_row, x.shape)[blank]
+
+    # Valores actuales de la app en el mismo formato (texto); los campos nuevos parten de los valores vacíos
+    exists = np.array([f in field_metadata for f in fields], dtype=bool)
+    cur = np.tile(empty_row, (len(fields), 1))
+    for r in np.flatnonzero(exists).tolist():
+        meta, f = field_metadata[fields[r]], fields[r]
+        for c, col in enumerate(cols):
+            key, default = _COLUMNS[col]
+            if key is None:
+                ts = by_field.get(f)
+                cur[r, c] = ts[0] if ts else NO_TARGET
+            else:
+                v = meta.get(key)
+                cur[r, c] = default if v is None else _text(v)
+
+    diff = x != cur
+    cur_empty = (cur == empty_row) | (cur == "")
+    conflict = diff & ~cur_empty & exists[:, None]
+    apply = diff & ~conflict if prefer == "app" else diff
+
+    report["rows"] += len(fields)
+    seen.update(fields)
+    for r, c in zip(*np.nonzero(conflict)):
+        _conflict(report, fields[r], cols[c], cur[r, c], x[r, c], prefer)
+    touched = set()
+    for r in np.flatnonzero(~exists).tolist():
+        if fields[r] not in field_metadata:
+            field_metadata[fields[r]] = new_field_metadata()
+            report["new_fields"] += 1
+    for r, c in zip(*np.nonzero(apply)):
+        f, col, v = fields[r], cols[c], x[r, c]
+        meta = field_metadata[f]
+        if c == t_col:
+            for t in by_field.pop(f, ()):
+                if mapping_rules.get(t) == f: del mapping_rules[t]
+            if v not in (NO_TARGET, IGNORED_TARGET):
+                prev = mapping_rules.get(v)
+                if prev is not None and prev != f and v in by_field.get(prev, ()): by_field[prev].remove(v)
+                mapping_rules[v] = f
+                by_field[f] = [v]
+            meta["is_done"] = v != NO_TARGET  # igual que al guardar el editor
+        else:
+            meta[_COLUMNS[col][0]] = v
+        report["changes"] += 1
+        if exists[r]: touched.add(f)
+    report["updated_fields"] += len(touched)
+
+
+# --- ENTRADA ---
+def _merge_sheet(wb, sheet, ep, direction, prefer, report):
+    extras, header, rows = split_sheet(_rows(wb, sheet))
+    if header is None: return False
+    d = ep.setdefault(direction, {})
+    merge_extras(ep.setdefault("extra_metadata", {}), extras, prefer, report)
+    merge_rows(rows, header, d.setdefault("field_metadata", {}), d.setdefault("mapping_rules", {}), prefer, report)
+    report["sheets"].append(sheet)
+    return True
+
+
+def _index_jobs(wb):
+    """[(endpoint, dirección, hoja)] de la hoja Índice del libro del proyecto."""
+    rows = _rows(wb, INDEX_SHEET)
+    for row in rows:
+        if row and [_text(c).strip() for c in row[:len(INDEX_COLUMNS)]] == INDEX_COLUMNS: break
+    jobs = []
+    for row in rows:
+        name, direction, sheet = (_text(row[i]).strip() if row and i < len(row) else "" for i in (0, 2, 3))
+        if not name or name == "TOTAL": break
+        jobs.append((name, direction, sheet))
+    return jobs
+
+
+def import_mapping_excel(source, field_metadata, mapping_rules, extra_metadata, prefer="excel", sheet=SHEET_NAME):
+    """Importa la hoja `sheet` de un Excel de generate_excel_pro (ruta o fichero) en una dirección de un endpoint."""
+    ep = {"extra_metadata": extra_metadata,
+          "request": {"field_metadata": field_metadata, "mapping_rules": mapping_rules}}
+    wb = _open(source)
+    try:
+        if sheet not in wb.sheetnames: raise ValueError(f"El libro no tiene la hoja '{sheet}'")
+        report = new_report()
+        if not _merge_sheet(wb, sheet, ep, "request", prefer, report):
+            raise ValueError(f"La hoja '{sheet}' no tiene la tabla de mapeo ('{FIELD_COL}')")
+        return report
+    finally:
+        wb.close()
+
+
+def import_workbook(project, source, endpoint=None, direction="request", prefer="excel", progress=None):
+    """Importa un Excel en el proyecto según su contenido:
+    - libro del proyecto (hoja Índice): cada hoja en su endpoint/dirección; las que no tienen endpoint en el
+      proyecto se saltan (report["skipped"])
+    - Excel de un endpoint (hoja Mapeo): en `endpoint` / `direction`
+    report["endpoints"] son los endpoints modificados. `progress(n)` tras cada hoja.
+    """
+    wb = _open(source)
+    try:
+        if INDEX_SHEET in wb.sheetnames:
+            jobs = _index_jobs(wb)
+        elif SHEET_NAME in wb.sheetnames:
+            if endpoint not in project["endpoints"]: raise ValueError("Selecciona el endpoint en el que importar")
+            jobs = [(endpoint, direction, SHEET_NAME)]
+        else:
+            raise ValueError(f"El libro no tiene hoja '{SHEET_NAME}' ni '{INDEX_SHEET}'")
+
+        report = new_report()
+        report["endpoints"], report["skipped"] = [], []
+        for name, d, sheet in jobs:
+            ep = project["endpoints"].get(name)
+            if ep is None or d not in ("request", "response") or sheet not in wb.sheetnames \
+                    or not _merge_sheet(wb, sheet, ep, d, prefer, report):
+                report["skipped"].append(sheet or name)
+                continue
+            if name not in report["endpoints"]: report["endpoints"].append(name)
+            if progress: progress(len(report["sheets"]))
+        return report
+    finally:
+        wb.close()
@@ -0,0 +1,174 @@
+# --- REGISTROS COMPACTOS DE field_metadata ---
+# Cada campo del courier era un dict de diez claves con sus propios objetos str para
+# valores que salen de vocabularios mínimos (STATUS_OPTS, "Sí/No/Cond/?", tipos). Con
+# 100k+ campos por sesión eso es mucha memoria. FieldRecord guarda lo mismo en slots:
+# - las claves habituales van en slots (sin dict por campo); las demás en un dict aparte
+# - el orden de las claves (la "forma") es una tupla compartida entre todos los registros
+#   con las mismas claves, así la conversión a/desde JSON es exacta, orden incluido
+# - estado, requerido y tipo se internan: todos los campos comparten el mismo str
+# FieldRecord se comporta como el dict (MutableMapping): el resto del código no cambia.
+# Para serializar, json.dumps(..., default=json_default).
+import sys
+from collections.abc import Mapping, MutableMapping
+
+FIELDS = ("status_tag", "required", "comment_tl", "comment_analyst", "comment_dev", "example_value", "type",
+          "is_done", "doc_desc", "size_limit")
+_SLOTS = frozenset(FIELDS)
+_INTERNED = frozenset(("status_tag", "required", "type"))
+
+
+class _Shape:
+    """Orden de claves compartido por los registros (con las transiciones ya calculadas)."""
+    __slots__ = ("keys", "index", "_add", "_drop")
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.index = frozenset(keys)
+        self._add, self._drop = {}, {}
+
+    def add(self, key):
+        s = self._add.get(key)
+        if s is None: s = self._add[key] = shape(self.keys + (key,))
+        return s
+
+    def drop(self, key):
+        s = self._drop.get(key)
+        if s is None: s = self._drop[key] = shape(tuple(k for k in self.keys if k != key))
+        return s
+
+
+_SHAPES = {}
+
+
+def shape(keys):
+    s = _SHAPES.get(keys)
+    if s is None: s = _SHAPES[keys] = _Shape(keys)
+    return s
+
+
+_EMPTY = shape(())
+
+
+class FieldRecord(MutableMapping):
+    __slots__ = ("_shape", "_extra") + FIELDS
+
+    def __init__(self, items=()):
+        self._extra = None
+        if type(items) is not dict:
+            self._shape = _EMPTY
+            for k, v in (items.items() if isinstance(items, Mapping) else items): self[k] = v
+            return
+        # Desde un dict (lo habitual al cargar): la forma se calcula una vez, sin transiciones
+        self._shape = shape(tuple(items))
+        for k, v in items.items():
+            if k in _INTERNED and type(v) is str: v = sys.intern(v)
+            if k in _SLOTS:
+                object.__setattr__(self, k, v)
+            else:
+                if self._extra is None: self._extra = {}
+                self._extra[k] = v
+
+    @classmethod
+    def from_rows(cls, keys, rows):
+        """Registros con las mismas claves `keys` para cada tupla de valores de `rows` (guardado del editor)."""
+        keys = tuple(keys)
+        sh = shape(keys)
+        slot = [k in _SLOTS for k in keys]
+        intern = [k in _INTERNED for k in keys]
+        out = []
+        for vals in rows:
+            r = cls.__new__(cls)
+            r._shape, r._extra = sh, None
+            for k, v, s, i in zip(keys, vals, slot, intern):
+                if i and type(v) is str: v = sys.intern(v)
+                if s:
+                    object.__setattr__(r, k, v)
+                else:
+                    if r._extra is None: r._extra = {}
+                    r._extra[k] = v
+            out.append(r)
+        return out
+
+    # --- interfaz de dict ---
+    def __getitem__(self, key):
+        if key not in self._shape.index: raise KeyError(key)
+        return getattr(self, key) if key in _SLOTS else self._extra[key]
+
+    def get(self, key, default=None):
+        if key not in self._shape.index: return default
+        return getattr(self, key) if key in _SLOTS else self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in _INTERNED and type(value) is str: value = sys.intern(value)
+        if key not in self._shape.index: self._shape = self._shape.add(key)
+        if key in _SLOTS:
+            object.__setattr__(self, key, value)
+        else:
+            if self._extra is None: self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._shape.index: raise KeyError(key)
+        self._shape = self._shape.drop(key)
+        if key in _SLOTS:
+            object.__delattr__(self, key)
+        else:
+            del self._extra[key]
+            if not self._extra: self._extra = None
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+    def __len__(self):
+        return len(self._shape.keys)
+
+    def __contains__(self, key):
+        return key in self._shape.index
+
+    def to_dict(self):
+        return {k: self[k] for k in self._shape.keys}
+
+    def copy(self):
+        return FieldRecord(self)
+
+    def __reduce__(self):
+        return FieldRecord, (list(self.items()),)
+
+    def __repr__(self):
+        return f"FieldRecord({self.to_dict()!r})"
+
+
+def compact_fields(field_metadata):
+    """Convierte en sitio los valores de un field_metadata en FieldRecord. Devuelve el mismo dict."""
+    for k, m in field_metadata.items():
+        if isinstance(m, Mapping) and not isinstance(m, FieldRecord): field_metadata[k] = FieldRecord(m)
+    return field_metadata
+
+
+def compact_endpoint(ep):
+    for direction in ("request", "response"):
+        d = ep.get(direction)
+        if isinstance(d, Mapping) and isinstance(d.get("field_metadata"), dict): compact_fields(d["field_metadata"])
+    return ep
+
+
+def compact_project(project):
+    """Compacta los endpoints del proyecto; en carpeta sólo los ya cargados (el resto, al leer su shard)."""
+    eps = project.get("endpoints")
+    if not isinstance(eps, Mapping): return project
+    for n in (eps.loaded() if hasattr(eps, "loaded") else list(eps)):
+        ep = eps[n]
+        if isinstance(ep, Mapping): compact_endpoint(ep)
+    return project
+
+
+# --- JSON ---
+def json_default(obj):
+    """default= de json.dumps: FieldRecord -> dict; lo demás sigue sin ser serializable."""
+    if isinstance(obj, FieldRecord): return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_default_str(obj):
+    """Como json_default, pero con str() para lo demás (donde antes se usaba default=str)."""
+    return obj.to_dict() if isinstance(obj, FieldRecord) else str(obj)
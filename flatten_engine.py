@@ -0,0 +1,118 @@
+# --- MOTOR DE APLANADO (compartido por app.py y mapper_tool.py) ---
+# Recorre el payload con una pila explícita (sin límite de recursión) y emite
+# pares (ruta, valor). Las rutas de cada contenedor se calculan una única vez y se
+# reutilizan entre elementos de un array, así la memoria crece con el número de
+# rutas distintas y no con el tamaño del payload.
+
+ARRAY_SUFFIX = "[*]"
+EMPTY_LIST = "[]"
+DEFAULT_MAX_SAMPLES = 5
+
+
+def _dict_children(x, path, names):
+    for k, v in x.items():
+        key = (path, k)
+        p = names.get(key)
+        if p is None:
+            p = names[key] = f"{path}.{k}" if path else f"{k}"
+        yield v, p
+
+
+def _list_children(x, path):
+    for v in x:
+        yield v, path
+
+
+def iter_leaves(y, merge_arrays=False, array_suffix=ARRAY_SUFFIX, path=""):
+    """Genera (ruta, valor) de cada hoja de `y`.
+
+    Por defecto sólo se recorre x[0] de cada lista (comportamiento histórico). Con
+    merge_arrays=True se recorren todos los elementos y sus claves se unen bajo
+    'items[*].campo' (o 'items.campo' si array_suffix=""). `path` es el prefijo de `y`.
+    """
+    names = {}
+    stack = [iter(((y, path),))]
+    while stack:
+        for x, path in stack[-1]:
+            if isinstance(x, dict):
+                if x:
+                    stack.append(_dict_children(x, path, names))
+                    break
+            elif isinstance(x, list):
+                if not x:
+                    yield path, EMPTY_LIST
+                elif merge_arrays:
+                    stack.append(_list_children(x, path + array_suffix))
+                    break
+                else:
+                    stack.append(iter(((x[0], path),)))
+                    break
+            else:
+                yield path, x
+        else:
+            stack.pop()
+
+
+class PathStats:
+    __slots__ = ("example", "count", "samples")
+
+    def __init__(self, value):
+        self.example = value
+        self.count = 1
+        self.samples = [value]
+
+
+class FlatCollector:
+    """Acumula rutas aplanadas de uno o varios documentos con una muestra acotada de valores."""
+
+    def __init__(self, max_samples=DEFAULT_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self.paths = {}
+        self.records = 0
+
+    def add(self, path, value):
+        st = self.paths.get(path)
+        if st is None:
+            self.paths[path] = PathStats(value)
+            return
+        st.count += 1
+        smp = st.samples
+        if len(smp) < self.max_samples and value not in smp: smp.append(value)
+
+    def add_record(self, y, merge_arrays=True, array_suffix=ARRAY_SUFFIX):
+        self.records += 1
+        add = self.add
+        for p, v in iter_leaves(y, merge_arrays=merge_arrays, array_suffix=array_suffix): add(p, v)
+        return self
+
+    def examples(self):
+        """{ruta: primer valor visto}, mismo formato que flatten_payload."""
+        return {p: st.example for p, st in self.paths.items()}
+
+    def samples(self, path):
+        st = self.paths.get(path)
+        return list(st.samples) if st else []
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return path in self.paths
+
+
+def flatten_payload(y, merge_arrays=False, array_suffix=ARRAY_SUFFIX):
+    out = {}
+    if merge_arrays:
+        for p, v in iter_leaves(y, True, array_suffix):
+            if p not in out: out[p] = v
+    else:
+        for p, v in iter_leaves(y):
+            out[p] = v
+    return out
+
+
+def flatten_with_stats(y, merge_arrays=True, max_samples=DEFAULT_MAX_SAMPLES, array_suffix=ARRAY_SUFFIX,
+                       collector=None):
+    """Aplana `y` en un FlatCollector (nuevo o el recibido) y lo devuelve."""
+    if collector is None: collector = FlatCollector(max_samples=max_samples)
+    return collector.add_record(y, merge_arrays=merge_arrays, array_suffix=array_suffix)
@@ -0,0 +1,353 @@
+# --- INGESTA JSON EN STREAMING ---
+# Lee el payload por trozos y va emitiendo (ruta, valor) directamente a un
+# FlatCollector, sin construir nunca el árbol completo en memoria. Acepta rutas de
+# fichero, ficheros subidos (st.file_uploader), buffers binarios o de texto.
+#
+# - Documento único: se recorre token a token. Si el documento raíz es un array,
+#   cada elemento cuenta como un registro (igual que una lista de ejemplos).
+# - NDJSON (un registro por línea): cada línea se decodifica por separado, así la
+#   memoria máxima es la de la línea más grande.
+import codecs
+import json
+import os
+import re
+from json.decoder import scanstring
+
+from flatten_engine import ARRAY_SUFFIX, DEFAULT_MAX_SAMPLES, EMPTY_LIST, FlatCollector, iter_leaves
+
+CHUNK_SIZE = 1 << 16
+NDJSON_EXT = (".ndjson", ".jsonl")
+
+_WS = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'(-?(?:0|[1-9]\d*))(\.\d+)?([eE][-+]?\d+)?')
+_CONSTS = (("true", True), ("false", False), ("null", None),
+           ("NaN", float("nan")), ("Infinity", float("inf")), ("-Infinity", float("-inf")))
+_LOOKAHEAD = 32
+# Tamaño máximo (caracteres) de un elemento de array que se decodifica de una vez
+ELEMENT_LIMIT = 1 << 22
+# Límite de un elemento suelto de iter_array (p. ej. una entrada de HAR con el body completo)
+ITEM_LIMIT = 1 << 28
+_DECODER = json.JSONDecoder()
+_NUM_CONT = frozenset("0123456789.eE+-")
+
+
+class _Tokens:
+    """Tokenizador JSON incremental sobre un fichero (bytes o texto) leído por trozos."""
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE, fix_quotes=False):
+        self.fp, self.chunk_size, self.fix_quotes = fp, chunk_size, fix_quotes
+        self.buf, self.pos, self.eof = "", 0, False
+        self.dec = None
+        self.started = False
+
+    def _fill(self):
+        while not self.eof:
+            raw = self.fp.read(self.chunk_size)
+            if isinstance(raw, bytes):
+                if self.dec is None: self.dec = codecs.getincrementaldecoder("utf-8-sig")()
+                text = self.dec.decode(raw, final=not raw)
+            else:
+                text = raw
+            if not raw: self.eof = True
+            if text:
+                if not self.started:
+                    self.started = True
+                    text = text.lstrip("\ufeff")
+                if self.fix_quotes: text = text.replace("“", '"').replace("”", '"')
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return True
+        return False
+
+    def _fill_to(self, n):
+        """Lee hasta tener al menos n caracteres pendientes (o llegar al final)."""
+        while len(self.buf) - self.pos < n and self._fill(): pass
+        return len(self.buf) - self.pos >= n
+
+    def try_value(self, limit, allow_array=True):
+        """Intenta decodificar de una vez el siguiente valor si cabe en `limit` caracteres.
+
+        Devuelve (False, None) si no hay valor completo (cierre de array, fin de datos, valor
+        demasiado grande o mal formado): en ese caso el llamante sigue token a token.
+        """
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf): break
+            if not self._fill(): return False, None
+        c = self.buf[self.pos]
+        if c in ']},:' or (c == '[' and not allow_array): return False, None
+        want = min(len(self.buf) - self.pos, limit)
+        while True:
+            try:
+                val, end = _DECODER.raw_decode(self.buf, self.pos)
+                # Un número al final del buffer puede continuar en el siguiente trozo
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUM_CONT):
+                    self.pos = end
+                    return True, val
+            except json.JSONDecodeError:
+                pass
+            if want >= limit or self.eof: return False, None
+            want = min(want * 2, limit)
+            self._fill_to(want)
+
+    def error(self, msg):
+        return json.JSONDecodeError(msg, self.buf, self.pos)
+
+    def next(self):
+        """Devuelve (tipo, valor): tipo es '{', '}', '[', ']', ',', ':', 's' (string), 'v' (escalar) o None al final."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf): break
+            if not self._fill(): return None, None
+
+        c = self.buf[self.pos]
+        if c in '{}[],:':
+            self.pos += 1
+            return c, None
+
+        if c == '"':
+            while True:
+                try:
+                    s, self.pos = scanstring(self.buf, self.pos + 1)
+                    return 's', s
+                except json.JSONDecodeError as e:
+                    # Sólo se piden más datos si el string puede estar cortado por el trozo
+                    truncated = e.msg.startswith("Unterminated") or e.pos >= len(self.buf) - 6
+                    if not truncated or not self._fill(): raise
+
+        while len(self.buf) - self.pos < _LOOKAHEAD and self._fill(): pass
+        m = _NUMBER.match(self.buf, self.pos)
+        while m and m.end() == len(self.buf) and self._fill():
+            m = _NUMBER.match(self.buf, self.pos)
+        if m:
+            integer, frac, exp = m.groups()
+            self.pos = m.end()
+            if frac or exp: return 'v', float(integer + (frac or '') + (exp or ''))
+            return 'v', int(integer)
+        for word, val in _CONSTS:
+            if self.buf.startswith(word, self.pos):
+                self.pos += len(word)
+                return 'v', val
+        raise self.error("Expecting value")
+
+
+# Estados del recorrido
+_VALUE, _KEY, _COLON, _AFTER = range(4)
+# Índices de los frames: [tipo ('D' dict, 'L' lista, 'R' array raíz de registros), ruta, emitir, n, ruta hija]
+_K, _PATH, _EMIT, _N, _CHILD = range(5)
+
+
+def _walk(tok, on_leaf, on_record, merge_arrays, array_suffix, element_limit):
+    names = {}
+    stack = []
+    state = _VALUE
+    while True:
+        # Atajo: los elementos de arrays (y los registros raíz) suelen ser pequeños; se
+        # decodifican enteros en C y se aplanan con iter_leaves en lugar de token a token.
+        if state == _VALUE and (not stack or stack[-1][_K] != 'D'):
+            ok, val = tok.try_value(element_limit, allow_array=bool(stack))
+            if ok:
+                if not stack or stack[-1][_K] == 'R':
+                    on_record()
+                    path, emit = "", True
+                else:
+                    top = stack[-1]
+                    path, emit = top[_CHILD], top[_EMIT] and (merge_arrays or top[_N] == 0)
+                if stack: stack[-1][_N] += 1
+                if emit:
+                    for p, v in iter_leaves(val, merge_arrays, array_suffix, path): on_leaf(p, v)
+                state = _AFTER if stack else _VALUE
+                continue
+
+        kind, val = tok.next()
+        if kind is None:
+            if stack or state != _VALUE: raise tok.error("Unexpected end of JSON")
+            return
+
+        if state == _VALUE:
+            if not stack:
+                if kind == '[':
+                    stack.append(['R', "", True, 0, ""])
+                    continue
+                on_record()
+                path, emit = "", True
+            else:
+                top = stack[-1]
+                if kind == ']' and top[_N] == 0 and top[_K] != 'D':
+                    stack.pop()
+                    if top[_K] == 'L' and top[_EMIT]: on_leaf(top[_PATH], EMPTY_LIST)
+                    state = _AFTER if stack else _VALUE
+                    continue
+                if top[_K] == 'R':
+                    on_record()
+                    path, emit = "", True
+                elif top[_K] == 'L':
+                    path, emit = top[_CHILD], top[_EMIT] and (merge_arrays or top[_N] == 0)
+                else:
+                    path, emit = top[_CHILD], top[_EMIT]
+                top[_N] += 1
+
+            if kind == '{':
+                stack.append(['D', path, emit, 0, None])
+                state = _KEY
+            elif kind == '[':
+                stack.append(['L', path, emit, 0, path + array_suffix if merge_arrays else path])
+            elif kind == 's' or kind == 'v':
+                if emit: on_leaf(path, val)
+                state = _AFTER if stack else _VALUE
+            else:
+                raise tok.error("Expecting value")
+
+        elif state == _KEY:
+            top = stack[-1]
+            if kind == 's':
+                key = (top[_PATH], val)
+                p = names.get(key)
+                if p is None: p = names[key] = f"{top[_PATH]}.{val}" if top[_PATH] else val
+                top[_CHILD] = p
+                state = _COLON
+            elif kind == '}' and top[_N] == 0:
+                stack.pop()
+                state = _AFTER if stack else _VALUE
+            else:
+                raise tok.error("Expecting property name enclosed in double quotes")
+
+        elif state == _COLON:
+            if kind != ':': raise tok.error("Expecting ':' delimiter")
+            state = _VALUE
+
+        else:
+            top = stack[-1]
+            if kind == ',':
+                state = _KEY if top[_K] == 'D' else _VALUE
+            elif (kind == '}' and top[_K] == 'D') or (kind == ']' and top[_K] != 'D'):
+                stack.pop()
+                state = _AFTER if stack else _VALUE
+            else:
+                raise tok.error("Expecting ',' delimiter")
+
+
+def _skip_value(tok):
+    """Salta el siguiente valor token a token (sin decodificarlo entero)."""
+    depth = 0
+    while True:
+        kind, _ = tok.next()
+        if kind is None: raise tok.error("Unexpected end of JSON")
+        if kind in '{[':
+            depth += 1
+        elif kind in '}]':
+            depth -= 1
+        if depth == 0 and kind not in ',:': return
+
+
+def _seek_key(tok, key):
+    """Dentro de un objeto recién abierto, avanza hasta el valor de `key`. False si no existe."""
+    while True:
+        kind, val = tok.next()
+        if kind == '}': return False
+        if kind == ',': kind, val = tok.next()
+        if kind != 's': raise tok.error("Expecting property name enclosed in double quotes")
+        if tok.next()[0] != ':': raise tok.error("Expecting ':' delimiter")
+        if val == key: return True
+        _skip_value(tok)
+
+
+def _descend(tok, path):
+    """Avanza hasta el valor de `path` (claves de objetos anidados). False si no existe."""
+    for key in path:
+        if tok.next()[0] != '{' or not _seek_key(tok, key): return False
+    return True
+
+
+def iter_array(source, path=(), chunk_size=CHUNK_SIZE, element_limit=ITEM_LIMIT):
+    """Genera uno a uno los elementos del array en `path` (p. ej. ("log", "entries") de un HAR).
+
+    Sólo se mantiene en memoria el elemento actual; lo que no está en `path` se salta
+    token a token. Si la ruta no existe no se genera nada.
+    """
+    fp, owned = _open(source)
+    try:
+        tok = _Tokens(fp, chunk_size)
+        if not _descend(tok, path) or tok.next()[0] != '[': return
+        while True:
+            ok, val = tok.try_value(element_limit)
+            if not ok:
+                kind, _ = tok.next()
+                if kind == ']': return
+                raise tok.error("Array element too large or malformed")
+            yield val
+            kind, _ = tok.next()
+            if kind == ']': return
+            if kind != ',': raise tok.error("Expecting ',' delimiter")
+    finally:
+        if owned: fp.close()
+
+
+def iter_items(source, path=(), skip=(), chunk_size=CHUNK_SIZE, element_limit=ITEM_LIMIT):
+    """Genera (clave, valor) del objeto en `path`, decodificando un valor cada vez.
+
+    Las claves de `skip` se saltan token a token (p. ej. "endpoints" al leer la cabecera
+    de un proyecto grande).
+    """
+    fp, owned = _open(source)
+    try:
+        tok = _Tokens(fp, chunk_size)
+        if not _descend(tok, path) or tok.next()[0] != '{': return
+        while True:
+            kind, key = tok.next()
+            if kind == '}': return
+            if kind == ',': kind, key = tok.next()
+            if kind != 's': raise tok.error("Expecting property name enclosed in double quotes")
+            if tok.next()[0] != ':': raise tok.error("Expecting ':' delimiter")
+            if key in skip:
+                _skip_value(tok)
+                continue
+            ok, val = tok.try_value(element_limit)
+            if not ok: raise tok.error("Object value too large or malformed")
+            yield key, val
+    finally:
+        if owned: fp.close()
+
+
+def _open(source):
+    if isinstance(source, (str, os.PathLike)): return open(source, "rb"), True
+    if hasattr(source, "seek"):
+        try:
+            source.seek(0)
+        except Exception:
+            pass
+    return source, False
+
+
+def is_ndjson_name(name):
+    return str(name or "").lower().endswith(NDJSON_EXT)
+
+
+def stream_json(source, collector=None, ndjson=None, merge_arrays=True, array_suffix=ARRAY_SUFFIX,
+                max_samples=DEFAULT_MAX_SAMPLES, chunk_size=CHUNK_SIZE, fix_quotes=False):
+    """Aplana en streaming un JSON/NDJSON y devuelve el FlatCollector con rutas, ejemplos y nº de registros.
+
+    `source` puede ser una ruta o un objeto con .read() (bytes o texto). Si ndjson es None
+    se decide por la extensión del nombre (.ndjson / .jsonl).
+    """
+    if collector is None: collector = FlatCollector(max_samples=max_samples)
+    if ndjson is None: ndjson = is_ndjson_name(source if isinstance(source, (str, os.PathLike))
+                                               else getattr(source, "name", ""))
+    fp, owned = _open(source)
+    try:
+        if ndjson:
+            for line in fp:
+                if fix_quotes:
+                    if isinstance(line, bytes): line = line.decode("utf-8-sig")
+                    line = line.replace("“", '"').replace("”", '"')
+                if not line.strip(): continue
+                collector.add_record(json.loads(line), merge_arrays=merge_arrays, array_suffix=array_suffix)
+        else:
+            def on_record():
+                collector.records += 1
+
+            _walk(_Tokens(fp, chunk_size, fix_quotes), collector.add, on_record, merge_arrays, array_suffix,
+                  ELEMENT_LIMIT)
+    finally:
+        if owned: fp.close()
+    return collector
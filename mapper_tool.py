@@ -1,34 +1,28 @@
 import streamlit as st
 import pandas as pd
-import json
-import xmltodict
 import time
 import os
 import sys
+import io
+from functools import partial
+
+import perf_log
+from auto_mapping import auto_fill, get_suggestion_index
+from dto_cache import DtoOptionCache
+from edit_journal import session_journal
+from field_records import compact_fields
+from json_stream import stream_json
+from mapping_table import PAGE_SIZES, STATUS_OPTS, collect_local_edits, get_table_index, page_count, page_slice
+from project_store import export_bytes, load_json_file
+from schema_inference import SchemaStats, infer_schema_files
+from shared_store import STORE, StoreHandle
+from xml_stream import stream_xml
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="Mapper (Local)", layout="wide", page_icon="💻", initial_sidebar_state="collapsed")
 
 
 # --- FUNCIONES DE LÓGICA ---
-def flatten_payload(y):
-    out = {}
-
-    def flatten(x, name=''):
-        if isinstance(x, dict):
-            for a in x: flatten(x[a], name + a + '.')
-        elif isinstance(x, list):
-            if len(x) > 0:
-                flatten(x[0], name)
-            else:
-                out[name[:-1]] = "[]"
-        else:
-            out[name[:-1]] = x
-
-    flatten(y)
-    return out
-
-
 def unflatten_json(d):
     res = {}
     for k, v in d.items():
@@ -41,25 +35,7 @@ def unflatten_json(d):
     return res
 
 
-def infer_smart_type(key, value):
-    if value is not None:
-        t = type(value).__name__
-        m = {'str': 'String', 'int': 'Integer', 'float': 'Decimal', 'bool': 'Boolean', 'dict': 'Object',
-             'list': 'Array'}
-        return m.get(t, t)
-    k = key.lower()
-    if any(x in k for x in ['dt', 'date', 'time']): return 'DateTime?'
-    if any(x in k for x in ['flag', 'is_']): return 'Boolean?'
-    if any(x in k for x in ['qtd', 'peso', 'valor', 'total']): return 'Decimal?'
-    if any(x in k for x in ['id', 'cod', 'num', 'cpf', 'cnpj']): return 'String?'
-    return 'String? (null)'
-
-
 # --- COLORES Y ESTADOS ---
-STATUS_OPTS = ["⚪ Sin Estado", "🔵 Revisar con Analista", "🟡 Revisar con Courier", "✅ Valor Confirmado",
-               "🌫️ Valor Omitido", "🟠 Revisar con ITX", "🟣 Validar Frontal", "🧪 Postman", "🟢 Pendiente de verificar TL"]
-
-
 def get_row_color(s):
     c = {"Analista": '#e3f2fd', "Courier": '#fff9c4', "Confirmado": '#dcedc8', "Omitido": '#f5f5f5', "ITX": '#ffe0b2',
          "Frontal": '#e1bee7', "Postman": '#ffff00', "TL": '#2e7d32'}
@@ -68,13 +44,36 @@ def get_row_color(s):
     return ''
 
 
+_STATUS_CSS = {s: get_row_color(s) for s in STATUS_OPTS}
+
+
+def color_rows(df):
+    """Estilo de toda la tabla de una vez (Styler.apply con axis=None): el color sale de la columna Estado."""
+    est = df["Estado"].astype(str)
+    css = est.map(_STATUS_CSS)
+    miss = css.isna()
+    if miss.any(): css[miss] = est[miss].map(get_row_color)
+    return pd.DataFrame({c: css for c in df.columns}, index=df.index)
+
+
 # --- ESTADO DE SESIÓN (RAM) ---
-# Aquí guardamos todo mientras la app está abierta. Al cerrar se pierde (como un Excel sin guardar)
+# Aquí guardamos todo mientras la app está abierta. Cada cambio se anota además en un diario
+# en disco local (edit_journal, uno por sesión), así al recargar la página se recupera lo editado.
+# Las etapas de cada rerun se cronometran para el panel "Diagnóstico" y el log local (perf_log).
+perf = perf_log.begin(st.session_state, "mapper_tool")
+journal = session_journal(st.session_state, "mapper_tool", st.query_params)
 if 'session_data' not in st.session_state:
     st.session_state.session_data = {
         "courier": "", "endpoint": "", "notes": "",
         "map": {}, "meta": {}, "std": {}  # std = estándar interno
     }
+    restored = journal.restore() if journal else None
+    if restored:
+        # "edits" = última versión de la tabla editada, que pasa a ser el proyecto cargado
+        edits = restored.pop("edits", None)
+        st.session_state.session_data.update(restored)
+        if edits: st.session_state.session_data.update(map=edits["map"], meta=edits["meta"])
+        compact_fields(st.session_state.session_data["meta"])
 
 # --- BARRA LATERAL: CARGAR / GUARDAR ---
 with st.sidebar:
@@ -82,18 +81,18 @@ with st.sidebar:
 
     # 1. CARGAR PROYECTO
     st.subheader("1. Abrir Proyecto")
-    uploaded_file = st.file_uploader("Sube un JSON (.json)", type=["json"])
+    uploaded_file = st.file_uploader("Sube un JSON (.json / .json.gz)", type=["json", "gz"])
 
     if uploaded_file is not None:
         # Botón para confirmar la carga (evita recargas accidentales)
         if st.button("📂 Cargar Datos"):
             try:
-                data = json.load(uploaded_file)
+                data = load_json_file(uploaded_file)
                 st.session_state.session_data["courier"] = data.get("courier_name", "")
                 st.session_state.session_data["endpoint"] = data.get("endpoint", "")
                 st.session_state.session_data["notes"] = data.get("project_notes", "")
                 st.session_state.session_data["map"] = data.get("mapping_rules", {})
-                st.session_state.session_data["meta"] = data.get("field_metadata", {})
+                st.session_state.session_data["meta"] = compact_fields(data.get("field_metadata", {}))
                 st.toast("Proyecto Cargado Correctamente", icon="✅")
             except Exception as e:
                 st.error(f"Error: {e}")
@@ -110,17 +109,22 @@ with st.sidebar:
 
     if uploaded_std:
         try:
-            std_to_use = json.load(uploaded_std)
+            _, std_to_use = STORE.load(uploaded_std.getvalue())  # el mismo fichero se parsea una vez por proceso
         except:
             pass
     elif st.session_state.session_data["std"]:
         std_to_use = st.session_state.session_data["std"]  # Usar el que ya teníamos en memoria
 
-    st.session_state.session_data["std"] = std_to_use  # Guardar en memoria
+    # Guardar en memoria: el objeto compartido entre sesiones (la sesión sólo lo referencia)
+    if 'shared' not in st.session_state: st.session_state.shared = StoreHandle(STORE)
+    std_to_use, = st.session_state.shared.share(std_to_use)
+    st.session_state.session_data["std"] = std_to_use
 
-    # Preparar opciones para el dropdown
-    flat_std = flatten_payload(std_to_use)
-    std_options = ["SELECCIONAR_CAMPO", "IGNORED_FIELD"] + sorted([f"{k} | {v}" for k, v in flat_std.items()])
+    # Preparar opciones para el dropdown (aplanadas una vez por proceso y contenido del estándar)
+    if 'std_cache' not in st.session_state: st.session_state.std_cache = DtoOptionCache(max_entries=8, store=STORE)
+    with perf.stage("dto_options"):
+        std_options = ["SELECCIONAR_CAMPO", "IGNORED_FIELD"] + st.session_state.std_cache.options(
+            {"std": std_to_use}, prefixed=False)
 
 # --- UI PRINCIPAL ---
 st.markdown(f"### 🛠️ Editor Local")
@@ -149,66 +153,72 @@ with tab_map:
 
     # INPUT PAYLOAD
     t1, t2 = st.tabs(["📄 Pegar Texto", "📁 Subir Payload"])
-    raw = None
+    # Se recorren todos los elementos de los arrays / líneas NDJSON (mismas rutas que antes).
+    # Con varias muestras se combina el esquema: tipos, nulos/ausencias y longitud máxima.
+    schema = None
     with t1:
         txt = st.text_area("JSON / XML Response", height=100)
         if txt:
-            if txt.strip().startswith(("{", "[")):
-                raw = json.loads(txt)
-            elif txt.strip().startswith("<"):
-                raw = xmltodict.parse(txt)
+            # Parseo y aplanado van juntos (streaming): una sola etapa
+            with perf.stage("payload_parse"):
+                if txt.strip().startswith(("{", "[")):
+                    schema = stream_json(io.StringIO(txt), collector=SchemaStats(), merge_arrays=True,
+                                         array_suffix="")
+                elif txt.strip().startswith("<"):
+                    schema = stream_xml(io.StringIO(txt), collector=SchemaStats())
     with t2:
-        f = st.file_uploader("Archivo Payload", type=['json', 'xml'])
-        if f:
-            if f.name.endswith('.json'):
-                raw = json.load(f)
-            elif f.name.endswith('.xml'):
-                raw = xmltodict.parse(f.read())
+        fs = st.file_uploader("Archivos Payload (uno o varios de muestra)", type=['json', 'ndjson', 'jsonl', 'xml'],
+                              accept_multiple_files=True)
+        if fs:
+            with perf.stage("payload_parse", files=len(fs)):
+                schema = infer_schema_files([(f.name, f.getvalue()) for f in fs])
+            for n, err in schema.errors: st.error(f"{n}: {err}")
 
     # PROCESAMIENTO
-    keys, exs, typs = [], [], []
-    if raw:
-        if isinstance(raw, list) and raw: raw = raw[0]
-        flat = flatten_payload(raw)
-        keys = list(flat.keys())
-        for k in keys:
-            exs.append(str(flat[k])[:100])
-            typs.append(infer_smart_type(k, flat[k]))
+    keys, exs, typs, lims = [], [], [], []
+    edits = None
+    if schema:
+        # Tipos con el motor común de type_inference (formatos de los textos detectados de una vez)
+        with perf.stage("type_inference", fields=len(schema)):
+            types = schema.field_types()
+            keys = list(types)
+            for k in keys:
+                exs.append(types[k][0])
+                typs.append(types[k][1])
+                lims.append(schema.size_limit(k))
     elif prev_meta:
         # Si no hay payload nuevo, tiramos de lo guardado
         keys = list(prev_meta.keys())
         for k in keys:
             exs.append(prev_meta[k].get("example_value", ""))
             typs.append(prev_meta[k].get("type", ""))
+            lims.append("")
 
     if keys:
-        rows, done_n = [], 0
-        for i, k in enumerate(keys):
-            tgt = "SELECCIONAR_CAMPO"
-            # Recuperar Target
-            for t, s in prev_map.items():
-                if s == k:
-                    for o in std_options:
-                        if t == o.split(" | ")[0]: tgt = o; break
-                    break
-
-            meta = prev_meta.get(k, {})
-            if meta.get("is_done"): done_n += 1
-
-            rows.append({
-                "Done": meta.get("is_done", False),
-                "Estado": meta.get("status_tag", "⚪ Sin Estado"),
-                "Campo del Courier": k,
-                "Valor (HD)": tgt,
-                "Valor de ejemplo": exs[i],
-                "Tipo de atributo": typs[i],
-                "Requerido": meta.get("required", "?"),
-                "Limite de tamaño": meta.get("size_limit", ""),
-                "Descripción Docs": meta.get("doc_desc", ""),
-                "Comentario TL": meta.get("comment_tl", ""),
-                "Comentario Desarrollador": meta.get("comment_dev", ""),
-                "Comentario Analista": meta.get("comment_analyst", "")
-            })
+        with perf.stage("rows", rows=len(keys)):
+            t_idx = get_table_index(prev_map, std_options)
+            rows, done_n = [], 0
+            for i, k in enumerate(keys):
+                # Recuperar Target
+                tgt = t_idx.resolve(k, keep_unknown=False)
+
+                meta = prev_meta.get(k, {})
+                if meta.get("is_done"): done_n += 1
+
+                rows.append({
+                    "Done": meta.get("is_done", False),
+                    "Estado": meta.get("status_tag", "⚪ Sin Estado"),
+                    "Campo del Courier": k,
+                    "Valor (HD)": tgt,
+                    "Valor de ejemplo": exs[i],
+                    "Tipo de atributo": typs[i],
+                    "Requerido": meta.get("required", "?"),
+                    "Limite de tamaño": meta.get("size_limit") or lims[i],
+                    "Descripción Docs": meta.get("doc_desc", ""),
+                    "Comentario TL": meta.get("comment_tl", ""),
+                    "Comentario Desarrollador": meta.get("comment_dev", ""),
+                    "Comentario Analista": meta.get("comment_analyst", "")
+                })
 
         # UI TABLA
         st.write("---")
@@ -218,7 +228,9 @@ with tab_map:
         with c_p:
             st.progress(done_n / len(keys) if keys else 0)
 
-        edited = st.data_editor(pd.DataFrame(rows), column_config={
+        with perf.stage("data_editor", rows=len(rows)):
+            df_rows = pd.DataFrame(rows)
+        edited = st.data_editor(df_rows, column_config={
             "Done": st.column_config.CheckboxColumn("✅", width="small"),
             "Estado": st.column_config.SelectboxColumn("Estado 🎨", options=STATUS_OPTS, width="medium", required=True),
             "Campo del Courier": st.column_config.TextColumn(disabled=True),
@@ -229,24 +241,40 @@ with tab_map:
         }, use_container_width=True, hide_index=True, height=500)
 
         with st.expander("👁️ Vista Coloreada"):
-            st.dataframe(edited.style.apply(lambda r: [get_row_color(r["Estado"])] * len(r), axis=1),
-                         use_container_width=True, hide_index=True)
+            # Filtro + paginación: sólo se estiliza y se envía la página visible
+            v1, v2, v3, v4 = st.columns([2, 2, 1, 1])
+            v_status = v1.multiselect("Estado", STATUS_OPTS, key="cv_status")
+            v_text = v2.text_input("Buscar", key="cv_text")
+            view = edited[edited["Estado"].isin(v_status)] if v_status else edited
+            if v_text:
+                hit = pd.concat([view[c].astype(str).str.contains(v_text, case=False, regex=False)
+                                 for c in view.columns], axis=1).any(axis=1)
+                view = view[hit]
+            v_size = v3.selectbox("Filas", PAGE_SIZES, index=1, key="cv_size")
+            v_pages = page_count(len(view), v_size)
+            # La página vive sólo en session_state (sin value=): se inicializa y se acota antes del widget
+            st.session_state.setdefault("cv_page", 1)
+            if st.session_state.cv_page > v_pages: st.session_state.cv_page = v_pages
+            v_page = v4.number_input("Página", min_value=1, max_value=v_pages, step=1, key="cv_page")
+            st.caption(f"{len(view)} de {len(edited)} campos · página {v_page} de {v_pages}")
+            with perf.stage("styled_view", rows=min(v_size, len(view))):
+                st.dataframe(page_slice(view, v_page, v_size).style.apply(color_rows, axis=None),
+                             use_container_width=True, hide_index=True)
 
         st.divider()
 
         # --- GENERACIÓN DEL JSON PARA GUARDAR ---
-        f_map, f_meta, f_done = {}, {}, 0
-        for _, r in edited.iterrows():
-            if "SELECCIONAR" not in r["Valor (HD)"] and "IGNORED" not in r["Valor (HD)"]:
-                f_map[r["Valor (HD)"].split(" | ")[0]] = r["Campo del Courier"]
-            if r["Done"]: f_done += 1
-            f_meta[r["Campo del Courier"]] = {
-                "required": r["Requerido"], "comment_tl": r["Comentario TL"],
-                "example_value": r["Valor de ejemplo"], "type": r["Tipo de atributo"],
-                "is_done": r["Done"], "status_tag": r["Estado"],
-                "comment_dev": r["Comentario Desarrollador"], "comment_analyst": r["Comentario Analista"],
-                "size_limit": r["Limite de tamaño"], "doc_desc": r["Descripción Docs"]
-            }
+        with perf.stage("save", rows=len(edited)):
+            f_map, f_meta, f_done = collect_local_edits(edited)
+        edits = {"map": f_map, "meta": f_meta}
+
+        # --- SUGERENCIAS DE MAPEO ---
+        # Rellena los campos sin target con la sugerencia más fiable del estándar (lo editado se conserva)
+        if st.button("🪄 Autocompletar mapeo", use_container_width=True):
+            sd["map"], sd["meta"] = f_map, f_meta
+            added = auto_fill(sd["map"], f_meta, get_suggestion_index(std_options))
+            st.toast(f"{len(added)} campos mapeados automáticamente.")
+            st.rerun()
 
         out_json = {
             "courier_name": cour, "endpoint": endp, "project_notes": notas,
@@ -259,11 +287,16 @@ with tab_map:
         fn = f"spec_{cour}_{endp}.json".replace(" ", "_").lower()
         if not fn.endswith(".json"): fn = "spec_proyecto.json"
 
+        # Se serializa por trozos sólo al pulsar (descarga diferida), compacto y/o gzip si se pide
+        dl1, dl2 = st.columns(2)
+        out_gz = dl1.toggle("Comprimir (.gz)", key="out_gz")
+        out_compact = dl2.toggle("Compacto", key="out_compact", help="Sin sangría: más pequeño y rápido")
         st.download_button(
             label="💾 Descargar Proyecto (.json)",
-            data=json.dumps(out_json, indent=4),
-            file_name=fn,
-            mime="application/json",
+            data=partial(perf_log.timed, "mapper_tool", st.session_state.get("_perf_session"), "json_export",
+                         export_bytes, out_json, compact=out_compact, compress=out_gz),
+            file_name=fn + ".gz" if out_gz else fn,
+            mime="application/gzip" if out_gz else "application/json",
             type="primary",
             use_container_width=True
         )
@@ -274,4 +307,26 @@ with tab_map:
 with tab_std:
     # Solo visualización para no complicar el modo local
     st.info("Para editar el estándar, edita el JSON localmente y súbelo de nuevo.")
-    st.json(std_to_use, expanded=True)
\ No newline at end of file
+    st.json(std_to_use, expanded=True)
+
+# Autoguardado: sólo se escribe lo que ha cambiado desde el rerun anterior
+if journal:
+    with perf.stage("autosave"):
+        journal.sync_state(dict(sd, edits=edits) if edits else sd)
+
+# --- DIAGNÓSTICO ---
+perf_log.end(st.session_state)
+with st.sidebar.expander("⏱️ Diagnóstico"):
+    perf_hist = perf_log.history(st.session_state)
+    if perf_hist:
+        last = perf_hist[-1]
+        st.caption(f"Último rerun: {last['total_ms']:.0f} ms · RSS {last['rss_mb']} MB")
+        st.dataframe(pd.DataFrame(last["stages"], columns=["stage", "ms", "mem_mb"]), hide_index=True,
+                     use_container_width=True)
+        st.caption(f"Sesión `{last['session']}` · {len(perf_hist)} reruns")
+        st.dataframe(pd.DataFrame(perf_log.stage_table(perf_hist)), hide_index=True, use_container_width=True)
+    ss = STORE.stats()
+    st.caption(f"Almacén compartido: {ss['entries']} estándares/DTOs ({ss['in_use']} en uso, {ss['refs']} refs), "
+               f"{ss['parsed']} cargados, {ss['flattened']} aplanados")
+    st.download_button("📥 Log de tiempos (NDJSON)", data=perf_log.read_log, file_name="perf.ndjson",
+                       mime="application/x-ndjson", use_container_width=True)
@@ -0,0 +1,158 @@
+# --- MOTOR DE EJECUCIÓN DE MAPEOS ---
+# Aplica los mapping_rules de un endpoint (target -> campo courier) a payloads reales
+# y devuelve la forma del estándar interno. Las reglas se compilan una sola vez:
+# - un trie de rutas de origen, para que cada registro recorra cada prefijo una vez
+# - un plan de salida anidado (lo que hacía unflatten_json, pero precalculado)
+# Los caminos de origen siguen el criterio de flatten_payload: las listas se
+# resuelven a su primer elemento. Valen con o sin sufijo de array ('items[*].id' o
+# 'items.id', el formato de traffic_import / payload_validation / schema_inference).
+import json
+import os
+import re
+import time
+
+from flatten_engine import ARRAY_SUFFIX
+from parallel import DEFAULT_BATCH_SIZE, batched, map_batches
+
+DTO_PREFIX = re.compile(r"^\[[^\]]*\] ")
+MISSING = object()
+
+
+def target_path(target, strip_dto=True):
+    """'[Dto] order.id' -> 'order.id' (el nombre del DTO no forma parte de la salida)."""
+    return DTO_PREFIX.sub("", target, count=1) if strip_dto else target
+
+
+def source_parts(path):
+    """'items[*].id' / 'items.id' -> ['items', 'id'] (las listas se resuelven al recorrer el registro)."""
+    parts = path.split('.')
+    for i, p in enumerate(parts):
+        while p.endswith(ARRAY_SUFFIX): p = p[:-len(ARRAY_SUFFIX)]
+        parts[i] = p
+    return parts
+
+
+def _first(v):
+    while isinstance(v, list) and v: v = v[0]
+    return v
+
+
+class CompiledMapping:
+    def __init__(self, mapping_rules, strip_dto=True):
+        targets = [t for t, s in mapping_rules.items() if s]
+        self.rules = [(target_path(t, strip_dto), mapping_rules[t]) for t in targets]
+        self.size = len(self.rules)
+
+        # Trie de origen: nodo = [hijos {clave: nodo}, slots que se leen en este nodo]
+        self._src = [{}, []]
+        for slot, (_, s) in enumerate(self.rules):
+            node = self._src
+            for p in source_parts(s):
+                node = node[0].setdefault(p, [{}, []])
+            node[1].append(slot)
+
+        # Plan de salida: {clave: slot (hoja) | sub-plan (dict)}
+        self._plan = {}
+        for slot, (t, _) in enumerate(self.rules):
+            parts = t.split('.')
+            cur = self._plan
+            for p in parts[:-1]:
+                nxt = cur.setdefault(p, {})
+                if not isinstance(nxt, dict): raise ValueError(f"Target '{t}' choca con el target hoja '{p}'")
+                cur = nxt
+            prev = cur.get(parts[-1])
+            if isinstance(prev, dict): raise ValueError(f"Target '{t}' choca con targets anidados")
+            # Dos targets que quedan iguales al quitar el DTO ('[A] x.id' y '[B] x.id'): el último pisaría al otro
+            if prev is not None:
+                raise ValueError(f"Target '{targets[slot]}' choca con '{targets[prev]}' (misma ruta de salida '{t}')")
+            cur[parts[-1]] = slot
+
+    def _gather(self, record):
+        vals = [MISSING] * self.size
+        stack = [(self._src, record)]
+        while stack:
+            node, obj = stack.pop()
+            for slot in node[1]: vals[slot] = _first(obj)
+            children = node[0]
+            if children:
+                obj = _first(obj)
+                if isinstance(obj, dict):
+                    for k, child in children.items():
+                        v = obj.get(k, MISSING)
+                        if v is not MISSING: stack.append((child, v))
+        return vals
+
+    @staticmethod
+    def _build(plan, vals):
+        out = {}
+        for k, sub in plan.items():
+            if type(sub) is int:
+                v = vals[sub]
+                if v is not MISSING: out[k] = v
+            else:
+                d = CompiledMapping._build(sub, vals)
+                if d: out[k] = d
+        return out
+
+    def apply(self, record):
+        """Transforma un payload del courier. Los campos ausentes no aparecen en la salida."""
+        return self._build(self._plan, self._gather(record))
+
+    def apply_many(self, records):
+        return [self.apply(r) for r in records]
+
+
+def compile_endpoint(project, endpoint, direction="request", strip_dto=True):
+    return CompiledMapping(project["endpoints"][endpoint][direction]["mapping_rules"], strip_dto=strip_dto)
+
+
+# --- EJECUCIÓN POR LOTES (pool de procesos) ---
+_WORKER = {}
+
+
+def _init_worker(mapping_rules, strip_dto):
+    _WORKER["mapping"] = CompiledMapping(mapping_rules, strip_dto=strip_dto)
+
+
+def _apply_records(batch):
+    return _WORKER["mapping"].apply_many(batch)
+
+
+def _apply_lines(batch):
+    m = _WORKER["mapping"]
+    return [json.dumps(m.apply(json.loads(line)), ensure_ascii=False) for line in batch]
+
+
+def _ndjson_lines(fp):
+    for line in fp:
+        if line.strip(): yield line
+
+
+def transform_records(records, mapping_rules, workers=1, batch_size=DEFAULT_BATCH_SIZE, strip_dto=True):
+    """Genera los registros transformados, en orden. workers>1 reparte lotes en un pool de procesos."""
+    m = CompiledMapping(mapping_rules, strip_dto=strip_dto)  # los choques de targets saltan aquí, no en el pool
+    if workers == 1:
+        for r in records: yield m.apply(r)
+        return
+    for out in map_batches(_apply_records, batched(records, batch_size), workers=workers,
+                           initializer=_init_worker, initargs=(mapping_rules, strip_dto)):
+        yield from out
+
+
+def transform_ndjson(source, dest, mapping_rules, workers=None, batch_size=DEFAULT_BATCH_SIZE, strip_dto=True):
+    """Transforma un NDJSON (ruta o fichero) en otro NDJSON. Devuelve estadísticas de la ejecución."""
+    CompiledMapping(mapping_rules, strip_dto=strip_dto)  # valida los targets antes de abrir ficheros y arrancar el pool
+    src = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    dst = open(dest, "w", encoding="utf-8") if isinstance(dest, (str, os.PathLike)) else dest
+    t0 = time.perf_counter()
+    n = 0
+    try:
+        for out in map_batches(_apply_lines, batched(_ndjson_lines(src), batch_size), workers=workers,
+                               initializer=_init_worker, initargs=(mapping_rules, strip_dto)):
+            for line in out: dst.write(line + "\n")
+            n += len(out)
+    finally:
+        if src is not source: src.close()
+        if dst is not dest: dst.close()
+    dt = time.perf_counter() - t0
+    return {"records": n, "seconds": round(dt, 3), "records_per_second": round(n / dt, 1) if dt else None}
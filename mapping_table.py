@@ -0,0 +1,256 @@
+# --- ÍNDICES PARA CONSTRUIR LA TABLA DE MAPEO ---
+# La tabla necesita, para cada campo del courier, el target que tiene asignado en
+# mapping_rules y la opción completa del desplegable ("<target> | <tipo>").
+# Recorrer reglas y opciones por cada campo es O(campos x reglas x opciones); aquí
+# se precalculan ambos índices una sola vez por versión de reglas/opciones.
+
+from itertools import chain
+
+import pandas as pd
+
+from field_records import FieldRecord
+
+NO_TARGET = "SELECCIONAR_CAMPO"
+IGNORED_TARGET = "IGNORED_FIELD"
+OPTION_SEP = " | "
+
+# --- COLORES Y ESTADOS (GLOBAL) ---
+STATUS_OPTS = [
+    "⚪ Sin Estado",
+    "🔵 Revisar con Analista",
+    "🟡 Revisar con Courier",
+    "✅ Valor Confirmado",
+    "🌫️ Valor Omitido",
+    "🟠 Revisar con ITX",
+    "🟣 Validar Frontal",
+    "🧪 Postman",
+    "🟢 Pendiente de verificar TL"
+]
+
+REQUIRED_OPTS = ["Sí", "No", "Cond", "?"]
+PAGE_SIZES = [50, 100, 200, 500]
+
+APP_COLUMNS = ["Estado", "Campo Courier", "Target (DTO)", "Ejemplo", "Tipo", "Requerido", "Doc",
+               "Coment. Analista", "Coment. TL", "Coment. Dev"]
+
+_INDEX_CACHE = {}
+_INDEX_CACHE_MAX = 8
+
+
+# --- ESTRUCTURAS DEL PROYECTO ---
+def new_endpoint(method="POST"):
+    return {"method": method, "extra_metadata": {},
+            "request": {"mapping_rules": {}, "field_metadata": {}},
+            "response": {"mapping_rules": {}, "field_metadata": {}}}
+
+
+NEW_FIELD_KEYS = ("status_tag", "required", "comment_tl", "comment_analyst", "comment_dev", "example_value", "type",
+                  "is_done", "doc_desc")
+
+
+def _new_field_row(example_value, field_type):
+    return "⚪ Sin Estado", "?", "", "", "", example_value, field_type, False, ""
+
+
+def new_field_metadata(example_value="", field_type="String"):
+    return FieldRecord.from_rows(NEW_FIELD_KEYS, (_new_field_row(example_value, field_type),))[0]
+
+
+def add_new_fields(field_metadata, fields):
+    """Añade los campos {ruta: (ejemplo, tipo)} que aún no existen (los existentes no se tocan)."""
+    new = [k for k in fields if k not in field_metadata]
+    # Todos los registros de una vez (misma forma compartida), no clave a clave
+    records = FieldRecord.from_rows(NEW_FIELD_KEYS, (_new_field_row(*fields[k]) for k in new))
+    field_metadata.update(zip(new, records))
+    return len(new)
+
+
+def target_options(dto_library, cache):
+    """Opciones del desplegable de targets de app.py (cache: DtoOptionCache)."""
+    u_opts = [NO_TARGET, IGNORED_TARGET]
+    if dto_library:
+        # Opciones cacheadas por DTO y ya ordenadas; las fijas van delante al ordenar ("[" > letras)
+        u_opts = sorted(u_opts) + cache.options(dto_library)
+    return u_opts
+
+
+def build_target_index(mapping_rules):
+    """Índice inverso campo courier -> target (gana la primera regla, como antes)."""
+    idx = {}
+    for t, s in mapping_rules.items():
+        if s not in idx: idx[s] = t
+    return idx
+
+
+def build_option_index(options):
+    """Prefijo de la opción (antes de ' | ') -> primera opción del desplegable con ese prefijo."""
+    idx = {}
+    for o in options:
+        p = o.split(OPTION_SEP, 1)[0]
+        if p not in idx: idx[p] = o
+    return idx
+
+
+class TableIndex:
+    def __init__(self, mapping_rules, options):
+        self.targets = build_target_index(mapping_rules)
+        self.options = build_option_index(options)
+
+    def resolve(self, field, keep_unknown=True):
+        # keep_unknown=True (app.py): si el target ya no existe en las opciones se muestra tal cual.
+        # keep_unknown=False (mapper_tool.py): se queda en SELECCIONAR_CAMPO.
+        t = self.targets.get(field)
+        if t is None: return NO_TARGET
+        o = self.options.get(t)
+        if o is not None: return o
+        return t if keep_unknown else NO_TARGET
+
+
+def get_table_index(mapping_rules, options):
+    """Devuelve el TableIndex de estas reglas/opciones, reconstruyéndolo sólo si han cambiado."""
+    key = (tuple(mapping_rules.items()), tuple(options))
+    ti = _INDEX_CACHE.get(key)
+    if ti is None:
+        if len(_INDEX_CACHE) >= _INDEX_CACHE_MAX: _INDEX_CACHE.pop(next(iter(_INDEX_CACHE)))
+        ti = _INDEX_CACHE[key] = TableIndex(mapping_rules, options)
+    return ti
+
+
+def build_table(field_metadata, mapping_rules, options):
+    """Tabla de edición/exportación de app.py para una dirección de un endpoint."""
+    t_idx = get_table_index(mapping_rules, options)
+    rows = []
+    for k in list(field_metadata.keys()):
+        meta = field_metadata.get(k, {})
+        rows.append({
+            "Estado": meta.get("status_tag", "⚪ Sin Estado"),
+            "Campo Courier": k,
+            "Target (DTO)": t_idx.resolve(k),
+            "Ejemplo": meta.get("example_value", ""),
+            "Tipo": meta.get("type", "String"),
+            "Requerido": meta.get("required", "?"),
+            "Doc": meta.get("doc_desc", ""),
+            "Coment. Analista": meta.get("comment_analyst", ""),
+            "Coment. TL": meta.get("comment_tl", ""),
+            "Coment. Dev": meta.get("comment_dev", "")
+        })
+    if not rows: return pd.DataFrame(columns=APP_COLUMNS)
+    return pd.DataFrame(rows)
+
+
+# --- VISTA PAGINADA DEL EDITOR ---
+# Con miles de campos el editor se reconstruye, se envía al navegador y se estiliza
+# entero en cada rerun. Se filtra sobre field_metadata (sin construir la tabla) y sólo
+# se construye la página visible; al guardar se vuelcan sus filas en el endpoint.
+
+def filter_fields(field_metadata, mapping_rules, status=(), required=(), mapped=None, text=""):
+    """Campos (en orden) que cumplen los filtros. mapped: None = todos, True/False = con/sin regla."""
+    targets = build_target_index(mapping_rules)
+    text = (text or "").strip().lower()
+    status, required = set(status or ()), set(required or ())
+    out = []
+    for k, meta in field_metadata.items():
+        if status and meta.get("status_tag", "⚪ Sin Estado") not in status: continue
+        if required and meta.get("required", "?") not in required: continue
+        if mapped is not None and (k in targets) != mapped: continue
+        if text:
+            hay = " ".join(str(v) for v in (k, targets.get(k, ""), meta.get("doc_desc", ""),
+                                            meta.get("comment_analyst", ""), meta.get("comment_tl", ""),
+                                            meta.get("comment_dev", "")))
+            if text not in hay.lower(): continue
+        out.append(k)
+    return out
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+
+def page_slice(items, page, page_size):
+    """Elementos de la página `page` (empezando en 1)."""
+    start = (max(1, page) - 1) * page_size
+    return items[start:start + page_size]
+
+
+def merge_page_edits(field_metadata, mapping_rules, page_fields, edited):
+    """Vuelca la tabla editada de una página en el endpoint, sin tocar el resto de campos.
+
+    Las filas borradas quitan su campo y sus reglas; las nuevas se añaden al final. Los
+    metadatos que no están en la tabla (p. ej. presence_rate) se conservan.
+    """
+    rules, metas = collect_edits(edited)
+    page = set(page_fields)
+    for k in page.difference(metas): field_metadata.pop(k, None)
+    for t in [t for t, s in mapping_rules.items() if s in page or s in metas]: del mapping_rules[t]
+    for k, m in metas.items(): field_metadata[k] = FieldRecord(chain(field_metadata.get(k, {}).items(), m.items()))
+    mapping_rules.update(rules)
+    return rules, metas
+
+
+# --- GUARDADO COLUMNAR DEL EDITOR ---
+# Sustituye los bucles con iterrows: se limpia la columna de target de una pasada,
+# se usan máscaras booleanas para SELECCIONAR/IGNORED y los registros de metadatos
+# salen de un único to_dict por columnas. El resultado es idéntico al de los bucles
+# anteriores.
+
+# Columna de la tabla de app.py -> clave de field_metadata (en el orden que se guarda)
+APP_META_COLUMNS = [
+    ("required", "Requerido", "?"), ("comment_tl", "Coment. TL", ""), ("comment_analyst", "Coment. Analista", ""),
+    ("comment_dev", "Coment. Dev", ""), ("example_value", "Ejemplo", ""), ("type", "Tipo", "String"),
+    ("is_done", None, None), ("status_tag", "Estado", None), ("doc_desc", "Doc", ""),
+]
+LOCAL_META_COLUMNS = [
+    ("required", "Requerido"), ("comment_tl", "Comentario TL"), ("example_value", "Valor de ejemplo"),
+    ("type", "Tipo de atributo"), ("is_done", "Done"), ("status_tag", "Estado"),
+    ("comment_dev", "Comentario Desarrollador"), ("comment_analyst", "Comentario Analista"),
+    ("size_limit", "Limite de tamaño"), ("doc_desc", "Descripción Docs"),
+]
+
+
+def clean_targets(targets):
+    """'<target> | <tipo>' -> '<target>' para toda la columna."""
+    return targets.astype(str).str.split(OPTION_SEP, n=1, regex=False).str[0]
+
+
+def _records(columns):
+    # to_dict("list") convierte cada columna de una vez; los registros (FieldRecord) se arman con zip
+    cols = pd.DataFrame(columns).to_dict("list")
+    return FieldRecord.from_rows(cols, zip(*cols.values()))
+
+
+def _unmapped_mask(values):
+    return values.str.contains("SELECCIONAR", regex=False) | values.str.contains("IGNORED", regex=False)
+
+
+def collect_edits(edited):
+    """Tabla editada de app.py -> (mapping_rules, field_metadata)."""
+    courier = edited["Campo Courier"]
+    valid = courier.notna() & courier.astype(str).ne("")
+    df = edited[valid]
+    fields = df["Campo Courier"].astype(str).str.strip()
+    target = clean_targets(df["Target (DTO)"])
+    not_selected = ~target.str.contains("SELECCIONAR", regex=False)
+    mapped = ~_unmapped_mask(target)
+
+    rules = dict(zip(target[mapped].tolist(), fields[mapped].tolist()))
+    cols = {}
+    for key, col, default in APP_META_COLUMNS:
+        if key == "is_done":
+            cols[key] = not_selected
+        elif col in df.columns:
+            cols[key] = df[col]
+        else:
+            cols[key] = pd.Series(default, index=df.index, dtype=object)
+    return rules, dict(zip(fields.tolist(), _records(cols)))
+
+
+def collect_local_edits(edited):
+    """Tabla editada de mapper_tool.py -> (mapping_rules, field_metadata, nº de campos Done)."""
+    target = edited["Valor (HD)"].astype(str)
+    mapped = ~_unmapped_mask(target)
+    fields = edited["Campo del Courier"]
+
+    rules = dict(zip(clean_targets(target[mapped]).tolist(), fields[mapped].tolist()))
+    records = _records({key: edited[col] for key, col in LOCAL_META_COLUMNS})
+    done = int(edited["Done"].astype(bool).sum())
+    return rules, dict(zip(fields.tolist(), records)), done
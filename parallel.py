@@ -0,0 +1,44 @@
+# --- EJECUCIÓN EN PARALELO POR LOTES ---
+# Utilidades comunes para repartir trabajo en un pool de procesos sin cargar toda la
+# entrada en memoria: los lotes se envían con una ventana acotada y los resultados se
+# devuelven en el mismo orden de entrada.
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def batched(iterable, size=DEFAULT_BATCH_SIZE):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch: return
+        yield batch
+
+
+def map_batches(fn, batches, workers=None, initializer=None, initargs=(), max_in_flight=None):
+    """Aplica fn a cada lote y genera los resultados en orden.
+
+    Con workers=1 se ejecuta en el propio proceso (sin pickling), útil para depurar y
+    para entradas pequeñas. `fn` debe ser una función de módulo (picklable).
+    """
+    workers = workers or default_workers()
+    if workers == 1:
+        if initializer: initializer(*initargs)
+        for b in batches: yield fn(b)
+        return
+
+    max_in_flight = max_in_flight or workers * 2
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as ex:
+        pending = deque()
+        for b in batches:
+            pending.append(ex.submit(fn, b))
+            if len(pending) >= max_in_flight: yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
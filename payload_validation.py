@@ -0,0 +1,328 @@
+# --- VALIDACIÓN MASIVA DE PAYLOADS CONTRA field_metadata ---
+# Antes de la salida a producción se certifica el mapeo con tráfico real: cada campo
+# del endpoint tiene `required`, `type` y `size_limit`, y aquí se comprueban sobre un
+# lote de payloads (directorio de muestras o NDJSON con cientos de miles de registros).
+# - los registros se leen en streaming y se reparten por lotes en el pool de procesos
+# - cada lote se aplana a tres columnas (ruta, nº de registro, valor) y las reglas se
+#   comprueban por columnas con pandas/NumPy: una pasada por tipo esperado, no por registro
+# - cada lote devuelve un ValidationReport (nº de violaciones y ejemplos por campo) que
+#   se combinan con merge(), igual que SchemaStats
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from flatten_engine import EMPTY_LIST, iter_leaves
+from json_stream import is_ndjson_name, iter_array
+from parallel import DEFAULT_BATCH_SIZE, batched, map_batches
+from type_inference import rules_for
+from xml_stream import iter_xml_leaves
+
+PAYLOAD_EXTS = (".json", ".ndjson", ".jsonl", ".xml")
+RECORDS_PER_TASK = DEFAULT_BATCH_SIZE
+DEFAULT_MAX_EXAMPLES = 5
+EXAMPLE_LIMIT = 100
+CHECKS = ("required", "type", "length")
+
+# Clase de cada valor como entero (comparaciones en NumPy sin pasar por objetos); K_ARRAY = lista vacía
+K_OTHER, K_STR, K_INT, K_FLOAT, K_BOOL, K_ARRAY = range(6)
+_KIND = {str: K_STR, int: K_INT, float: K_FLOAT, bool: K_BOOL}
+# Tipo documentado -> clases de valor que lo cumplen (los textos se prueban además con el formato del tipo)
+_ALLOWED = {"String": (K_STR,), "Integer": (K_INT,), "Decimal": (K_INT, K_FLOAT), "Boolean": (K_BOOL,),
+            "Array": (K_ARRAY,)}
+
+
+def _limit(value):
+    try:
+        return max(0, int(str(value).strip()))
+    except ValueError:
+        return 0
+
+
+class ValidationSpec:
+    """Reglas de un endpoint/dirección: {ruta: (requerido, tipo, tipo base, admite null, tamaño máximo)}."""
+
+    def __init__(self, field_metadata, rules=None, array_suffix=""):
+        self.array_suffix = array_suffix
+        self.formats = dict((rules or rules_for(None)).formats)  # tipo -> regex de texto que lo cumple
+        self.fields = {}
+        for path, meta in field_metadata.items():
+            t = str(meta.get("type") or "").strip()
+            self.fields[path] = (meta.get("required") == "Sí", t, t.rstrip("?").strip(), t.endswith("?"),
+                                 _limit(meta.get("size_limit")))
+
+    @classmethod
+    def from_project(cls, project, endpoint, direction="request", array_suffix=""):
+        """Reglas de project["endpoints"][endpoint][direction] (KeyError si el endpoint no existe)."""
+        data = project["endpoints"][endpoint].get(direction) or {}
+        return cls(data.get("field_metadata") or {}, rules_for(project), array_suffix)
+
+    def required_paths(self):
+        return [p for p, f in self.fields.items() if f[0]]
+
+
+class FieldViolations:
+    __slots__ = ("present", "required", "type", "length", "examples")
+
+    def __init__(self):
+        self.present = 0  # nº de registros en los que aparece la ruta
+        self.required = self.type = self.length = 0
+        self.examples = {c: [] for c in CHECKS}  # [{"record": etiqueta, "value": valor}]
+
+    @property
+    def violations(self):
+        return self.required + self.type + self.length
+
+    def add_example(self, check, example, max_examples=DEFAULT_MAX_EXAMPLES):
+        ex = self.examples[check]
+        if len(ex) < max_examples: ex.append(example)
+
+    def merge(self, other, max_examples=DEFAULT_MAX_EXAMPLES):
+        self.present += other.present
+        self.required += other.required
+        self.type += other.type
+        self.length += other.length
+        for c in CHECKS:
+            for e in other.examples[c]: self.add_example(c, e, max_examples)
+
+
+class ValidationReport:
+    """Resultado combinable: {ruta: FieldViolations}, rutas no documentadas y registros ilegibles."""
+
+    def __init__(self, max_examples=DEFAULT_MAX_EXAMPLES):
+        self.max_examples = max_examples
+        self.records = 0
+        self.fields = {}
+        self.unknown = Counter()  # ruta no documentada -> nº de registros en los que aparece
+        self.errors = []  # (registro, error)
+
+    def field(self, path):
+        fv = self.fields.get(path)
+        if fv is None: fv = self.fields[path] = FieldViolations()
+        return fv
+
+    def merge(self, other):
+        for p, o in other.fields.items(): self.field(p).merge(o, self.max_examples)
+        self.unknown.update(other.unknown)
+        self.records += other.records
+        self.errors.extend(other.errors)
+        return self
+
+    @property
+    def violations(self):
+        return sum(fv.violations for fv in self.fields.values())
+
+    def summary(self, spec):
+        """Informe JSON: por campo documentado, presencia, violaciones por regla y ejemplos."""
+        fields = {}
+        for p, (req, t, _, _, limit) in spec.fields.items():
+            fv = self.fields.get(p) or FieldViolations()
+            fields[p] = {"required": req, "type": t, "size_limit": limit or None, "present": fv.present,
+                         "presence_rate": round(fv.present / self.records, 4) if self.records else 0.0,
+                         "violations": {c: getattr(fv, c) for c in CHECKS},
+                         "examples": {c: list(e) for c, e in fv.examples.items() if e}}
+        return {"records": self.records, "violations": self.violations, "ok": not self.violations and not self.errors,
+                "errors": [list(e) for e in self.errors], "fields": fields,
+                "unknown_fields": dict(self.unknown.most_common())}
+
+
+def violation_rows(summary):
+    """Filas {Campo, Requerido, Tipo, Tamaño, ejemplo} de los campos con violaciones, de más a menos."""
+    rows = []
+    for p, f in summary["fields"].items():
+        v = f["violations"]
+        if not any(v.values()): continue
+        ex = next((e for c in CHECKS for e in f["examples"].get(c, ())), {})
+        rows.append({"Campo": p, "Requerido": v["required"], "Tipo": v["type"], "Tamaño": v["length"],
+                     "Ejemplo": f"{ex.get('record', '')} {ex.get('value', '')}".strip()})
+    rows.sort(key=lambda r: -(r["Requerido"] + r["Tipo"] + r["Tamaño"]))
+    return rows
+
+
+# --- VALIDACIÓN POR COLUMNAS DE UN LOTE ---
+def _leaves(rec, array_suffix):
+    # rec: objeto ya leído, línea de NDJSON (str/bytes) o ("json" | "xml" | "error", ruta o mensaje)
+    if isinstance(rec, tuple):
+        kind, arg = rec
+        if kind == "error": raise ValueError(arg)
+        if kind == "xml": return iter_xml_leaves(arg, merge_arrays=True)
+        with open(arg, "rb") as f: rec = json.load(f)
+    elif isinstance(rec, (str, bytes)):
+        rec = json.loads(rec)
+    return iter_leaves(rec, merge_arrays=True, array_suffix=array_suffix)
+
+
+def _unique(keys):
+    # np.unique ordenando (más rápido aquí que la variante por hash y el resultado sale ordenado)
+    keys = np.sort(keys)
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+
+
+def _example(label, value=None, with_value=True):
+    if not with_value: return {"record": label}
+    return {"record": label, "value": "null" if value is None else str(value)[:EXAMPLE_LIMIT]}
+
+
+def validate_records(records, spec, max_examples=DEFAULT_MAX_EXAMPLES):
+    """ValidationReport de [(etiqueta, registro)]."""
+    report = ValidationReport(max_examples)
+    labels, sizes, paths, vals = [], [], [], []
+    for label, rec in records:
+        try:
+            leaves = list(_leaves(rec, spec.array_suffix))
+        except Exception as e:
+            report.errors.append((label, f"{type(e).__name__}: {e}"))
+            continue
+        labels.append(label)
+        sizes.append(len(leaves))
+        if leaves:
+            ps, vs = zip(*leaves)
+            paths.extend(ps)
+            vals.extend(vs)
+    n = report.records = len(labels)
+    if not n: return report
+
+    # Columnas: código de ruta, nº de registro y valor; las reglas por ruta se expanden a filas por código
+    codes, cats = pd.factorize(pd.Series(paths, dtype=object))
+    cats = list(cats)
+    rec = np.repeat(np.arange(n, dtype=np.int64), sizes)
+    v = pd.Series(vals, dtype=object)
+    del paths, vals  # las columnas ya tienen todo
+    info = [spec.fields.get(c) for c in cats]
+    known_c = np.array([f is not None for f in info], dtype=bool)
+    req_c = np.array([bool(f and f[0]) for f in info], dtype=bool)
+    nullable_c = np.array([bool(f and f[3]) for f in info], dtype=bool)
+    limit_c = np.array([f[4] if f else 0 for f in info], dtype=np.int64)
+    types = sorted({f[2] for f in info if f})
+    base_c = np.array([types.index(f[2]) if f else -1 for f in info], dtype=np.int32)
+    known, req, base = known_c[codes], req_c[codes], base_c[codes]
+
+    null = v.isna().to_numpy()
+    kind = v.map(type).map(_KIND).fillna(K_OTHER).to_numpy(dtype=np.int8)
+    is_str = kind == K_STR
+    kind[is_str & (v == EMPTY_LIST).to_numpy()] = K_ARRAY
+    empty = is_str & (v == "").to_numpy()
+    live = known & ~null
+
+    # Tipo: una pasada por tipo documentado; los textos pueden cumplirlo por formato (XML, números en texto...).
+    # Los textos vacíos no se comprueban (si el campo es requerido ya cuentan como ausentes)
+    bad_type = known & null & ~nullable_c[codes] & ~req  # null en un campo no nullable (si es requerido, cuenta ahí)
+    for ti, t in enumerate(types):
+        allowed, fmt = _ALLOWED.get(t, ()), spec.formats.get(t)
+        if not allowed and not fmt: continue  # Object o tipos propios: no se comprueban
+        m = live & ~empty & (base == ti)
+        if not m.any(): continue
+        k = kind[m]
+        ok = np.zeros(len(k), dtype=bool)
+        for a in allowed: ok |= k == a
+        if fmt:
+            txt = ~ok & (k == K_STR)
+            if txt.any():
+                ok[txt] = v[m][txt].str.strip().str.fullmatch(fmt).to_numpy(dtype=bool)
+        bad_type[m] = ~ok
+
+    # Tamaño: longitud del texto del valor frente a size_limit
+    bad_len = np.zeros(len(v), dtype=bool)
+    lim = limit_c[codes]
+    m = live & (lim > 0) & (kind != K_ARRAY)
+    if m.any(): bad_len[m] = v[m].astype(str).str.len().to_numpy() > lim[m]
+
+    # Presencia (registros distintos por ruta) y requeridos: pares (ruta, registro) únicos y ordenados
+    seen = _unique(codes.astype(np.int64) * n + rec)
+    present = np.bincount(seen // n, minlength=len(cats))
+    filled = _unique(codes[live & ~empty].astype(np.int64) * n + rec[live & ~empty])
+    n_filled = np.bincount(filled // n, minlength=len(cats))
+
+    for c, path in enumerate(cats):
+        if not known_c[c]:
+            report.unknown[path] += int(present[c])
+            continue
+        fv = report.field(path)
+        fv.present += int(present[c])
+        if req_c[c] and n_filled[c] < n:
+            fv.required += n - int(n_filled[c])
+            lo, hi = np.searchsorted(filled, [c * n, (c + 1) * n])
+            have = filled[lo:hi] - c * n
+            for r in np.setdiff1d(np.arange(min(n, len(have) + max_examples)), have)[:max_examples].tolist():
+                fv.add_example("required", _example(labels[r], with_value=False), max_examples)
+    for path in spec.required_paths():
+        if path in report.fields or path in report.unknown: continue
+        fv = report.field(path)  # requerido que no aparece en ningún registro del lote
+        fv.required += n
+        for label in labels[:max_examples]: fv.add_example("required", _example(label, with_value=False), max_examples)
+
+    for check, bad in (("type", bad_type), ("length", bad_len)):
+        if not bad.any(): continue
+        idx = np.flatnonzero(bad)
+        counts = np.bincount(codes[idx], minlength=len(cats))
+        for c in np.flatnonzero(counts).tolist():
+            fv = report.field(cats[c])
+            setattr(fv, check, getattr(fv, check) + int(counts[c]))
+        # Primeros ejemplos de cada ruta
+        first = pd.DataFrame({"c": codes[idx], "i": idx}).groupby("c", sort=False).head(max_examples)
+        for c, i in zip(first["c"].tolist(), first["i"].tolist()):
+            report.field(cats[c]).add_example(check, _example(labels[rec[i]], v.iat[i]), max_examples)
+    return report
+
+
+# --- LECTURA DE LOS PAYLOADS ---
+def _payload_files(directory):
+    return sorted(os.path.join(directory, n) for n in os.listdir(directory)
+                  if n.lower().endswith(PAYLOAD_EXTS) and os.path.isfile(os.path.join(directory, n)))
+
+
+def _first_char(path):
+    with open(path, "rb") as f:
+        head = f.read(64).decode("utf-8-sig", errors="ignore").lstrip()
+    return head[:1]
+
+
+def iter_records(sources):
+    """(etiqueta, registro) de ficheros o directorios: cada línea de un NDJSON, cada elemento de un array raíz
+    o el documento entero. Los documentos sueltos (JSON / XML) se leen en el proceso que los valida."""
+    if isinstance(sources, (str, os.PathLike)): sources = [sources]
+    for src in sources:
+        if os.path.isdir(src):
+            yield from iter_records(_payload_files(src))
+            continue
+        name = os.path.basename(src)
+        try:
+            if is_ndjson_name(name):
+                with open(src, "rb") as f:
+                    for i, line in enumerate(f, 1):
+                        if line.strip(): yield f"{name}:{i}", line
+            elif name.lower().endswith(".xml"):
+                yield name, ("xml", src)
+            elif _first_char(src) == "[":
+                for i, rec in enumerate(iter_array(src)): yield f"{name}[{i}]", rec
+            else:
+                yield name, ("json", src)
+        except Exception as e:
+            yield name, ("error", f"{type(e).__name__}: {e}")
+
+
+_WORKER = {}
+
+
+def _init_worker(spec, max_examples):
+    _WORKER["spec"], _WORKER["max_examples"] = spec, max_examples
+
+
+def _validate_batch(batch):
+    return validate_records(batch, _WORKER["spec"], _WORKER["max_examples"])
+
+
+def validate_payloads(sources, spec, workers=None, batch_size=RECORDS_PER_TASK, max_examples=DEFAULT_MAX_EXAMPLES,
+                      progress=None):
+    """Valida todos los registros de `sources` (rutas de ficheros o directorios) en el pool de procesos.
+
+    `progress(registros validados)` tras cada lote.
+    """
+    total = ValidationReport(max_examples)
+    for part in map_batches(_validate_batch, batched(iter_records(sources), batch_size), workers=workers,
+                            initializer=_init_worker, initargs=(spec, max_examples)):
+        total.merge(part)
+        if progress: progress(total.records)
+    return total
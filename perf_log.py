@@ -0,0 +1,167 @@
+# --- INSTRUMENTACIÓN DE RERUNS ---
+# Cronometra las etapas de cada rerun de Streamlit (parseo del payload, opciones de DTO,
+# construcción de la tabla, editor, guardado, Excel, exportación JSON...) con su
+# variación de memoria (RSS del proceso). Cada rerun se guarda:
+# - en la sesión (últimos HISTORY reruns) para el panel de diagnóstico de la sidebar
+# - en un log local rotativo, una línea JSON por rerun, para ver tendencias entre
+#   sesiones y usuarios del servidor compartido
+# Un rerun cortado con st.rerun() no llega al final del script: se cierra al empezar el
+# siguiente (status "rerun") con el tiempo hasta su última etapa.
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+LOG_FILE = "perf.ndjson"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+HISTORY = 50
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_HOST = socket.gethostname()
+_LOGGER = None
+
+
+def log_dir():
+    return os.environ.get("MAPPER_PERF_DIR") or os.path.join(os.path.expanduser("~"), ".mapper_pro", "perf")
+
+
+def log_path():
+    return os.path.join(log_dir(), LOG_FILE)
+
+
+def _logger():
+    """Logger del fichero rotativo (uno por proceso, con su lock); None si está desactivado o no se puede crear."""
+    global _LOGGER
+    if _LOGGER is None:
+        if os.environ.get("MAPPER_PERF_LOG", "1") == "0": return None
+        try:
+            os.makedirs(log_dir(), exist_ok=True)
+            handler = RotatingFileHandler(log_path(), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                          encoding="utf-8")
+        except OSError:
+            return None
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log = logging.getLogger("mapper_pro.perf")
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        log.addHandler(handler)
+        _LOGGER = log
+    return _LOGGER
+
+
+def current_rss():
+    """Memoria residente del proceso en bytes (Linux, /proc); None si no está disponible."""
+    try:
+        with open("/proc/self/statm", "rb") as f: return int(f.read().split()[1]) * _PAGE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _mb(delta):
+    return None if delta is None else round(delta / 1e6, 2)
+
+
+class RerunTimer:
+    """Etapas cronometradas de un rerun."""
+
+    def __init__(self, app, session):
+        self.app, self.session = app, session
+        self.ts = time.time()
+        self.t0 = self.last = time.perf_counter()
+        self.rss0 = current_rss()
+        self.stages = []
+        self.done = False
+
+    @contextmanager
+    def stage(self, name, **info):
+        """with timer.stage("excel", filas=n): ... -> tiempo (ms) y variación de RSS (MB) de la etapa."""
+        t0, m0 = time.perf_counter(), current_rss()
+        try:
+            yield
+        finally:
+            m1 = current_rss()
+            self.last = time.perf_counter()
+            self.stages.append({"stage": name, "ms": round((self.last - t0) * 1000, 2),
+                                "mem_mb": _mb(None if m0 is None or m1 is None else m1 - m0), **info})
+
+    def finish(self, status="ok"):
+        """Cierra el rerun, lo escribe en el log y devuelve el registro (None si ya estaba cerrado)."""
+        if self.done: return None
+        self.done = True
+        # Cortado por st.rerun(): el final es la última etapa, no el inicio del rerun siguiente
+        end = time.perf_counter() if status == "ok" else self.last
+        rss = current_rss()
+        rec = {"ts": round(self.ts, 3), "app": self.app, "session": self.session, "host": _HOST, "pid": os.getpid(),
+               "status": status, "total_ms": round((end - self.t0) * 1000, 2),
+               "rss_mb": _mb(rss), "mem_mb": _mb(None if rss is None or self.rss0 is None else rss - self.rss0),
+               "stages": self.stages}
+        log = _logger()
+        if log:
+            try:
+                log.info(json.dumps(rec, ensure_ascii=False, default=str))
+            except (OSError, ValueError):
+                pass
+        return rec
+
+
+def timed(app, session, name, fn, *args, **kwargs):
+    """fn(*args, **kwargs) cronometrada como un registro propio (p. ej. una descarga diferida, fuera del rerun)."""
+    timer = RerunTimer(app, session)
+    with timer.stage(name):
+        out = fn(*args, **kwargs)
+    timer.finish("deferred")
+    return out
+
+
+# --- INTEGRACIÓN CON st.session_state ---
+def _keep(state, rec):
+    if rec is None: return
+    hist = state.get("_perf_history")
+    if hist is None: hist = state["_perf_history"] = []
+    hist.append(rec)
+    del hist[:-HISTORY]
+
+
+def begin(state, app):
+    """Al inicio del script: cierra el rerun anterior si quedó abierto y empieza a cronometrar este."""
+    prev = state.get("_perf_timer")
+    if prev is not None: _keep(state, prev.finish("rerun"))
+    if not state.get("_perf_session"): state["_perf_session"] = uuid.uuid4().hex[:8]
+    timer = state["_perf_timer"] = RerunTimer(app, state["_perf_session"])
+    return timer
+
+
+def end(state):
+    """Al final del script: cierra el rerun actual y lo añade al historial de la sesión."""
+    timer = state.get("_perf_timer")
+    if timer is not None: _keep(state, timer.finish())
+
+
+def history(state):
+    return list(state.get("_perf_history") or [])
+
+
+def stage_table(records):
+    """Filas {etapa, nº, ms medio, ms máx, MB medio} agregadas de varios reruns (para el panel)."""
+    acc = {}
+    for rec in records:
+        for s in rec["stages"]:
+            a = acc.setdefault(s["stage"], [0, 0.0, 0.0, 0.0])
+            a[0] += 1
+            a[1] += s["ms"]
+            a[2] = max(a[2], s["ms"])
+            a[3] += s["mem_mb"] or 0.0
+    return [{"Etapa": k, "Veces": n, "ms medio": round(t / n, 1), "ms máx": round(mx, 1), "MB medio": round(m / n, 2)}
+            for k, (n, t, mx, m) in sorted(acc.items(), key=lambda kv: -kv[1][1])]
+
+
+def read_log():
+    """Bytes del log actual (descarga diferida desde el panel); b"" si aún no existe."""
+    try:
+        with open(log_path(), "rb") as f: return f.read()
+    except OSError:
+        return b""
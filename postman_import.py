@@ -0,0 +1,145 @@
+# --- IMPORTADOR POSTMAN ---
+# Además del nombre y el método de cada petición, se extraen los cuerpos de
+# request.body y de los ejemplos guardados (item.response[].body) y se analizan en
+# un pool de procesos con la misma inferencia de esquema que "Analizar Payload".
+# Cada endpoint sale con los field_metadata de request y response ya rellenos.
+import json
+import re
+from functools import partial
+
+from mapping_table import add_new_fields, new_endpoint
+from parallel import batched, map_batches
+from schema_inference import SchemaStats, add_sample
+
+ENDPOINTS_PER_TASK = 16
+# Literales de texto JSON (se dejan tal cual) o {{variable}} de Postman como valor suelto ("id": {{id}})
+_JSON_TOKEN = re.compile(r'("(?:[^"\\]|\\.)*")|(\{\{[^{}"]*\}\})')
+
+
+def iter_requests(data):
+    """Items con 'request' de la colección, en el mismo orden que la búsqueda recursiva (pila explícita)."""
+    stack = [iter(data.get('item', []))]
+    while stack:
+        for item in stack[-1]:
+            if 'item' in item:
+                stack.append(iter(item['item']))
+                break
+            elif 'request' in item:
+                yield item
+        else:
+            stack.pop()
+
+
+def _method(item):
+    req = item['request']
+    return req.get('method', 'GET') if isinstance(req, dict) else 'GET'
+
+
+def _body_text(body):
+    # request.body: {"mode": "raw" | "urlencoded" | "formdata" | ...}; response.body: texto
+    if isinstance(body, str): return body
+    if not isinstance(body, dict): return None
+    mode = body.get('mode')
+    if mode == 'raw': return body.get('raw')
+    if mode in ('urlencoded', 'formdata'):
+        pairs = {p.get('key'): p.get('value') for p in body.get(mode) or [] if p.get('key') and not p.get('disabled')}
+        return json.dumps(pairs) if pairs else None
+    if mode == 'graphql' and isinstance(body.get('graphql'), dict):
+        return body['graphql'].get('variables') or None
+    return None
+
+
+def extract_bodies(item):
+    """(cuerpos de request, cuerpos de response) de un item: el request y los ejemplos guardados."""
+    req_bodies, resp_bodies = [], []
+    req = item['request']
+    if isinstance(req, dict):
+        t = _body_text(req.get('body'))
+        if t and t.strip(): req_bodies.append(t)
+    for ex in item.get('response') or []:
+        t = _body_text(ex.get('body'))
+        if t and t.strip(): resp_bodies.append(t)
+        orig = ex.get('originalRequest')
+        if isinstance(orig, dict):
+            t = _body_text(orig.get('body'))
+            if t and t.strip() and t not in req_bodies: req_bodies.append(t)
+    return req_bodies, resp_bodies
+
+
+def quote_variables(text):
+    """'{"id": {{id}}}' -> '{"id": "{{id}}"}'. Las variables dentro de un texto ("a {{x}} b") no se tocan."""
+    return _JSON_TOKEN.sub(lambda m: m.group(1) or f'"{m.group(2)}"', text)
+
+
+def _load_json(text):
+    # Primero tal cual; las variables sueltas sólo se entrecomillan si el cuerpo no es JSON válido
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        try:
+            return json.loads(quote_variables(text))
+        except ValueError:
+            raise e from None
+
+
+def analyze_bodies(bodies, rules=None):
+    """Esquema combinado de varios cuerpos -> ({campo: (ejemplo, tipo)}, [errores de los que no se han podido leer])."""
+    stats = SchemaStats()
+    errors = []
+    for i, text in enumerate(bodies, 1):
+        text = text.strip()
+        try:
+            if text.startswith('<'):
+                stats.merge(add_sample(SchemaStats(), ("body.xml", text.encode('utf-8'))))
+                continue
+            y = _load_json(text)
+        except Exception as e:
+            errors.append(f"cuerpo {i}: {type(e).__name__}: {e}")
+            continue
+        # Como add_sample: cada elemento de un array raíz es un registro. Sólo cuentan los objetos: un escalar
+        # (["a", "b"], 42) o una lista suelta daría un campo con ruta vacía, sin nombre en la tabla
+        for r in (y if isinstance(y, list) else (y,)):
+            if isinstance(r, dict): stats.add_record(r)
+    return stats.field_types(rules), errors
+
+
+def _analyze_batch(batch, rules=None):
+    return [(name, *analyze_bodies(req_bodies, rules), *analyze_bodies(resp_bodies, rules))
+            for name, req_bodies, resp_bodies in batch]
+
+
+def parse_postman_collection(data, analyze=True, workers=None, progress=None, rules=None, errors=None):
+    """Endpoints de la colección {nombre: endpoint}, con request/response pre-analizados.
+
+    `progress(hechos, total)` se llama tras cada lote analizado. Con analyze=False sólo se
+    crean los endpoints vacíos (comportamiento anterior). `rules`: TypeRules del proyecto.
+    Los cuerpos que no son JSON/XML válidos se añaden a `errors` como ("endpoint [request]", error).
+    """
+    found_endpoints = {}
+    bodies = {}
+    for item in iter_requests(data):
+        name = item['name']
+        found_endpoints[name] = new_endpoint(_method(item))
+        if analyze:
+            req_b, resp_b = extract_bodies(item)
+            acc = bodies.setdefault(name, ([], []))
+            acc[0].extend(req_b)
+            acc[1].extend(resp_b)
+
+    jobs = [(n, r, s) for n, (r, s) in bodies.items() if r or s]
+    if not jobs: return found_endpoints
+    if workers is None and len(jobs) <= ENDPOINTS_PER_TASK: workers = 1  # colección pequeña: sin pool
+
+    done = 0
+    for results in map_batches(partial(_analyze_batch, rules=rules), batched(jobs, ENDPOINTS_PER_TASK),
+                               workers=workers):
+        for name, req, req_err, resp, resp_err in results:
+            ep = found_endpoints[name]
+            add_new_fields(ep["request"]["field_metadata"], req)
+            add_new_fields(ep["response"]["field_metadata"], resp)
+            if errors is not None:
+                errors.extend((f"{name} [request]", e) for e in req_err)
+                errors.extend((f"{name} [response]", e) for e in resp_err)
+        done += len(results)
+        if progress: progress(done, len(jobs))
+    return found_endpoints
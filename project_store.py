@@ -0,0 +1,336 @@
+# --- PROYECTO EN DISCO POR ENDPOINT (SHARDS) ---
+# Un proyecto con cientos de endpoints en un único JSON se carga, se serializa y se
+# guarda entero en cada operación. Aquí el proyecto es una carpeta:
+#   manifest.json          cabecera (courier, notas, ...) + lista ordenada de endpoints
+#   dto_library.json       librería de DTOs (se usa en cada rerun, se carga al abrir)
+#   endpoints/<shard>.json un fichero por endpoint, que sólo se lee al acceder a él
+# ShardedProject se comporta como el dict del proyecto (proj["endpoints"][ep]...), así
+# app.py y el resto de módulos no cambian. Al guardar sólo se reescriben los shards
+# cuyo contenido ha cambiado (hash del JSON).
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+from collections.abc import MutableMapping
+
+from field_records import compact_endpoint, compact_project, json_default
+from json_stream import iter_items
+
+MANIFEST = "manifest.json"
+DTO_FILE = "dto_library.json"
+SHARD_DIR = "endpoints"
+FORMAT_VERSION = 1
+GZIP_MAGIC = b"\x1f\x8b"
+_SLUG = re.compile(r"[^0-9A-Za-z_.-]+")
+
+
+def _digest(obj):
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=json_default).encode("utf-8")).hexdigest()
+
+
+def shard_name(endpoint):
+    """Nombre de fichero estable y único para un endpoint (slug legible + hash corto del nombre)."""
+    slug = _SLUG.sub("_", endpoint).strip("_")[:40] or "endpoint"
+    return f"{slug}-{hashlib.sha1(endpoint.encode('utf-8')).hexdigest()[:8]}.json"
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f: return json.load(f)
+
+
+def _write_json(path, obj):
+    # Escritura atómica: un guardado interrumpido nunca deja un shard a medias
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(obj, f, indent=4, default=json_default)
+    os.replace(tmp, path)
+
+
+class LazyEndpoints(MutableMapping):
+    """{nombre: endpoint} que lee cada shard al acceder a él por primera vez."""
+
+    def __init__(self, directory, shards):
+        self.directory = directory
+        self._shards = dict(shards)  # nombre -> fichero (en el orden del manifest)
+        self._loaded = {}  # nombre -> endpoint en memoria
+        self._saved = {}  # nombre -> hash del contenido en disco
+        self._deleted = set()
+
+    def _path(self, name):
+        return os.path.join(self.directory, SHARD_DIR, self._shards[name])
+
+    def __getitem__(self, name):
+        ep = self._loaded.get(name)
+        if ep is not None: return ep
+        if name not in self._shards: raise KeyError(name)
+        # Los campos pasan a FieldRecord al leer el shard (el hash no cambia: mismo JSON)
+        ep = self._loaded[name] = compact_endpoint(_read_json(self._path(name)))
+        self._saved[name] = _digest(ep)
+        return ep
+
+    def __setitem__(self, name, ep):
+        if name not in self._shards: self._shards[name] = shard_name(name)
+        self._deleted.discard(self._shards[name])
+        self._loaded[name] = ep
+
+    def __delitem__(self, name):
+        f = self._shards.pop(name)
+        self._loaded.pop(name, None)
+        self._saved.pop(name, None)
+        self._deleted.add(f)
+
+    def __iter__(self):
+        return iter(list(self._shards))
+
+    def __len__(self):
+        return len(self._shards)
+
+    def __contains__(self, name):
+        return name in self._shards
+
+    def loaded(self):
+        return list(self._loaded)
+
+    def peek(self, name):
+        """Endpoint sin dejarlo cargado (para exportar o recorrer todo el proyecto)."""
+        ep = self._loaded.get(name)
+        return ep if ep is not None else _read_json(self._path(name))
+
+    def dirty(self):
+        return [n for n, ep in self._loaded.items() if self._saved.get(n) != _digest(ep)]
+
+    def release(self, keep=()):
+        """Descarga los endpoints sin cambios salvo los de `keep` (p. ej. el endpoint activo)."""
+        dirty = set(self.dirty())
+        for n in list(self._loaded):
+            if n not in keep and n not in dirty: del self._loaded[n]
+
+    def save(self):
+        """Escribe sólo los shards modificados y borra los de endpoints eliminados. Devuelve cuántos escribió."""
+        os.makedirs(os.path.join(self.directory, SHARD_DIR), exist_ok=True)
+        written = 0
+        for n in self.dirty():
+            _write_json(self._path(n), self._loaded[n])
+            self._saved[n] = _digest(self._loaded[n])
+            written += 1
+        live = set(self._shards.values())
+        for f in self._deleted - live:
+            p = os.path.join(self.directory, SHARD_DIR, f)
+            if os.path.exists(p): os.remove(p)
+        self._deleted.clear()
+        return written
+
+
+class ShardedProject(MutableMapping):
+    """Proyecto en carpeta con la misma interfaz que el dict de st.session_state.project."""
+
+    def __init__(self, directory, header, dto_library, shards):
+        self.directory = directory
+        self._data = dict(header)
+        self._data["dto_library"] = dto_library
+        self._data["endpoints"] = LazyEndpoints(directory, shards)
+        self._saved = self._header_digest()
+
+    # --- interfaz de dict ---
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        if key == "endpoints":
+            eps = self._data["endpoints"]
+            for n in list(eps): del eps[n]
+            for n, ep in value.items(): eps[n] = ep
+            return
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        if key in ("endpoints", "dto_library"): raise KeyError(f"'{key}' no se puede eliminar")
+        del self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def endpoints(self):
+        return self._data["endpoints"]
+
+    def _header(self):
+        return {k: v for k, v in self._data.items() if k not in ("endpoints", "dto_library")}
+
+    def _header_digest(self):
+        return _digest([self._header(), self._data["dto_library"], list(self.endpoints._shards.items())])
+
+    # --- disco ---
+    @classmethod
+    def open(cls, directory):
+        m = _read_json(os.path.join(directory, MANIFEST))
+        dto_path = os.path.join(directory, DTO_FILE)
+        lib = _read_json(dto_path) if os.path.exists(dto_path) else {}
+        shards = [(e["name"], e["shard"]) for e in m.get("endpoints", [])]
+        return cls(directory, m.get("project", {}), lib, shards)
+
+    @classmethod
+    def create(cls, directory, project=None):
+        """Crea la carpeta a partir de un proyecto en memoria (dict) y la guarda completa."""
+        project = project or {"courier_name": "", "project_notes": "", "dto_library": {}, "endpoints": {}}
+        header = {k: v for k, v in project.items() if k not in ("endpoints", "dto_library")}
+        sp = cls(directory, header, project.get("dto_library", {}), [])
+        sp._saved = None
+        for n, ep in iter_endpoints(project):
+            sp.endpoints[n] = ep
+            sp.endpoints.save()
+            sp.endpoints.release()
+        sp.save()
+        return sp
+
+    def save(self):
+        """Guarda los cambios. Devuelve el nº de shards de endpoint reescritos."""
+        os.makedirs(self.directory, exist_ok=True)
+        written = self.endpoints.save()
+        digest = self._header_digest()
+        if digest != self._saved:
+            _write_json(os.path.join(self.directory, DTO_FILE), self._data["dto_library"])
+            manifest = {"format": FORMAT_VERSION, "project": self._header(),
+                        "endpoints": [{"name": n, "shard": f} for n, f in self.endpoints._shards.items()]}
+            _write_json(os.path.join(self.directory, MANIFEST), manifest)
+            self._saved = digest
+        return written
+
+
+def is_project_dir(directory):
+    return bool(directory) and os.path.isfile(os.path.join(directory, MANIFEST))
+
+
+# --- IMPORTACIÓN / EXPORTACIÓN AL JSON DE UN SOLO FICHERO ---
+def import_json(source, directory):
+    """Convierte un Project.json (ruta o fichero) en carpeta, leyendo un endpoint cada vez."""
+    fp, owned = open_source(source)  # también Project.json.gz
+    try:
+        header = dict(iter_items(fp, skip=("endpoints",)))
+        sp = ShardedProject(directory, {k: v for k, v in header.items() if k != "dto_library"},
+                            header.get("dto_library", {}), [])
+        sp._saved = None
+        eps = sp.endpoints
+        for n, ep in iter_items(fp, ("endpoints",)):
+            eps[n] = ep
+            eps.save()
+            eps.release()
+        sp.save()
+    finally:
+        if owned: fp.close()
+    return sp
+
+
+def iter_endpoints(project):
+    """(nombre, endpoint) de un proyecto dict o en carpeta, sin dejar cargados los shards."""
+    eps = project["endpoints"]
+    get = eps.peek if isinstance(eps, LazyEndpoints) else eps.__getitem__
+    for n in list(eps): yield n, get(n)
+
+
+def open_source(source):
+    """Ruta o fichero binario -> (fichero binario, propio), descomprimido en streaming si es gzip."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f: head = f.read(2)
+        return (gzip.open(source, "rb") if head == GZIP_MAGIC else open(source, "rb")), True
+    source.seek(0)
+    head = source.read(2)
+    source.seek(0)
+    if head == GZIP_MAGIC: return gzip.GzipFile(fileobj=source, mode="rb"), True
+    return source, False
+
+
+def load_json_file(source):
+    """JSON (o JSON.gz) desde una ruta o un fichero subido."""
+    fp, owned = open_source(source)
+    try:
+        return json.load(fp)
+    finally:
+        if owned: fp.close()
+
+
+def load_project(path):
+    """Proyecto desde una carpeta (ShardedProject) o desde el JSON de un solo fichero (dict, también .gz)."""
+    if os.path.isdir(path): return ShardedProject.open(path)
+    return compact_project(load_json_file(path))
+
+
+def save_project(project, path):
+    """Guarda en carpeta si `path` es una carpeta de proyecto (o termina en '/'); si no, en un solo JSON
+    (comprimido si termina en .gz)."""
+    if isinstance(project, ShardedProject) and os.path.abspath(path) == os.path.abspath(project.directory):
+        return project.save()
+    if is_project_dir(path) or path.endswith(("/", os.sep)):
+        ShardedProject.create(path.rstrip("/" + os.sep) or path, project)
+        return
+    if path.endswith(".gz"):
+        with gzip.open(path, "wt", encoding="utf-8") as f: write_json(project, f)
+        return
+    with open(path, "w", encoding="utf-8") as f: write_json(project, f)
+
+
+# --- SERIALIZACIÓN POR TROZOS ---
+# El documento se genera endpoint a endpoint: nunca se construye el texto completo.
+def iter_json(project, indent=4):
+    """Trozos de json.dumps(project, indent=indent); con indent=None, el compacto (separadores sin espacios)."""
+    if indent is None:
+        colon = ":"
+
+        def dumps(o, level):
+            return json.dumps(o, separators=(",", ":"), default=json_default)
+
+        def nl(level):
+            return ""
+    else:
+        pad, colon = " " * indent, ": "
+
+        def dumps(o, level):
+            # json.dumps(o, indent=...) anidado `level` niveles (mismo texto que dentro del documento completo)
+            return json.dumps(o, indent=indent, default=json_default).replace("\n", "\n" + pad * level)
+
+        def nl(level):
+            return "\n" + pad * level
+
+    keys = list(project.keys())
+    if not keys:
+        yield "{}"
+        return
+    yield "{"
+    for i, k in enumerate(keys):
+        yield ("," if i else "") + nl(1) + json.dumps(k) + colon
+        if k != "endpoints":
+            yield dumps(project[k], 1)
+            continue
+        if not len(project["endpoints"]):
+            yield "{}"
+            continue
+        yield "{"
+        for j, (n, ep) in enumerate(iter_endpoints(project)):
+            yield ("," if j else "") + nl(2) + json.dumps(n) + colon + dumps(ep, 2)
+        yield nl(1) + "}"
+    yield nl(0) + "}"
+
+
+def write_json(project, fp, indent=4):
+    """Escribe el proyecto con el mismo texto que json.dumps(project, indent=indent), endpoint a endpoint."""
+    for chunk in iter_json(project, indent): fp.write(chunk)
+
+
+def export_json(project):
+    if isinstance(project, dict): return json.dumps(project, indent=4, default=json_default)
+    buf = io.StringIO()
+    write_json(project, buf)
+    return buf.getvalue()
+
+
+def export_bytes(project, compact=False, compress=False, level=6):
+    """Proyecto en bytes UTF-8 (gzip con compress=True) escrito por trozos: en memoria sólo queda la salida."""
+    buf = io.BytesIO()
+    out = gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=level, mtime=0) if compress else buf
+    for chunk in iter_json(project, None if compact else 4): out.write(chunk.encode("utf-8"))
+    if compress: out.close()
+    return buf.getvalue()
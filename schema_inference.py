@@ -0,0 +1,222 @@
+# --- INFERENCIA DE ESQUEMA CON VARIAS MUESTRAS ---
+# "Analizar Payload" deduce el tipo de un único valor. Aquí se acumulan estadísticas
+# por ruta sobre muchos payloads (histograma de tipos, nulos, presencia, longitudes y
+# ejemplos). SchemaStats tiene la misma interfaz que FlatCollector (add / add_record /
+# records), así que sirve directamente como collector de stream_json y stream_xml, y
+# es combinable con merge(): cada proceso del pool resume su lote y luego se suman.
+import io
+import json
+import os
+from collections import Counter
+
+from flatten_engine import EMPTY_LIST, iter_leaves
+from json_stream import stream_json
+from parallel import DEFAULT_BATCH_SIZE, batched, map_batches
+from type_inference import DEFAULT_RULES, clean_type_name
+from xml_stream import stream_xml
+
+DEFAULT_MAX_EXAMPLES = 5
+NULL_TYPE = "Null"
+EXAMPLE_LIMIT = 100
+_NUMERIC = {"Integer", "Decimal"}
+
+
+class FieldStats:
+    __slots__ = ("present", "nulls", "types", "min_len", "max_len", "examples", "last")
+
+    def __init__(self):
+        self.present = 0  # nº de registros en los que aparece la ruta
+        self.nulls = 0
+        self.types = Counter()  # tipo observado -> nº de valores
+        self.min_len = None
+        self.max_len = None
+        self.examples = []
+        self.last = -1  # último registro contado en `present`
+
+    @property
+    def values(self):
+        return sum(self.types.values())
+
+    def merge(self, other, max_examples=DEFAULT_MAX_EXAMPLES):
+        self.present += other.present
+        self.nulls += other.nulls
+        self.types.update(other.types)
+        if other.min_len is not None:
+            self.min_len = other.min_len if self.min_len is None else min(self.min_len, other.min_len)
+            self.max_len = other.max_len if self.max_len is None else max(self.max_len, other.max_len)
+        for e in other.examples:
+            if len(self.examples) >= max_examples: break
+            if e not in self.examples: self.examples.append(e)
+
+
+def value_type(value):
+    if value is None: return NULL_TYPE
+    if value == EMPTY_LIST: return "Array"
+    return clean_type_name(type(value).__name__)
+
+
+class SchemaStats:
+    """Esquema combinable: {ruta: FieldStats} + nº de registros vistos."""
+
+    def __init__(self, max_examples=DEFAULT_MAX_EXAMPLES):
+        self.max_examples = max_examples
+        self.paths = {}
+        self.records = 0
+        self.errors = []  # (muestra, error) de las muestras que no se han podido leer
+
+    def add(self, path, value):
+        st = self.paths.get(path)
+        if st is None: st = self.paths[path] = FieldStats()
+        if st.last != self.records:
+            st.last = self.records
+            st.present += 1
+        t = value_type(value)
+        st.types[t] += 1
+        if value is None:
+            st.nulls += 1
+            return
+        n = len(str(value))
+        if st.min_len is None or n < st.min_len: st.min_len = n
+        if st.max_len is None or n > st.max_len: st.max_len = n
+        if len(st.examples) < self.max_examples:
+            ex = str(value)[:EXAMPLE_LIMIT]
+            if ex not in st.examples: st.examples.append(ex)
+
+    def add_record(self, y, merge_arrays=True, array_suffix=""):
+        self.records += 1
+        add = self.add
+        for p, v in iter_leaves(y, merge_arrays=merge_arrays, array_suffix=array_suffix): add(p, v)
+        return self
+
+    def merge(self, other):
+        """Suma otro SchemaStats (de otro lote/proceso). Las rutas nuevas se añaden al final."""
+        for p, o in other.paths.items():
+            st = self.paths.get(p)
+            if st is None: st = self.paths[p] = FieldStats()
+            st.merge(o, self.max_examples)
+        self.records += other.records
+        self.errors.extend(other.errors)
+        for st in self.paths.values(): st.last = -1
+        return self
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return path in self.paths
+
+    # --- RESUMEN ---
+    def _dominant(self, path):
+        types = self.paths[path].types
+        seen = [t for t in types if t != NULL_TYPE]
+        if not seen: return None
+        if set(seen) == _NUMERIC: return "Decimal"
+        return max(seen, key=types.__getitem__)  # el primero con más valores, como most_common(1)
+
+    def string_formats(self, rules=None):
+        """{ruta: tipo} de las rutas de texto cuyos ejemplos tienen formato (fecha, número, UUID...), de una vez."""
+        rules = rules or DEFAULT_RULES
+        if not rules.detect_values: return {}
+        return rules.detect_formats({p: st.examples for p, st in self.paths.items() if self._dominant(p) == "String"})
+
+    def suggest_type(self, path, rules=None, formats=None):
+        """Tipo dominante (Integer+Decimal -> Decimal), con '?' si la ruta puede faltar o ser null.
+
+        Los textos con formato reconocible toman ese tipo (`formats` de string_formats() si se
+        calculan varias rutas). Si sólo se han visto nulos se usa la heurística por nombre.
+        """
+        rules = rules or DEFAULT_RULES
+        st = self.paths[path]
+        base = self._dominant(path)
+        if base is None: return rules.infer(path, None)
+        if base == "String" and rules.detect_values:
+            if formats is None: formats = rules.detect_formats({path: st.examples})
+            base = formats.get(path, base)
+        nullable = st.nulls > 0 or st.present < self.records
+        return clean_type_name(base, is_nullable=nullable)
+
+    def field_summary(self, path, rules=None, formats=None):
+        st = self.paths[path]
+        return {
+            "type": self.suggest_type(path, rules, formats),
+            "types": dict(st.types.most_common()),
+            "null_rate": round(st.nulls / st.values, 4) if st.values else 0.0,
+            "presence_rate": round(st.present / self.records, 4) if self.records else 0.0,
+            "min_length": st.min_len, "max_length": st.max_len,
+            "examples": list(st.examples),
+        }
+
+    def summary(self, rules=None):
+        formats = self.string_formats(rules)
+        return {"records": self.records, "errors": [list(e) for e in self.errors],
+                "fields": {p: self.field_summary(p, rules, formats) for p in self.paths}}
+
+    def example(self, path):
+        st = self.paths[path]
+        return st.examples[0] if st.examples else ""
+
+    def field_types(self, rules=None):
+        """{ruta: (ejemplo, tipo sugerido)} para crear los field_metadata de los campos nuevos."""
+        formats = self.string_formats(rules)
+        return {p: (self.example(p), self.suggest_type(p, rules, formats)) for p in self.paths}
+
+    def size_limit(self, path):
+        """Longitud máxima observada de los textos (para 'Limite de tamaño'); '' si no aplica."""
+        st = self.paths[path]
+        if st.max_len is None or self._dominant(path) != "String": return ""
+        return str(st.max_len)
+
+
+# --- CARGA DE MUESTRAS ---
+def _open_sample(source):
+    # source: ruta o (nombre, bytes) de un fichero subido
+    if isinstance(source, (str, os.PathLike)): return str(source), source
+    name, data = source
+    buf = io.BytesIO(data)
+    buf.name = name
+    return name, buf
+
+
+def add_sample(stats, source):
+    """Añade a `stats` un fichero de muestra JSON / NDJSON / XML (cada elemento de un array raíz es un registro)."""
+    name, src = _open_sample(source)
+    if name.lower().endswith(".xml"): return stream_xml(src, collector=stats)
+    return stream_json(src, collector=stats, merge_arrays=True, array_suffix="")
+
+
+def _schema_files(batch):
+    # Cada muestra se lee aparte y sólo se suma si es válida; las inválidas se anotan y se sigue
+    stats = SchemaStats()
+    for source in batch:
+        try:
+            stats.merge(add_sample(SchemaStats(), source))
+        except Exception as e:
+            stats.errors.append((_open_sample(source)[0], f"{type(e).__name__}: {e}"))
+    return stats
+
+
+def _schema_records(batch):
+    stats = SchemaStats()
+    for r in batch: stats.add_record(json.loads(r) if isinstance(r, (str, bytes)) else r)
+    return stats
+
+
+def merge_all(parts, max_examples=DEFAULT_MAX_EXAMPLES):
+    total = SchemaStats(max_examples=max_examples)
+    for p in parts: total.merge(p)
+    return total
+
+
+def infer_schema_files(sources, workers=None, files_per_task=8):
+    """Esquema combinado de muchos ficheros de muestra, repartidos por lotes en el pool de procesos.
+
+    `sources`: rutas o pares (nombre, bytes). Las muestras que fallan quedan en `.errors`.
+    """
+    sources = list(sources)
+    if workers is None and len(sources) <= files_per_task: workers = 1  # un solo lote: sin arrancar el pool
+    return merge_all(map_batches(_schema_files, batched(sources, files_per_task), workers=workers))
+
+
+def infer_schema_records(records, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Esquema combinado de registros (dicts o líneas JSON, p. ej. de un NDJSON grande)."""
+    return merge_all(map_batches(_schema_records, batched(records, batch_size), workers=workers))
@@ -0,0 +1,173 @@
+# --- ALMACÉN COMPARTIDO DE ESTÁNDARES Y DTOs (POR PROCESO) ---
+# Con muchas sesiones abiertas en el mismo servidor cada una parseaba, aplanaba y
+# guardaba su propia copia de los mismos estándares / DTOs. Aquí cada contenido
+# (hash del JSON) se guarda una sola vez por proceso, con sus opciones aplanadas:
+# - las sesiones usan el objeto compartido (nunca se modifica en sitio: la app sustituye
+#   los DTOs, no los edita) y guardan en su session_state un StoreHandle con las claves
+#   que usan (referencias contadas)
+# - cuando Streamlit descarta una sesión su StoreHandle se recolecta y las referencias
+#   se liberan solas (weakref.finalize)
+# - las entradas sin referencias se quedan en un LRU de tamaño acotado (MAX_IDLE) por si
+#   otra sesión vuelve a cargar el mismo fichero; las que están en uso no se desalojan
+# Las sesiones de Streamlit son hilos del mismo proceso: todo va bajo un lock.
+import hashlib
+import json
+import threading
+import weakref
+from collections import OrderedDict
+
+from dto_cache import dto_hash, dto_options
+
+MAX_IDLE = 16
+
+
+class _Entry:
+    __slots__ = ("obj", "refs", "options")
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.refs = 0
+        self.options = {}  # (nombre, prefixed) -> opciones ordenadas
+
+
+class SharedStore:
+    def __init__(self, max_idle=MAX_IDLE):
+        self.max_idle = max_idle
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # clave -> _Entry (orden LRU)
+        self._ids = {}  # id(objeto compartido) -> clave
+        self._raw = {}  # sha1 de los bytes subidos -> clave (evita reparsear el mismo fichero)
+        self.parsed = 0  # objetos nuevos parseados / internados (diagnóstico)
+        self.flattened = 0
+
+    # --- entradas ---
+    def key_of(self, obj):
+        """Clave de un objeto ya compartido (por identidad, O(1)); None si no lo es."""
+        with self._lock:
+            return self._ids.get(id(obj))
+
+    def intern(self, obj, acquire=False):
+        """(clave, objeto compartido) con el mismo contenido que `obj`.
+
+        Con acquire=True la clave sale ya referenciada: se cuenta bajo el mismo lock que la
+        busca, así el LRU no puede desalojarla entre intern y acquire.
+        """
+        key = self.key_of(obj)
+        if key is None: key = dto_hash(obj)  # fuera del lock: es lo caro
+        with self._lock:
+            e = self._entries.get(key)
+            created = e is None
+            if created:
+                e = self._entries[key] = _Entry(obj)
+                self._ids[id(obj)] = key
+                self.parsed += 1
+            self._entries.move_to_end(key)
+            if acquire: e.refs += 1
+            if created: self._evict()
+            return key, e.obj
+
+    def load(self, raw):
+        """(clave, objeto compartido) de un JSON en bytes/str; el mismo fichero sólo se parsea una vez."""
+        data = raw.encode("utf-8") if isinstance(raw, str) else raw
+        rkey = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            key = self._raw.get(rkey)
+            e = self._entries.get(key) if key else None
+            if e is not None:
+                self._entries.move_to_end(key)
+                return key, e.obj
+        key, obj = self.intern(json.loads(data.decode("utf-8-sig")))
+        with self._lock:
+            self._raw[rkey] = key
+        return key, obj
+
+    def options(self, obj, name, prefixed=True):
+        """(clave, opciones ordenadas) de un DTO, aplanado una vez por proceso. No modificar la lista."""
+        key, obj = self.intern(obj)
+        with self._lock:
+            e = self._entries.get(key) or _Entry(obj)
+            opts = e.options.get((name, prefixed))
+        if opts is None:
+            opts = dto_options(name, obj, prefixed)
+            with self._lock:
+                e.options[(name, prefixed)] = opts
+                self.flattened += 1
+        return key, opts
+
+    # --- referencias ---
+    def acquire(self, keys):
+        with self._lock:
+            for k in keys:
+                e = self._entries.get(k)
+                if e is not None: e.refs += 1
+
+    def release(self, keys):
+        with self._lock:
+            for k in keys:
+                e = self._entries.get(k)
+                if e is not None and e.refs > 0: e.refs -= 1
+            self._evict()
+
+    def _evict(self):
+        # Sólo se desalojan entradas sin referencias, las menos usadas primero
+        idle = [k for k, e in self._entries.items() if not e.refs]
+        for k in idle[:max(0, len(idle) - self.max_idle)]:
+            e = self._entries.pop(k)
+            self._ids.pop(id(e.obj), None)
+        if len(self._raw) > len(self._entries) * 2:
+            self._raw = {r: k for r, k in self._raw.items() if k in self._entries}
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "in_use": sum(1 for e in self._entries.values() if e.refs),
+                    "refs": sum(e.refs for e in self._entries.values()), "parsed": self.parsed,
+                    "flattened": self.flattened}
+
+
+class StoreHandle:
+    """Referencias de una sesión al almacén (se guarda en st.session_state)."""
+
+    def __init__(self, store):
+        self.store = store
+        self.keys = set()
+        # Sin referencia a self: al recolectarse la sesión se liberan sus claves
+        weakref.finalize(self, store.release, self.keys)
+
+    def hold(self, keys):
+        """Deja referenciadas exactamente `keys` (adquiere las nuevas, libera las que ya no se usan)."""
+        keys = set(keys)
+        new, gone = keys - self.keys, self.keys - keys
+        if new: self.store.acquire(new)
+        self.keys.difference_update(gone)
+        self.keys.update(new)
+        if gone: self.store.release(gone)
+
+    def _adopt(self, acquired):
+        # Como hold, pero `acquired` llega ya referenciado (una referencia por aparición, de intern):
+        # se queda una por clave nueva y se devuelven las repetidas y las que ya no se usan
+        keys = set(acquired)
+        extra = list(acquired)
+        for k in keys - self.keys: extra.remove(k)
+        gone = self.keys - keys
+        self.keys.difference_update(gone)
+        self.keys.update(keys)
+        if extra or gone: self.store.release(extra + list(gone))
+
+    def share_library(self, library):
+        """Sustituye (en sitio) cada DTO de la librería por el objeto compartido y los referencia."""
+        keys = []
+        for n, obj in list(library.items()):
+            key, shared = self.store.intern(obj, acquire=True)
+            if shared is not obj: library[n] = shared
+            keys.append(key)
+        self._adopt(keys)
+        return library
+
+    def share(self, *objs):
+        """Objetos compartidos equivalentes a `objs` (referenciados mientras sigan en uso en la sesión)."""
+        pairs = [self.store.intern(o, acquire=True) for o in objs]
+        self._adopt([k for k, _ in pairs])
+        return [o for _, o in pairs]
+
+
+STORE = SharedStore()
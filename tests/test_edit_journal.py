@@ -0,0 +1,80 @@
+# --- DIARIO DE EDICIÓN: reaplicado y compactación con valores no ASCII ---
+import json
+import os
+
+from edit_journal import JOURNAL, SNAPSHOT, EditJournal
+
+VALUE = "ñandú café 🚀 " * 20  # varios bytes por carácter con ensure_ascii=False
+
+
+class _HookedJournal(EditJournal):
+    """Ejecuta `hook` una vez entre el corte de compact() (getsize) y el reaplicado del diario."""
+    hook = None
+
+    def _read_snapshot(self):
+        snap = super()._read_snapshot()
+        if self.hook:
+            hook, self.hook = self.hook, None
+            hook()
+        return snap
+
+
+def _snapshot_seq(directory):
+    with open(os.path.join(directory, SNAPSHOT), encoding="utf-8") as f: return json.load(f)["seq"]
+
+
+def test_restore_replays_non_ascii_values(tmp_path):
+    j = EditJournal(str(tmp_path), compact_ops=10 ** 9)
+    j.reset({"a": 0})
+    j.record([("set", ("k", str(i)), VALUE) for i in range(10)] + [("del", ("a",), None)])
+
+    j2 = EditJournal(str(tmp_path))
+    state = j2.restore()
+    assert state == {"k": {str(i): VALUE for i in range(10)}}
+    assert j2.seq == 11 and j2.pending == 11
+
+
+def test_restore_drops_truncated_last_line(tmp_path):
+    j = EditJournal(str(tmp_path), compact_ops=10 ** 9)
+    j.reset({})
+    j.record([("set", ("x",), VALUE)])
+    j.record([("set", ("y",), VALUE)])
+    j._fp.close()
+    j._fp = None
+    path = os.path.join(str(tmp_path), JOURNAL)
+    with open(path, "rb") as f: data = f.read()
+    with open(path, "wb") as f: f.write(data[:-5])  # corta dentro de un carácter de varios bytes
+
+    assert EditJournal(str(tmp_path)).restore() == {"x": VALUE}
+
+
+def test_compact_stops_at_byte_cut_point(tmp_path):
+    j = _HookedJournal(str(tmp_path), compact_ops=10 ** 9)
+    j.reset({})
+    j.record([("set", ("k", str(i)), VALUE) for i in range(50)])
+    # Escrita mientras se compacta: no entra en el snapshot, se queda en el diario
+    j.hook = lambda: j.record([("set", ("late",), "después 🎉")])
+    j.compact()
+
+    assert _snapshot_seq(str(tmp_path)) == 50
+    assert j.pending == 1
+    j.record([("del", ("k", "0"), None)])
+
+    j2 = EditJournal(str(tmp_path))
+    state = j2.restore()
+    assert state["late"] == "después 🎉"
+    assert len(state["k"]) == 49 and state["k"]["1"] == VALUE
+    assert j2.seq == 52 and j2.pending == 2
+
+
+def test_compact_then_restore_matches_uncompacted(tmp_path):
+    ops = [("set", ("eps", f"e{i % 7}", "campo"), f"valor {i} ç") for i in range(300)]
+    ops += [("del", ("eps", "e3"), None)]
+    a, b = tmp_path / "a", tmp_path / "b"
+    for d, compact in ((a, True), (b, False)):
+        j = EditJournal(str(d), compact_ops=10 ** 9)
+        j.reset({"eps": {}})
+        j.record(ops[:150])
+        if compact: j.compact()
+        j.record(ops[150:])
+    assert EditJournal(str(a)).restore() == EditJournal(str(b)).restore()
@@ -0,0 +1,57 @@
+# --- map_batches: resultados en el orden de entrada, en el proceso y en el pool ---
+import os
+import time
+
+import pytest
+
+from parallel import batched, map_batches
+
+_STATE = {}
+
+
+def _init(offset):
+    _STATE["offset"] = offset
+
+
+def _slow_reversed(batch):
+    # Los primeros lotes tardan más: con varios procesos terminarían en otro orden
+    time.sleep(0.02 * max(0, 5 - batch[0] // 10))
+    return [x + _STATE.get("offset", 0) for x in batch], os.getpid()
+
+
+def _fail_on(batch):
+    if 13 in batch: raise ValueError("lote 13")
+    return batch
+
+
+def test_batched():
+    assert list(batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched([], 3)) == []
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3])
+def test_map_batches_keeps_input_order(workers):
+    out = list(map_batches(_slow_reversed, batched(range(60), 10), workers=workers, initializer=_init,
+                           initargs=(100,), max_in_flight=4))
+    assert [x for values, _ in out for x in values] == [x + 100 for x in range(60)]
+    pids = {pid for _, pid in out}
+    assert (pids == {os.getpid()}) if workers == 1 else (os.getpid() not in pids)
+
+
+def test_map_batches_consumes_input_lazily():
+    pulled = []
+
+    def source():
+        for i in range(100):
+            pulled.append(i)
+            yield [i]
+
+    results = map_batches(_fail_on, source(), workers=2, max_in_flight=3)
+    assert next(results) == [0]
+    assert len(pulled) <= 4  # la ventana acotada no lee toda la entrada
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_map_batches_propagates_errors(workers):
+    with pytest.raises(ValueError, match="lote 13"):
+        list(map_batches(_fail_on, batched(range(30), 1), workers=workers))
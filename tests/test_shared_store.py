@@ -0,0 +1,98 @@
+# --- ALMACÉN COMPARTIDO: referencias, desalojo LRU y acceso concurrente ---
+import gc
+import json
+import threading
+
+from shared_store import SharedStore, StoreHandle
+
+
+def test_same_content_is_shared_once():
+    store = SharedStore()
+    h = StoreHandle(store)
+    lib = {"A": {"x": 1}, "B": {"x": 1}, "C": {"y": 2}}
+    h.share_library(lib)
+    assert lib["A"] is lib["B"]
+    assert store.stats()["entries"] == 2 and store.stats()["refs"] == 2
+    assert store.key_of(lib["A"]) is not None and store.key_of({"x": 1}) is None
+
+
+def test_load_parses_each_file_once():
+    store = SharedStore()
+    raw = json.dumps({"campo": "olá"}).encode("utf-8")
+    k1, o1 = store.load(raw)
+    k2, o2 = store.load(raw)
+    assert (k1, o1) == (k2, o2) and o1 is o2
+    assert store.parsed == 1
+
+
+def test_hold_releases_unused_keys():
+    store = SharedStore(max_idle=0)
+    h = StoreHandle(store)
+    a, = h.share({"a": 1})
+    h.share({"b": 2})
+    # {"a": 1} ya no está referenciado y sin hueco idle se desaloja
+    assert store.stats() == {"entries": 1, "in_use": 1, "refs": 1, "parsed": 2, "flattened": 0}
+    assert store.key_of(a) is None
+
+
+def test_idle_entries_are_evicted_lru():
+    store = SharedStore(max_idle=2)
+    a = store.intern({"n": 0})[1]
+    b = store.intern({"n": 1})[1]
+    store.intern(a)  # `a` pasa a ser la más reciente: la menos usada es `b`
+    c = store.intern({"n": 2})[1]
+    assert [store.key_of(o) is not None for o in (a, b, c)] == [True, False, True]
+
+
+def test_entries_in_use_are_never_evicted():
+    store = SharedStore(max_idle=0)
+    h = StoreHandle(store)
+    kept, = h.share({"keep": True})
+    for i in range(20): store.intern({"n": i})
+    assert store.key_of(kept) is not None
+    assert store.stats()["entries"] == 1
+
+
+def test_intern_acquire_counts_before_eviction():
+    # Con max_idle=0 una entrada nueva sin referencias se desaloja al crearla; con acquire=True no
+    store = SharedStore(max_idle=0)
+    key, obj = store.intern({"a": 1}, acquire=True)
+    assert store.key_of(obj) == key and store.stats()["refs"] == 1
+    store.release([key])
+    assert store.stats()["entries"] == 0
+
+
+def test_released_when_handle_is_collected():
+    store = SharedStore(max_idle=0)
+    h = StoreHandle(store)
+    h.share({"a": 1}, {"a": 1})
+    assert store.stats()["refs"] == 1
+    del h
+    gc.collect()
+    assert store.stats()["entries"] == 0 and store.stats()["refs"] == 0
+
+
+def test_concurrent_sessions_keep_refcounts_consistent():
+    store = SharedStore(max_idle=4)
+    errors = []
+    holders = []
+
+    def session(n):
+        try:
+            h = StoreHandle(store)
+            for i in range(300):
+                obj, = h.share({"k": (i + n) % 25})
+                assert store.key_of(obj) is not None  # referenciado: no se puede haber desalojado
+            holders.append(h)
+        except Exception as e:  # se comprueba abajo
+            errors.append(e)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert not errors
+    # Cada sesión acaba con una sola referencia a su último objeto
+    assert store.stats()["refs"] == len(holders) == 6
+    for h in holders: h.hold([])
+    st = store.stats()
+    assert st["refs"] == 0 and st["entries"] <= 4
@@ -0,0 +1,97 @@
+# --- APLANADO EN STREAMING (JSON / NDJSON / XML) FRENTE A flatten_payload EN MEMORIA ---
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+import xmltodict
+
+from benchmarks.generators import make_json_payload, make_json_records, make_xml_payload
+from flatten_engine import ARRAY_SUFFIX, FlatCollector, flatten_payload
+from json_stream import iter_array, iter_items, stream_json
+from xml_stream import iter_xml_leaves, stream_xml
+
+CHUNKS = (7, 64, 1 << 16)  # trozos pequeños: tokens, escapes y UTF-8 partidos entre lecturas
+
+ACCENTS = {
+    "pedido": {"id": 7, "cliente": "José Ñúñez 🚀", "obs": "línea\nnueva \"comillas\" \\ ç", "vacio": {},
+               "lista_vacia": [], "nulo": None, "flags": [True, False], "precio": -12.5e-3,
+               "items": [{"sku": "Á1", "qtd": 1}, {"sku": "B2", "extra": {"cor": "açaí"}}, {"sku": "C3"}]},
+    "tags": ["ü", "ß"],
+}
+
+
+def _json_bytes(y):
+    return json.dumps(y, ensure_ascii=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("payload", [ACCENTS, make_json_payload(seed=3), make_json_payload(depth=6, width=4, seed=9)])
+@pytest.mark.parametrize("merge_arrays, array_suffix", [(False, ARRAY_SUFFIX), (True, ARRAY_SUFFIX), (True, "")])
+@pytest.mark.parametrize("chunk_size", CHUNKS)
+def test_stream_json_matches_flatten_payload(payload, merge_arrays, array_suffix, chunk_size):
+    c = stream_json(io.BytesIO(_json_bytes(payload)), merge_arrays=merge_arrays, array_suffix=array_suffix,
+                    chunk_size=chunk_size)
+    expected = flatten_payload(payload, merge_arrays=merge_arrays, array_suffix=array_suffix) if merge_arrays \
+        else flatten_payload(payload)
+    assert c.examples() == expected
+    assert list(c.examples()) == list(expected)  # mismo orden de rutas
+    assert c.records == 1
+
+
+@pytest.mark.parametrize("chunk_size", CHUNKS)
+def test_stream_json_root_array_is_one_record_per_element(chunk_size):
+    records = make_json_records(20, seed=2) + [ACCENTS]
+    c = stream_json(io.BytesIO(_json_bytes(records)), merge_arrays=True, chunk_size=chunk_size)
+    expected = FlatCollector()
+    for r in records: expected.add_record(r)
+    assert c.records == len(records)
+    assert c.examples() == expected.examples()
+    assert {p: c.samples(p) for p in c.paths} == {p: expected.samples(p) for p in expected.paths}
+
+
+def test_stream_json_ndjson_lines():
+    records = make_json_records(10, seed=5) + [ACCENTS]
+    data = b"\n".join(_json_bytes(r) for r in records) + b"\n\n"
+    c = stream_json(io.BytesIO(data), ndjson=True, merge_arrays=True)
+    expected = FlatCollector()
+    for r in records: expected.add_record(r)
+    assert c.records == len(records)
+    assert c.examples() == expected.examples()
+
+
+def test_stream_json_rejects_malformed():
+    with pytest.raises(ValueError):
+        stream_json(io.BytesIO(b'{"a": [1, 2}'), chunk_size=4)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNKS)
+def test_iter_array_and_iter_items(chunk_size):
+    doc = {"log": {"version": "1.2", "entries": make_json_records(15, seed=1) + [ACCENTS]}, "resto": ["x"] * 50}
+    raw = _json_bytes(doc)
+    assert list(iter_array(io.BytesIO(raw), ("log", "entries"), chunk_size=chunk_size)) == doc["log"]["entries"]
+    assert list(iter_array(io.BytesIO(raw), ("no", "existe"), chunk_size=chunk_size)) == []
+    assert dict(iter_items(io.BytesIO(raw), ("log",), skip=("entries",), chunk_size=chunk_size)) == {"version": "1.2"}
+
+
+SOAP = ('<?xml version="1.0" encoding="UTF-8"?>'
+        '<s:Env xmlns:s="urn:s" xmlns:n="urn:n"><s:Body><n:R id="1" xml:lang="pt">Olá 🚀'
+        '<n:C>ç</n:C><n:C a="x">é<n:D>d</n:D></n:C><n:Obs>&lt;frágil&gt; &amp; seguro</n:Obs></n:R>'
+        '<n:E/><n:R id="2"><n:F>só no segundo</n:F></n:R></s:Body></s:Env>')
+
+
+@pytest.mark.parametrize("xml", [SOAP, make_xml_payload(seed=3), make_xml_payload(depth=5, width=4, seed=8)])
+@pytest.mark.parametrize("chunk_size", CHUNKS)
+def test_stream_xml_matches_xmltodict_flatten(xml, chunk_size):
+    doc = xmltodict.parse(xml)
+    first = dict(iter_xml_leaves(io.BytesIO(xml.encode("utf-8")), merge_arrays=False, chunk_size=chunk_size))
+    assert first == flatten_payload(doc)
+    assert list(first) == list(flatten_payload(doc))
+    # Con merge_arrays los tags repetidos se unen sin sufijo '[*]' (no se sabe de antemano si se repiten).
+    # Mismas rutas y valores; el orden puede variar si un tag se repite tras otros hermanos (<R/><E/><R/>)
+    merged = stream_xml(io.BytesIO(xml.encode("utf-8")), merge_arrays=True, chunk_size=chunk_size)
+    assert merged.examples() == flatten_payload(doc, merge_arrays=True, array_suffix="")
+
+
+def test_stream_xml_rejects_malformed():
+    with pytest.raises(ET.ParseError):
+        stream_xml(io.BytesIO(b"<a><b></a>"))
@@ -0,0 +1,66 @@
+# --- REGLAS DE TIPOS: validación de la configuración, formatos y memo ---
+import threading
+
+import pytest
+
+import type_inference
+from type_inference import DEFAULT_RULES, MEMO_MAX_ENTRIES, TypeRules, rules_for
+
+
+@pytest.mark.parametrize("config, message", [
+    ([1], "objeto JSON"),
+    ({"keywords": ["Date"]}, "'keywords' debe ser un objeto"),
+    ({"keywords": {"Date": "fecha"}}, "'keywords.Date' debe ser una lista"),
+    ({"keywords": {"Date": ["fecha", 1]}}, "'keywords.Date' debe ser una lista"),
+    ({"formats": "x"}, "'formats' debe ser un objeto"),
+    ({"formats": {"Code": ["A"]}}, "'formats.Code' debe ser una expresión regular"),
+    ({"formats": {"Code": "("}}, "'formats.Code' no es una expresión regular válida"),
+    ({"detect_values": "yes"}, "'detect_values'"),
+])
+def test_from_config_rejects_malformed(config, message):
+    with pytest.raises(ValueError, match=message):
+        TypeRules.from_config(config)
+
+
+def test_from_config_valid_and_default():
+    rules = TypeRules.from_config({"keywords": {"Date": ["fecha"]}, "formats": {"Code": r"[A-Z]{2}\d+"},
+                                   "detect_values": True})
+    assert rules.key_type("fechaAlta") == "Date"
+    assert rules.key_type("nombre") == "String"
+    assert TypeRules.from_config(None).config() == DEFAULT_RULES.config()
+
+
+def test_rules_for_caches_per_config():
+    project = {"type_rules": {"keywords": {"Date": ["fecha"]}}}
+    assert rules_for(project) is rules_for({"type_rules": {"keywords": {"Date": ["fecha"]}}})
+    assert rules_for({}) is DEFAULT_RULES
+    for i in range(type_inference.MAX_RULE_SETS + 10):
+        rules_for({"type_rules": {"keywords": {"Date": [f"f{i}"]}}})
+    assert len(type_inference._RULES_CACHE) <= type_inference.MAX_RULE_SETS
+
+
+def test_detect_formats_first_matching_format_wins():
+    rules = TypeRules(formats={"Integer": r"-?\d+", "Decimal": r"-?\d+(?:[.,]\d+)?", "Code (AB)": r"(A|B)\d+"})
+    samples = {"n": ["1", " 2 ", ""], "d": ["1", "2.5"], "c": ["A1", "B22"], "mix": ["A1", "1"], "empty": ["", " "],
+               "partial": ["12x"]}
+    assert rules.detect_formats(samples) == {"n": "Integer", "d": "Decimal", "c": "Code (AB)"}
+    assert rules.detect_formats({}) == {}
+    assert TypeRules(formats={}).detect_formats(samples) == {}
+
+
+def test_key_type_memo_is_bounded_and_thread_safe():
+    rules = TypeRules(keywords={"Date": ["data"]})
+    errors = []
+
+    def work(step):
+        try:
+            for i in range(MEMO_MAX_ENTRIES * 2):
+                assert rules.key_type(f"campo{(i * step) % (MEMO_MAX_ENTRIES + 500)}Data") == "Date"
+        except Exception as e:  # se comprueba abajo
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(1, 5)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert not errors
+    assert len(rules._memo) <= MEMO_MAX_ENTRIES
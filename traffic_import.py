@@ -0,0 +1,194 @@
+# --- IMPORTADOR DE TRÁFICO (HAR / NDJSON) ---
+# Capturas reales del courier con miles de llamadas. Las entradas se leen en streaming
+# (iter_array sobre log.entries, o línea a línea en NDJSON), se agrupan por método +
+# ruta normalizada ("POST /v1/orders/{id}") y los cuerpos se analizan por lotes en el
+# pool de procesos. Cada lote devuelve un SchemaStats por endpoint y dirección, que se
+# combinan en el proceso principal: la memoria depende del tamaño de los lotes, no de
+# la captura.
+import base64
+import io
+import json
+import os
+import re
+from urllib.parse import urlsplit
+
+from json_stream import is_ndjson_name, iter_array
+from mapping_table import new_endpoint, new_field_metadata
+from parallel import DEFAULT_BATCH_SIZE, batched, map_batches
+from schema_inference import SchemaStats
+from type_inference import rules_for
+from xml_stream import stream_xml
+
+HAR_ENTRIES = ("log", "entries")
+ENTRIES_PER_TASK = DEFAULT_BATCH_SIZE // 4
+CALLS_KEY = "Llamadas capturadas"
+
+# Segmentos variables de la URL -> marcador
+_SEGMENTS = [
+    (re.compile(r"^\d+$"), "{id}"),
+    (re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"), "{uuid}"),
+    (re.compile(r"^(?=.*\d)[0-9A-Za-z_-]{16,}$"), "{token}"),
+    (re.compile(r"^[A-Z]{2}\d{9}[A-Z]{2}$"), "{tracking}"),  # código de rastreo postal (UPU S10)
+]
+
+
+def normalize_path(url):
+    """'https://api.x/v1/orders/123?x=1' -> '/v1/orders/{id}'."""
+    path = urlsplit(url or "").path or "/"
+    parts = []
+    for seg in path.split("/"):
+        if not seg: continue
+        for rx, repl in _SEGMENTS:
+            if rx.match(seg):
+                seg = repl
+                break
+        parts.append(seg)
+    return "/" + "/".join(parts)
+
+
+def endpoint_key(method, url):
+    return f"{(method or 'GET').upper()} {normalize_path(url)}"
+
+
+def _har_text(content):
+    # postData / response.content: {"mimeType", "text", "encoding"?}
+    if not isinstance(content, dict): return None
+    text = content.get("text")
+    if text and content.get("encoding") == "base64":
+        try:
+            text = base64.b64decode(text).decode("utf-8")
+        except Exception:
+            return None
+    if not text and content.get("params"):
+        text = json.dumps({p.get("name"): p.get("value") for p in content["params"] if p.get("name")})
+    return text
+
+
+def entry_parts(entry):
+    """(método, url, cuerpo request, cuerpo response) de una entrada HAR o de una línea de log NDJSON.
+
+    En NDJSON se aceptan entradas con forma HAR ({"request": {...}, "response": {...}}) o planas
+    ({"method", "url", "request_body", "response_body"}); los cuerpos pueden ser texto u objetos.
+    """
+    req, resp = entry.get("request"), entry.get("response")
+    if isinstance(req, dict) and ("url" in req or "method" in req):
+        return (req.get("method"), req.get("url"), _har_text(req.get("postData")),
+                _har_text(resp.get("content")) if isinstance(resp, dict) else None)
+    return (entry.get("method"), entry.get("url") or entry.get("path"),
+            entry.get("request_body", req), entry.get("response_body", resp))
+
+
+def iter_entries(source, ndjson=None):
+    """Entradas de una captura HAR (log.entries) o NDJSON, una a una."""
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    if ndjson is None: ndjson = is_ndjson_name(name)
+    if not ndjson:
+        yield from iter_array(source, HAR_ENTRIES)
+        return
+    fp = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        for line in fp:
+            if line.strip(): yield json.loads(line)
+    finally:
+        if fp is not source: fp.close()
+
+
+def iter_calls(entries):
+    """(endpoint, método, cuerpo request, cuerpo response) de cada entrada."""
+    for e in entries:
+        method, url, req, resp = entry_parts(e)
+        yield endpoint_key(method, url), (method or "GET").upper(), req, resp
+
+
+def _add_body(stats, body):
+    # Un cuerpo = un registro. Texto JSON/XML o un objeto ya decodificado; el resto se ignora.
+    if body is None or body == "": return False
+    if isinstance(body, str):
+        text = body.strip()
+        if text.startswith("<"):
+            stream_xml(io.BytesIO(text.encode("utf-8")), collector=stats)
+            return True
+        if not text.startswith(("{", "[")): return False
+        body = json.loads(text)
+    if not isinstance(body, (dict, list)): return False
+    stats.add_record(body)
+    return True
+
+
+def _analyze_calls(batch):
+    out = {}
+    for key, method, req, resp in batch:
+        acc = out.get(key)
+        if acc is None: acc = out[key] = [method, 0, SchemaStats(), SchemaStats()]
+        acc[1] += 1
+        for stats, body in ((acc[2], req), (acc[3], resp)):
+            try:
+                _add_body(stats, body)
+            except Exception:
+                pass  # cuerpos truncados o no JSON en la captura: no cuentan como muestra
+    return out
+
+
+class TrafficGroups:
+    """Estadísticas combinadas por endpoint: {clave: [método, nº llamadas, esquema request, esquema response]}."""
+
+    def __init__(self):
+        self.groups = {}
+        self.calls = 0
+
+    def merge(self, part):
+        for key, (method, n, req, resp) in part.items():
+            g = self.groups.get(key)
+            if g is None:
+                self.groups[key] = [method, n, req, resp]
+            else:
+                g[1] += n
+                g[2].merge(req)
+                g[3].merge(resp)
+            self.calls += n
+        return self
+
+
+def analyze_traffic(sources, workers=None, batch_size=ENTRIES_PER_TASK, progress=None):
+    """Agrupa y analiza una o varias capturas. `progress(llamadas procesadas)` tras cada lote."""
+    if isinstance(sources, (str, os.PathLike)) or hasattr(sources, "read"): sources = [sources]
+    total = TrafficGroups()
+    for src in sources:
+        calls = iter_calls(iter_entries(src))
+        for part in map_batches(_analyze_calls, batched(calls, batch_size), workers=workers):
+            total.merge(part)
+            if progress: progress(total.calls)
+    return total
+
+
+def _required(schema, path):
+    st = schema.paths[path]
+    return "Sí" if st.present == schema.records and not st.nulls else "No"
+
+
+def apply_traffic(project, traffic):
+    """Vuelca los grupos en project["endpoints"]: crea endpoints y campos nuevos (los existentes no se tocan).
+
+    Devuelve (endpoints nuevos, campos nuevos).
+    """
+    new_eps = new_fields = 0
+    rules = rules_for(project)
+    for key, (method, n, req, resp) in traffic.groups.items():
+        ep = project["endpoints"].get(key)
+        if ep is None:
+            ep = project["endpoints"][key] = new_endpoint(method)
+            new_eps += 1
+        extras = ep.setdefault("extra_metadata", {})
+        extras[CALLS_KEY] = int(extras.get(CALLS_KEY) or 0) + n
+        for direction, schema in (("request", req), ("response", resp)):
+            meta = ep[direction]["field_metadata"]
+            formats = None
+            for k in schema.paths:
+                if k in meta: continue
+                if formats is None: formats = schema.string_formats(rules)
+                m = meta[k] = new_field_metadata(schema.example(k), schema.suggest_type(k, rules, formats))
+                # Presencia en las llamadas capturadas: presente siempre y nunca null -> requerido
+                m["required"] = _required(schema, k)
+                m["presence_rate"] = schema.field_summary(k, rules, formats)["presence_rate"]
+                new_fields += 1
+    return new_eps, new_fields
@@ -0,0 +1,194 @@
+# --- LÓGICA DE TIPOS LIMPIA ---
+# Motor único de inferencia de tipos (app.py, mapper_tool.py, importadores y CLI):
+# - reglas por palabra clave del nombre del campo, compiladas en una sola expresión
+#   (la primera regla que encaja gana, igual que la cadena de any() anterior) y
+#   memoizadas por clave normalizada (LRU acotado)
+# - detección de formato a partir de los valores de texto (fechas ISO, números en
+#   texto, booleanos, UUID, CPF/CNPJ). Para muchas rutas a la vez se hace por lotes
+#   con operaciones vectorizadas de pandas sobre las columnas de ejemplos.
+# Las reglas se pueden personalizar por proyecto (project["type_rules"]).
+import json
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import pandas as pd
+
+
+_NAMES = {'str': 'String', 'int': 'Integer', 'float': 'Decimal', 'bool': 'Boolean', 'dict': 'Object', 'list': 'Array',
+          'nonetype': 'String', 'string': 'String', 'integer': 'Integer', 'decimal': 'Decimal', 'boolean': 'Boolean',
+          'object': 'Object', 'array': 'Array', 'date': 'Date', 'datetime': 'DateTime'}
+
+# Tipo -> palabras clave del nombre (en orden de prioridad). 'cpf'/'cnpj' van antes que 'id'/'num'.
+DEFAULT_KEYWORDS = {
+    "DateTime": ["dt", "date", "time"],
+    "Boolean": ["flag", "is_"],
+    "Decimal": ["qtd", "peso", "valor", "total", "price"],
+    "String": ["cpf", "cnpj"],
+    "Integer": ["id", "cod", "num"],
+    "Array": ["list", "array", "items"],
+}
+# Tipo -> formato de un valor de texto (en orden de prioridad). Los enteros con ceros a la
+# izquierda no cuentan como Integer (son códigos).
+DEFAULT_FORMATS = {
+    "Boolean": r"(?i:true|false)",
+    "DateTime": r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?",
+    "Date": r"\d{4}-\d{2}-\d{2}",
+    "String (UUID)": r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
+    "String (CNPJ)": r"\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}",
+    "String (CPF)": r"\d{3}\.\d{3}\.\d{3}-\d{2}",
+    "Integer": r"-?(?:0|[1-9]\d{0,17})",
+    "Decimal": r"-?(?:0|[1-9]\d{0,17})(?:[.,]\d+)?",
+}
+MEMO_MAX_ENTRIES = 4096  # nombres de campo memoizados por TypeRules (LRU)
+MAX_RULE_SETS = 32  # configuraciones compiladas que guarda rules_for (LRU)
+_RULES_CACHE = OrderedDict()
+_RULES_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1024)  # se llama por cada campo, con muy pocos nombres distintos
+def _clean_base(val_type):
+    raw = val_type.replace("(null)", "").replace("?", "").strip()
+    name, sep, fmt = raw.partition(" (")  # "String (UUID)": se normaliza la base y se respeta el formato
+    return _NAMES.get(name.lower(), name.capitalize()) + (sep + fmt if sep else "")
+
+
+def clean_type_name(val_type, is_nullable=False):
+    base = _clean_base(str(val_type))
+    if is_nullable: return f"{base}?"
+    return base
+
+
+class TypeRules:
+    """Reglas de inferencia compiladas: palabras clave del nombre + formatos de los valores."""
+
+    def __init__(self, keywords=None, formats=None, detect_values=True):
+        self.keywords = dict(DEFAULT_KEYWORDS if keywords is None else keywords)
+        self.formats = dict(DEFAULT_FORMATS if formats is None else formats)
+        self.detect_values = detect_values
+        # Una alternativa por regla: (?=.*kw1|.*kw2)(?P<r0>) ... se prueba en orden y gana la primera
+        alts = [f"(?=.*(?:{'|'.join(re.escape(k.lower()) for k in kws)}))(?P<r{i}>)"
+                for i, kws in enumerate(self.keywords.values()) if kws]
+        self._key_rx = re.compile("|".join(alts), re.S) if alts else None
+        self._key_types = list(self.keywords)
+        self._value_rx = [(t, re.compile(rx)) for t, rx in self.formats.items()]
+        # Anclados al final: str.match sólo ancla el principio y el formato tiene que cubrir todo el texto
+        self._value_full = [(t, re.compile(rf"(?:{rx})\Z")) for t, rx in self.formats.items()]
+        # Todos los formatos en una sola alternativa: fullmatch se queda con la primera que encaja entera
+        self._value_types = list(self.formats)
+        self._value_any = re.compile("|".join(f"(?P<f{i}>{rx})" for i, rx in enumerate(self.formats.values()))) \
+            if self.formats else None
+        # nombre normalizado -> tipo, LRU acotado. DEFAULT_RULES es de todo el proceso y la usan a la vez los
+        # hilos de las sesiones de Streamlit: get / move_to_end / popitem sólo con el cerrojo
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """{"keywords": {tipo: [palabras]}, "formats": {tipo: regex}, "detect_values": bool}; None -> por defecto.
+
+        ValueError con el motivo si la configuración no tiene esa forma.
+        """
+        config = config or {}
+        if not isinstance(config, dict): raise ValueError("Las reglas de tipos deben ser un objeto JSON")
+        keywords, formats = config.get("keywords"), config.get("formats")
+        detect_values = config.get("detect_values", True)
+        if keywords is not None:
+            if not isinstance(keywords, dict): raise ValueError("'keywords' debe ser un objeto {tipo: [palabras]}")
+            for t, kws in keywords.items():
+                if not isinstance(kws, list) or not all(isinstance(k, str) for k in kws):
+                    raise ValueError(f"'keywords.{t}' debe ser una lista de textos, no {json.dumps(kws)}")
+        if formats is not None:
+            if not isinstance(formats, dict): raise ValueError("'formats' debe ser un objeto {tipo: regex}")
+            for t, rx in formats.items():
+                if not isinstance(rx, str): raise ValueError(f"'formats.{t}' debe ser una expresión regular (texto)")
+                try:
+                    re.compile(rx)
+                except re.error as e:
+                    raise ValueError(f"'formats.{t}' no es una expresión regular válida: {e}") from None
+        if not isinstance(detect_values, bool): raise ValueError("'detect_values' debe ser true o false")
+        return cls(keywords, formats, detect_values)
+
+    def __reduce__(self):
+        # Se envía a los procesos del pool como configuración (sin la memo)
+        return TypeRules, (self.keywords, self.formats, self.detect_values)
+
+    def config(self):
+        return {"keywords": self.keywords, "formats": self.formats, "detect_values": self.detect_values}
+
+    # --- por nombre ---
+    def key_type(self, key):
+        """Tipo base según el nombre del campo (String si ninguna regla encaja)."""
+        k = key.lower()
+        with self._memo_lock:
+            t = self._memo.get(k)
+            if t is not None:
+                self._memo.move_to_end(k)
+                return t
+        m = self._key_rx.match(k) if self._key_rx else None
+        t = self._key_types[int(m.lastgroup[1:])] if m else "String"
+        with self._memo_lock:
+            self._memo[k] = t
+            while len(self._memo) > MEMO_MAX_ENTRIES: self._memo.popitem(last=False)
+        return t
+
+    # --- por valor ---
+    def value_format(self, text):
+        """Tipo del formato que encaja con un texto, o None."""
+        m = self._value_any.fullmatch(str(text).strip()) if self._value_any else None
+        return self._value_types[int(m.lastgroup[1:])] if m else None
+
+    def detect_formats(self, samples):
+        """{ruta: [textos de ejemplo]} -> {ruta: tipo} de las rutas cuyos ejemplos (no vacíos) encajan todos
+        en un mismo formato. Vectorizado: un Series.str.match por formato sobre los ejemplos de todas las rutas;
+        las rutas que ya tienen formato no se vuelven a probar con los siguientes."""
+        paths, values = [], []
+        for p, vals in samples.items():
+            for v in vals:
+                v = str(v).strip()
+                if v: paths.append(p); values.append(v)
+        if not values or not self._value_rx: return {}
+        col = pd.Series(values, dtype=object)
+        keys = pd.Series(paths, dtype=object)
+        out = {}
+        for t, rx in self._value_full:
+            ok = col.str.match(rx).groupby(keys, sort=False).all()
+            hit = ok.index[ok.to_numpy(dtype=bool)]
+            if not len(hit): continue
+            out.update(dict.fromkeys(hit, t))
+            rest = ~keys.isin(hit).to_numpy()
+            if not rest.any(): break
+            col, keys = col[rest], keys[rest]
+        return out
+
+    def infer(self, key, value):
+        """Tipo de un valor; si es None, por el nombre del campo (con '?')."""
+        if value is not None:
+            if isinstance(value, str) and self.detect_values:
+                fmt = self.value_format(value)
+                if fmt: return fmt
+            return clean_type_name(type(value).__name__, is_nullable=False)
+        return clean_type_name(self.key_type(key), is_nullable=True)
+
+
+DEFAULT_RULES = TypeRules()
+
+
+def rules_for(project):
+    """TypeRules del proyecto (project["type_rules"]) o las de por defecto; compiladas una vez por configuración."""
+    config = project.get("type_rules") if project else None
+    if not config: return DEFAULT_RULES
+    key = json.dumps(config, sort_keys=True)
+    with _RULES_LOCK:
+        rules = _RULES_CACHE.get(key)
+        if rules is None:
+            rules = _RULES_CACHE[key] = TypeRules.from_config(config)
+            while len(_RULES_CACHE) > MAX_RULE_SETS: _RULES_CACHE.popitem(last=False)
+        else:
+            _RULES_CACHE.move_to_end(key)
+    return rules
+
+
+def infer_smart_type(key, value):
+    return DEFAULT_RULES.infer(key, value)
@@ -0,0 +1,146 @@
+# --- APLANADO XML EN STREAMING ---
+# Alternativa a xmltodict.parse + flatten_payload para respuestas XML/SOAP grandes.
+# Usa el parser incremental de ElementTree (XMLPullParser, el mismo que iterparse)
+# alimentado por trozos, emite las rutas con los nombres de xmltodict ('prefijo:tag',
+# '@atributo', '#text') y libera cada elemento en cuanto se procesa.
+#
+# Diferencia con la ruta JSON: al leer en streaming no se sabe si un tag se repetirá,
+# así que los elementos repetidos nunca llevan sufijo '[*]'. Con merge_arrays=False
+# sólo se recorre la primera aparición de cada tag (igual que flatten_payload sobre
+# la lista de xmltodict); con merge_arrays=True se unen las claves de todas.
+# ElementTree no conserva la posición de las declaraciones xmlns, así que los
+# '@xmlns' se emiten antes que el resto de atributos del elemento.
+import os
+import xml.etree.ElementTree as ET
+
+from flatten_engine import DEFAULT_MAX_SAMPLES, FlatCollector
+
+CHUNK_SIZE = 1 << 16
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+# Índices de los frames: [ruta, emitir, tiene_hijos, tags_vistos, ns_declarados, hijo_pendiente, texto]
+_PATH, _EMIT, _KIDS, _SEEN, _NS, _PREV, _TEXT = range(7)
+
+
+def _add_text(frame, piece):
+    # Sólo se acumula a partir del primer trozo con contenido: el espacio inicial se
+    # descarta igualmente al hacer strip (como xmltodict).
+    if not piece: return
+    if frame[_TEXT] is None:
+        if piece.isspace(): return
+        frame[_TEXT] = [piece]
+    else:
+        frame[_TEXT].append(piece)
+
+
+def _release_prev(frame, parent_elem):
+    prev = frame[_PREV]
+    if prev is not None:
+        _add_text(frame, prev.tail)
+        parent_elem.remove(prev)
+        frame[_PREV] = None
+
+
+def iter_xml_leaves(source, merge_arrays=False, chunk_size=CHUNK_SIZE):
+    """Genera (ruta, valor) de un XML leído por trozos, con las rutas de flatten_payload(xmltodict.parse(...))."""
+    owned = isinstance(source, (str, os.PathLike))
+    fp = open(source, "rb") if owned else source
+    try:
+        parser = ET.XMLPullParser(events=("start", "end", "start-ns"))
+        names, tags = {}, {}
+        pending_ns = []
+        stack, elems = [], []
+
+        def resolve(tag):
+            q = tags.get(tag)
+            if q is not None: return q
+            q = tag
+            if tag[0] == "{":
+                uri, local = tag[1:].split("}", 1)
+                prefix = "xml" if uri == XML_NS else None
+                for p, u in pending_ns:
+                    if u == uri: prefix = p
+                if prefix is None:
+                    for fr in reversed(stack):
+                        if fr[_NS] and uri in fr[_NS]:
+                            prefix = fr[_NS][uri]
+                            break
+                q = f"{prefix}:{local}" if prefix else (local if prefix == "" else tag)
+            tags[tag] = q
+            return q
+
+        def child_path(path, name):
+            key = (path, name)
+            p = names.get(key)
+            if p is None: p = names[key] = f"{path}.{name}" if path else name
+            return p
+
+        while True:
+            chunk = fp.read(chunk_size)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+            for ev, obj in parser.read_events():
+                if ev == "start-ns":
+                    pending_ns.append(obj)
+                    tags.clear()
+                elif ev == "start":
+                    name = resolve(obj.tag)
+                    if stack:
+                        parent = stack[-1]
+                        seen = parent[_SEEN]
+                        if not seen: _add_text(parent, elems[-1].text)
+                        _release_prev(parent, elems[-1])
+                        parent[_KIDS] = True
+                        first = name not in seen
+                        if first: seen.add(name)
+                        path = child_path(parent[_PATH], name)
+                        emit = parent[_EMIT] and (merge_arrays or first)
+                    else:
+                        path, emit = name, True
+                    ns = {u: p for p, u in pending_ns} if pending_ns else None
+                    frame = [path, emit, bool(pending_ns or obj.attrib), set(), ns, None, None]
+                    if emit:
+                        for p, u in pending_ns:
+                            yield child_path(path, f"@xmlns:{p}" if p else "@xmlns"), u
+                    pending_ns = []
+                    stack.append(frame)
+                    elems.append(obj)
+                    if emit:
+                        for a, v in obj.attrib.items():
+                            yield child_path(path, "@" + resolve(a)), v
+                else:
+                    frame = stack.pop()
+                    elems.pop()
+                    if not frame[_SEEN]: _add_text(frame, obj.text)
+                    _release_prev(frame, obj)
+                    if frame[_NS]: tags.clear()
+                    if frame[_EMIT]:
+                        # Como xmltodict: texto propio + tails de los hijos, unidos y con strip
+                        text = "".join(frame[_TEXT]).strip() if frame[_TEXT] else ""
+                        if frame[_KIDS]:
+                            if text: yield child_path(frame[_PATH], "#text"), text
+                        else:
+                            yield frame[_PATH], text or None
+                    # Se libera el elemento pero se conserva su tail (el padre aún lo necesita)
+                    obj.attrib.clear()
+                    obj.text = None
+                    if stack: stack[-1][_PREV] = obj
+            if not chunk: break
+    finally:
+        if owned: fp.close()
+
+
+def stream_xml(source, collector=None, merge_arrays=True, max_samples=DEFAULT_MAX_SAMPLES, chunk_size=CHUNK_SIZE):
+    """Aplana en streaming un XML (ruta, fichero subido o buffer) y devuelve el FlatCollector."""
+    if collector is None: collector = FlatCollector(max_samples=max_samples)
+    if hasattr(source, "seek"):
+        try:
+            source.seek(0)
+        except Exception:
+            pass
+    collector.records += 1
+    add = collector.add
+    for p, v in iter_xml_leaves(source, merge_arrays=merge_arrays, chunk_size=chunk_size): add(p, v)
+    return collector